@@ -1 +1,21 @@
-from .meta_analysis import plot_champion_win_rates
\ No newline at end of file
+import importlib
+
+# Public names and the submodule defining them, imported on first access so that
+# matplotlib and seaborn are only loaded when a chart is drawn.
+_EXPORTS = {
+    "plot_champion_win_rates": "meta_analysis",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
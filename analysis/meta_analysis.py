@@ -1,14 +1,46 @@
+import matplotlib
+matplotlib.use("Agg")  # Charts are only saved to disk, worker processes have no display
+
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgb
+from matplotlib.patches import Patch
 import seaborn as sns
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import hashlib
+import json
+import numpy as np
 import pandas as pd
 import os
 
+from transform.metrics import metrics
+from transform.partials import window_days
+from transform.stats import add_interval_columns
+
+# Hashes of the data behind each chart, used to skip unchanged charts. One file per chart,
+# so roles rendered by separate processes (e.g. mapped Airflow tasks) never share a file.
+RENDER_MANIFEST_DIR = ".render_manifest"
+
+# Champions with fewer games are left out of the charts. Ranking itself relies on the
+# shrunk win rates, so this only keeps one-off picks from cluttering the charts.
+MIN_CHART_MATCHES = 10
+
+# Length of the observation period when the caller does not pass the aggregated window,
+# the same setting as the collected match history
+DEFAULT_WINDOW_DAYS = int(os.getenv("HISTORY_DAYS", 7))
 
-def plot_champion_win_rates(df: pd.DataFrame) -> None:
+
+def plot_champion_win_rates(df: pd.DataFrame, output_dir: str = "reports", max_workers: int = None,
+                            force: bool = False, min_matches: int = MIN_CHART_MATCHES, roles: list = None,
+                            window: list = None) -> list:
     """
     Generates separate bar plots for each role, showing champion win rates.
+    Champions are ranked by their Bayesian-shrunk win rate, drawn with its credible interval,
+    so a champion with few games no longer ranks next to one with hundreds.
     Includes overlay bars indicating the number of matches played.
+    Roles are rendered in parallel, and charts whose input data did not change since
+    the last render are skipped. Colors and scales are shared by every role of `df`,
+    so a chart looks the same whether it is rendered alone or with the others.
 
     Args:
         df (pd.DataFrame): DataFrame containing the following columns:
@@ -16,110 +48,166 @@ def plot_champion_win_rates(df: pd.DataFrame) -> None:
             - 'champion_name' (str): Name of the champion.
             - 'win_rate' (float): Champion win rate (percentage).
             - 'total_matches' (int): Total matches played with the champion.
+            - 'wins' (int): Matches won. Used to add the interval columns when they are missing.
+            - 'shrunk_win_rate', 'shrunk_low', 'shrunk_high' (float): Optional, see `calculate_win_rates`.
+        output_dir (str): Directory where the charts are saved.
+        max_workers (int): Number of rendering processes. Defaults to the number of CPUs.
+        force (bool): Render every chart even if its data did not change.
+        min_matches (int): Minimum number of matches for a champion to be shown.
+        roles (list): Roles to render. Every role of `df` is rendered if None.
+        window (list): Game days (YYYY-MM-DD) the win rates were aggregated over. The titles show
+                       their range and the file names their last day. Defaults to the last
+                       `DEFAULT_WINDOW_DAYS` days, ending today (UTC).
+
+    Returns:
+        list: Paths of the charts rendered by this call.
     """
-    # Observation period
-    current_date = datetime.now().strftime("%d/%m/%Y")
-    start_date = (datetime.now() - timedelta(days=7)).strftime("%d/%m/%Y")
-    output_date = datetime.now().strftime("%d_%m_%Y")
+    # Observation period: the window the win rates were aggregated over
+    window = sorted(window or window_days(DEFAULT_WINDOW_DAYS))
+    start_date = date.fromisoformat(window[0]).strftime("%d/%m/%Y")
+    current_date = date.fromisoformat(window[-1]).strftime("%d/%m/%Y")
+    output_date = date.fromisoformat(window[-1]).strftime("%d_%m_%Y")
+
+    # Win rate tables written before the interval columns existed
+    if 'shrunk_win_rate' not in df:
+        df = add_interval_columns(df.copy(), resamples=0)
 
     # Extract unique roles
-    roles = df['role'].unique()
+    all_roles = df['role'].unique()
 
     # Define a color palette for roles
-    palette = sns.color_palette("Set2", len(roles))
+    palette = sns.color_palette("Set2", len(all_roles))
 
-    # Generate a plot for each role
-    for role, color in zip(roles, palette):
-        # Filter data for the current role and exclude champions with fewer than 20 matches
-        role_data = df[(df['role'] == role) & (df['total_matches'] > 20)].sort_values(by='win_rate', ascending=False)
+    # Scales shared by every chart
+    scale_factor = df['total_matches'].max() / 100  # Scale factor for overlay bar widths
+    x_max = max(df['shrunk_high'].max() + 5, 100)
+
+    os.makedirs(output_dir, exist_ok=True)
+    selected = [(role, color) for role, color in zip(all_roles, palette) if roles is None or role in roles]
+    tasks = []
+    for role, color in selected:
+        # Rank the champions of the current role by shrunk win rate
+        role_data = df[(df['role'] == role) & (df['total_matches'] >= min_matches)]
+        role_data = role_data.sort_values(by=['shrunk_win_rate', 'total_matches'], ascending=False)
 
         if role_data.empty:
             continue  # Skip if no champions meet the criteria
 
-        top_5 = role_data.iloc[:5]
-        others = role_data.iloc[5:]
-
-        plt.figure(figsize=(12, 14))
-
-        # Plot top 5 champions with a distinct color
-        bars_top_5 = plt.barh(
-            top_5['champion_name'], 
-            top_5['win_rate'], 
-            color='gold', 
-            edgecolor='black',
-            label="Top 5 Champions"
-        )
-
-        # Plot other champions with a role-specific color
-        bars_others = plt.barh(
-            others['champion_name'], 
-            others['win_rate'], 
-            color=color, 
-            alpha=0.6, 
-            edgecolor='black',
-            label="Other Champions"
-        )
-
-        # Overlay bars for total matches played
-        max_matches = df['total_matches'].max()
-        scale_factor = max_matches / 100  # Scale factor for overlay bar widths
-
-        for bar, matches in zip(list(bars_top_5) + list(bars_others), 
-                                pd.concat([top_5['total_matches'], others['total_matches']])):
-            match_bar_width = matches / scale_factor
-            plt.barh(
-                bar.get_y() + 0.4, 
-                match_bar_width, 
-                height=bar.get_height(), 
-                color='grey', 
-                alpha=0.3, 
-                edgecolor='black',
-                label="Number of games played" if bar == bars_top_5[0] else ""
-            )
-
-            # Annotate total matches
-            plt.text(
-                0.5, 
-                bar.get_y() + bar.get_height() / 2, 
-                f"{matches}", 
-                va='center', 
-                ha='left', 
-                color="grey", 
-                fontsize=10, 
-                fontweight="bold"
-            )
-
-        # Annotate win rates
-        for bar, win_rate in zip(list(bars_top_5) + list(bars_others), 
-                                 pd.concat([top_5['win_rate'], others['win_rate']])):
-            plt.text(
-                bar.get_width() + 1, 
-                bar.get_y() + bar.get_height() / 2, 
-                f"{win_rate:.1f}%", 
-                va='center', 
-                ha='left', 
-                fontsize=10
-            )
-
-        # Plot titles and labels
-        plt.title(f"Win Rates of Champions as {role} from {start_date} to {current_date}", fontsize=16, pad=20)
-        plt.xlabel("Win Rate (%)", fontsize=14)
-        plt.ylabel("Champions", fontsize=14)
-        plt.gca().invert_yaxis()
-        plt.xlim(0, max(df['win_rate'].max() + 5, 100))
-
-        # Add grid and legend
-        plt.grid(axis='x', linestyle='--', alpha=0.6)
-        plt.legend(loc="lower right", fontsize=10)
-
-        # Adjust layout
-        plt.tight_layout()
-
-        # Save plot
-        output_dir = "reports"
-        os.makedirs(output_dir, exist_ok=True)
-        filename = f"{role}_win_rates_{output_date}.png"
-        filepath = os.path.join(output_dir, filename)
-        plt.savefig(filepath, dpi=300)
-        plt.close()
-
+        task = {
+            "role_data": role_data[['champion_name', 'win_rate', 'shrunk_win_rate', 'shrunk_low', 'shrunk_high',
+                                    'total_matches']].reset_index(drop=True),
+            "color": tuple(color),
+            "title": f"Win Rates of Champions as {role} from {start_date} to {current_date}",
+            "scale_factor": scale_factor,
+            "x_max": x_max,
+            "filepath": os.path.join(output_dir, f"{role}_win_rates_{output_date}.png"),
+        }
+        task_hash = _task_hash(task)
+        filename = os.path.basename(task["filepath"])
+        if not force and _rendered_hash(output_dir, filename) == task_hash and os.path.exists(task["filepath"]):
+            continue
+        tasks.append((task, task_hash))
+
+    metrics.count("charts_skipped_total", len(selected) - len(tasks))
+    if not tasks:
+        return []
+
+    with metrics.stage("plot_champion_win_rates") as stage:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            rendered = list(executor.map(_render_role_chart, [task for task, _ in tasks]))
+        stage["rows"] = len(rendered)
+
+    for task, task_hash in tasks:
+        _save_rendered_hash(output_dir, os.path.basename(task["filepath"]), task_hash)
+    return rendered
+
+
+def _render_role_chart(task: dict) -> str:
+    role_data = task["role_data"]
+    positions = np.arange(len(role_data))
+    is_top_5 = positions < 5
+
+    # Top 5 champions in gold, the others in the role color
+    colors = np.where(
+        is_top_5[:, None],
+        np.array([*to_rgb('gold'), 1.0]),
+        np.array([*task["color"][:3], 0.6]),
+    )
+
+    fig, ax = plt.subplots(figsize=(12, 14))
+
+    # Shrunk win rate bars with their credible intervals, one call for every champion
+    errors = np.vstack([
+        role_data['shrunk_win_rate'] - role_data['shrunk_low'],
+        role_data['shrunk_high'] - role_data['shrunk_win_rate'],
+    ])
+    bars = ax.barh(positions, role_data['shrunk_win_rate'], xerr=errors, color=colors, edgecolor='black',
+                   error_kw={"ecolor": "dimgrey", "capsize": 2, "linewidth": 1})
+
+    # Overlay bars for total matches played
+    overlay = ax.barh(
+        positions,
+        role_data['total_matches'] / task["scale_factor"],
+        color='grey',
+        alpha=0.3,
+        edgecolor='black',
+    )
+
+    # Annotate win rates and total matches
+    ax.bar_label(bars, labels=[f"{shrunk:.1f}% (raw {raw:.1f}%)"
+                               for shrunk, raw in zip(role_data['shrunk_win_rate'], role_data['win_rate'])],
+                 padding=3, fontsize=10)
+    ax.bar_label(overlay, labels=role_data['total_matches'].astype(str).tolist(), padding=3,
+                 color="grey", fontsize=10, fontweight="bold")
+
+    # Plot titles and labels
+    ax.set_title(task["title"], fontsize=16, pad=20)
+    ax.set_xlabel("Shrunk Win Rate (%), 95% credible interval", fontsize=14)
+    ax.set_ylabel("Champions", fontsize=14)
+    ax.set_yticks(positions)
+    ax.set_yticklabels(role_data['champion_name'])
+    ax.invert_yaxis()
+    ax.set_xlim(0, task["x_max"])
+
+    # Add grid and legend
+    ax.grid(axis='x', linestyle='--', alpha=0.6)
+    ax.legend(
+        handles=[
+            Patch(facecolor='gold', edgecolor='black', label="Top 5 Champions"),
+            Patch(facecolor=task["color"], alpha=0.6, edgecolor='black', label="Other Champions"),
+            Patch(facecolor='grey', alpha=0.3, edgecolor='black', label="Number of games played"),
+        ],
+        loc="lower right",
+        fontsize=10,
+    )
+
+    # Adjust layout and save plot
+    fig.tight_layout()
+    fig.savefig(task["filepath"], dpi=300)
+    plt.close(fig)
+    return task["filepath"]
+
+
+def _task_hash(task: dict) -> str:
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(task["role_data"], index=False).values.tobytes())
+    settings = {key: value for key, value in task.items() if key not in ("role_data", "filepath")}
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _rendered_hash(output_dir: str, filename: str) -> str:
+    try:
+        with open(os.path.join(output_dir, RENDER_MANIFEST_DIR, f"{filename}.sha256")) as hash_file:
+            return hash_file.read().strip()
+    except OSError:
+        return None
+
+
+def _save_rendered_hash(output_dir: str, filename: str, task_hash: str) -> None:
+    manifest_dir = os.path.join(output_dir, RENDER_MANIFEST_DIR)
+    os.makedirs(manifest_dir, exist_ok=True)
+    path = os.path.join(manifest_dir, f"{filename}.sha256")
+    with open(f"{path}.{os.getpid()}.tmp", "w") as hash_file:
+        hash_file.write(task_hash)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
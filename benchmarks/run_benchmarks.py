@@ -0,0 +1,257 @@
+"""
+Benchmark of every pipeline stage against a local Riot API stand-in and synthetic matches.
+
+Usage:
+    python -m benchmarks.run_benchmarks --players 200 --matches 20000 --output bench.json
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .stub_server import StubConfig, StubServer
+from .synthetic import champion_mapping, iter_synthetic_matches
+
+
+def _children_peak_rss() -> int:
+    # Largest peak RSS of the child processes waited for so far, in bytes (0 where unsupported)
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(name: str, func, items: int = None, reset=None, memory: bool = True) -> tuple:
+    """
+    Run `func` twice: once untraced for wall time and throughput, then once under `tracemalloc`
+    for peak memory, as tracing slows allocation-heavy stages down several times.
+    Worker processes (e.g. chart rendering) are not seen by `tracemalloc`: their peak RSS is
+    reported separately when a child process grew past the previous peak.
+
+    Args:
+        name (str): Stage name.
+        func (callable): Stage to run. Returns its result, or (result, items) if `items` is None.
+        items (int): Number of items processed, if known beforehand.
+        reset (callable): Called before each pass, to give the stage a fresh state (e.g. an empty cache).
+        memory (bool): Run the memory pass.
+
+    Returns:
+        tuple: (result of the timed pass, measurement dict).
+    """
+    if reset:
+        reset()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    if items is None:
+        result, items = result
+
+    peak = worker_peak = None
+    if memory:
+        if reset:
+            reset()
+        children_before = _children_peak_rss()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        children_after = _children_peak_rss()
+        worker_peak = children_after if children_after > children_before else None
+
+    measurement = {
+        "stage": name,
+        "seconds": round(elapsed, 4),
+        "items": items,
+        "items_per_second": round(items / elapsed, 1) if elapsed > 0 else None,
+        "peak_memory_mb": round(peak / (1024 * 1024), 2) if peak is not None else None,
+        "worker_peak_rss_mb": round(worker_peak / (1024 * 1024), 2) if worker_peak else None,
+    }
+    memory_column = f"{measurement['peak_memory_mb']:>9.1f} MB" if peak is not None else f"{'-':>12}"
+    if worker_peak:
+        memory_column += f" (workers {measurement['worker_peak_rss_mb']:.1f} MB)"
+    print(f"{name:<28} {elapsed:>9.3f}s {items:>10} items {measurement['items_per_second'] or 0:>12.1f}/s "
+          f"{memory_column}")
+    return result, measurement
+
+
+def run(args) -> list:
+    results = []
+    workdir = tempfile.mkdtemp(prefix="lol-balancer-bench-")
+    config = StubConfig(
+        players=args.players,
+        matches_per_player=args.matches_per_player,
+        latency=args.latency,
+        app_rate_limit=args.app_rate_limit,
+        random_429_rate=args.random_429_rate,
+    )
+
+    with StubServer(config) as stub:
+        # The transform package reads its configuration at import time
+        os.environ["RIOT_API_HOST"] = stub.host_template
+        os.environ.setdefault("RIOT_API_KEY", "benchmark")
+        fetch_players = importlib.import_module("transform.fetch_players")
+        from transform.match_cache import MatchCache
+
+        caches = iter(range(1_000_000))
+
+        def empty_cache():
+            fetch_players.match_cache = MatchCache(os.path.join(workdir, f"match_cache_{next(caches)}.sqlite"))
+
+        def discovery():
+            puuids = fetch_players.get_all_puuids("euw1", "CHALLENGER")
+            match_ids = fetch_players.get_all_matches(puuids, "euw1")
+            return match_ids, len(puuids) + len(match_ids)
+
+        match_ids, measurement = measure("discovery", discovery, memory=args.memory)
+        results.append(measurement)
+
+        match_ids = match_ids[:args.detail_matches]
+        # Requests and 429s of the timed pass only
+        measurement_stats = {}
+        requests_before, rate_limited_before = stub.stats["requests"], stub.stats["429"]
+
+        def details():
+            fetched = sum(1 for _ in fetch_players.iter_match_details(match_ids))
+            measurement_stats.setdefault("requests", stub.stats["requests"] - requests_before)
+            measurement_stats.setdefault("rate_limited", stub.stats["429"] - rate_limited_before)
+            return None, fetched
+
+        _, measurement = measure("details", details, reset=empty_cache, memory=args.memory)
+        measurement.update(measurement_stats)
+        results.append(measurement)
+
+        _, measurement = measure(
+            "timelines",
+            lambda: (None, sum(1 for _ in fetch_players.iter_match_timelines(match_ids))),
+            memory=args.memory,
+        )
+        results.append(measurement)
+
+        # Discovery streaming into detail fetching, on an empty cache
+        measurement_stats = {}
+        requests_before = stub.stats["requests"]
+
+        def streamed():
+            fetched = sum(1 for _ in fetch_players.iter_streamed_match_details(
+                fetch_players.iter_new_match_ids(["euw1"], ["CHALLENGER"])))
+            measurement_stats.setdefault("requests", stub.stats["requests"] - requests_before)
+            return None, fetched
+
+        _, measurement = measure("discovery+details.streamed", streamed, reset=empty_cache, memory=args.memory)
+        measurement.update(measurement_stats)
+        results.append(measurement)
+
+    # Offline stages on synthetic matches, along the path of main.py: Parquet lake and partial
+    # aggregates, then the window queries, enrichment and aggregates read back from them
+    from transform import calculate_win_rates, enrich_match_data, load_table, query_rates, write_match_dataset
+    from transform.partials import window_days
+
+    collection_date = datetime.now(timezone.utc).date().isoformat()
+    stores = {}
+    store_ids = iter(range(1_000_000))
+
+    def empty_stores():
+        store_id = next(store_ids)
+        stores.update(lake=os.path.join(workdir, f"lake_{store_id}"),
+                      aggregates=os.path.join(workdir, f"aggregates_{store_id}"))
+
+    _, measurement = measure(
+        "write_match_dataset",
+        lambda: write_match_dataset(iter_synthetic_matches(args.matches), collection_date, root=stores["lake"],
+                                    aggregates_root=stores["aggregates"]),
+        items=args.matches,
+        reset=empty_stores,
+        memory=args.memory,
+    )
+    results.append(measurement)
+
+    days = window_days(7)
+    _, measurement = measure(
+        "query_rates",
+        lambda: query_rates(days, root=stores["aggregates"]),
+        items=args.matches,
+        memory=args.memory,
+    )
+    results.append(measurement)
+
+    def load_participants():
+        frame = load_table("participants", columns=["match_id", "team_id", "champion_id", "role", "win", "patch"],
+                           dates=[collection_date], root=stores["lake"])
+        return frame, len(frame)
+
+    participants_df, measurement = measure("load_participants", load_participants, memory=args.memory)
+    results.append(measurement)
+
+    matches_df, measurement = measure(
+        "enrich_match_data",
+        lambda: enrich_match_data(participants_df.copy(), champion_mapping()),
+        items=len(participants_df),
+        memory=args.memory,
+    )
+    results.append(measurement)
+
+    win_rate_df, measurement = measure(
+        "calculate_win_rates",
+        lambda: calculate_win_rates(matches_df),
+        items=len(matches_df),
+        memory=args.memory,
+    )
+    results.append(measurement)
+
+    from transform import MatchupMatrices
+
+    _, measurement = measure(
+        "matchups",
+        lambda: MatchupMatrices.from_participants(matches_df),
+        items=args.matches,
+        memory=args.memory,
+    )
+    results.append(measurement)
+
+    from analysis import plot_champion_win_rates
+
+    _, measurement = measure(
+        "plot_champion_win_rates",
+        lambda: plot_champion_win_rates(win_rate_df, output_dir=os.path.join(workdir, "reports"), force=True),
+        items=win_rate_df['role'].nunique(),
+        memory=args.memory,
+    )
+    results.append(measurement)
+    return results
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=300, help="Players in the stub league")
+    parser.add_argument("--matches-per-player", type=int, default=20, help="Match IDs per player")
+    parser.add_argument("--detail-matches", type=int, default=500, help="Match details fetched from the stub")
+    parser.add_argument("--matches", type=int, default=20_000, help="Synthetic matches for the offline stages")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency per request, in seconds")
+    parser.add_argument("--app-rate-limit", default="500:10,30000:600", help="Stub X-App-Rate-Limit")
+    parser.add_argument("--random-429-rate", type=float, default=0.0, help="Share of forced 429 responses")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip the traced pass that measures peak memory")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"Benchmark results saved in '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
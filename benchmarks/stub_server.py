@@ -0,0 +1,187 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .synthetic import generate_match, generate_timeline, synthetic_match_id, synthetic_puuid
+
+ROUTES = [
+    ("league-v4.league", re.compile(r"^/(?P<route>\w+)/lol/league/v4/(?P<league>\w+)/by-queue/RANKED_SOLO_5x5$")),
+    ("summoner-v4.by-id", re.compile(r"^/(?P<route>\w+)/lol/summoner/v4/summoners/(?P<summoner_id>[^/]+)$")),
+    ("match-v5.ids", re.compile(r"^/(?P<route>\w+)/lol/match/v5/matches/by-puuid/(?P<puuid>[^/]+)/ids$")),
+    ("match-v5.match", re.compile(r"^/(?P<route>\w+)/lol/match/v5/matches/(?P<match_id>[^/]+)$")),
+    ("match-v5.timeline", re.compile(r"^/(?P<route>\w+)/lol/match/v5/matches/(?P<match_id>[^/]+)/timeline$")),
+]
+
+
+class StubConfig:
+    """
+    Behaviour of the local Riot API stand-in.
+
+    Args:
+        players (int): Players per league.
+        matches_per_player (int): Match IDs returned for each player.
+        latency (float): Seconds added to every response.
+        app_rate_limit (str): Application limits, as in X-App-Rate-Limit.
+        method_rate_limit (str): Per-method limits, as in X-Method-Rate-Limit.
+        random_429_rate (float): Share of requests answered with a 429 regardless of limits.
+        retry_after (int): Retry-After value of 429 responses.
+    """
+
+    def __init__(self, players: int = 300, matches_per_player: int = 20, latency: float = 0.02,
+                 app_rate_limit: str = "20:1,100:120", method_rate_limit: str = "2000:10",
+                 random_429_rate: float = 0.0, retry_after: int = 1):
+        self.players = players
+        self.matches_per_player = matches_per_player
+        self.latency = latency
+        self.app_rate_limit = app_rate_limit
+        self.method_rate_limit = method_rate_limit
+        self.random_429_rate = random_429_rate
+        self.retry_after = retry_after
+
+
+class _Windows:
+    # Sliding windows enforced by the stub, one set per (route, method) key
+    def __init__(self, header: str):
+        self.limits = [tuple(int(value) for value in part.split(":")) for part in header.split(",") if part]
+        self.hits = defaultdict(deque)
+
+    def hit(self, key: str, now: float) -> tuple:
+        hits = self.hits[key]
+        longest = max(seconds for _, seconds in self.limits)
+        while hits and hits[0] <= now - longest:
+            hits.popleft()
+        counts = [(sum(1 for hit in hits if hit > now - seconds), seconds) for _, seconds in self.limits]
+        allowed = all(count < limit for (count, _), (limit, _) in zip(counts, self.limits))
+        if allowed:
+            hits.append(now)
+            counts = [(count + 1, seconds) for count, seconds in counts]
+        return allowed, ",".join(f"{count}:{seconds}" for count, seconds in counts)
+
+
+class StubServer:
+    """
+    Local HTTP stand-in for the league-v4, summoner-v4 and match-v5 (IDs, details and timelines) endpoints.
+    URLs follow RIOT_API_HOST=http://127.0.0.1:<port>/{route}.
+
+    Args:
+        config (StubConfig): Stub behaviour.
+        port (int): Port to listen on (0 picks a free port).
+    """
+
+    def __init__(self, config: StubConfig = None, port: int = 0):
+        self.config = config or StubConfig()
+        self.lock = threading.Lock()
+        self.app_windows = _Windows(self.config.app_rate_limit)
+        self.method_windows = _Windows(self.config.method_rate_limit)
+        self.stats = defaultdict(int)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def host_template(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{{route}}"
+
+    def start(self) -> "StubServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def match_ids_for(self, puuid: str) -> list:
+        platform, _, index = puuid.split("-")
+        # Each game is shared by several players, like real solo queue lobbies
+        pool_size = max(self.config.players * self.config.matches_per_player // 5, self.config.matches_per_player)
+        rng = random.Random(puuid)
+        return [synthetic_match_id(platform, index) for index in rng.sample(range(pool_size), self.config.matches_per_player)]
+
+    def respond(self, method: str, params: dict, query: dict):
+        if method == "league-v4.league":
+            platform = params["route"]
+            entries = [{"summonerId": f"{platform}-summoner-{index:06d}"} for index in range(self.config.players)]
+            return {"entries": entries}
+        if method == "summoner-v4.by-id":
+            platform, _, index = params["summoner_id"].split("-")
+            return {"puuid": synthetic_puuid(platform, int(index))}
+        if method == "match-v5.ids":
+            start = int(query.get("start", ["0"])[0])
+            count = int(query.get("count", ["100"])[0])
+            return self.match_ids_for(params["puuid"])[start:start + count]
+        if method == "match-v5.timeline":
+            return generate_timeline(params["match_id"])
+        return generate_match(params["match_id"])
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def handle(self):
+                # Clients may stop reading early (e.g. timelines parsed until the laning phase only)
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                for method, pattern in ROUTES:
+                    match = pattern.match(parsed.path)
+                    if match:
+                        break
+                else:
+                    self._send(404, {"status": {"message": "Not found"}}, {})
+                    return
+
+                params = match.groupdict()
+                now = time.monotonic()
+                with stub.lock:
+                    stub.stats["requests"] += 1
+                    app_ok, app_count = stub.app_windows.hit(params["route"], now)
+                    method_ok, method_count = stub.method_windows.hit(f"{params['route']}:{method}", now)
+                headers = {
+                    "X-App-Rate-Limit": stub.config.app_rate_limit,
+                    "X-App-Rate-Limit-Count": app_count,
+                    "X-Method-Rate-Limit": stub.config.method_rate_limit,
+                    "X-Method-Rate-Limit-Count": method_count,
+                }
+
+                time.sleep(stub.config.latency)
+                forced = random.random() < stub.config.random_429_rate
+                if not (app_ok and method_ok) or forced:
+                    with stub.lock:
+                        stub.stats["429"] += 1
+                    headers["Retry-After"] = str(stub.config.retry_after)
+                    headers["X-Rate-Limit-Type"] = "method" if app_ok and not forced else "application"
+                    self._send(429, {"status": {"message": "Rate limit exceeded"}}, headers)
+                    return
+
+                self._send(200, stub.respond(method, params, parse_qs(parsed.query)), headers)
+
+            def _send(self, status: int, body, headers: dict):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,165 @@
+import random
+import time
+
+# Synthetic champion pool: IDs 1..N named "Champion<ID>"
+CHAMPION_COUNT = 170
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+GAME_VERSION = "14.23.636.4567"
+
+
+def champion_mapping() -> dict:
+    """
+    Return the ID -> name mapping of the synthetic champion pool.
+
+    Returns:
+        dict: A dictionary mapping champion IDs to names.
+    """
+    return {champion_id: f"Champion{champion_id}" for champion_id in range(1, CHAMPION_COUNT + 1)}
+
+
+def synthetic_puuid(platform: str, index: int) -> str:
+    return f"{platform}-puuid-{index:06d}"
+
+
+def synthetic_match_id(platform: str, index: int) -> str:
+    return f"{platform.upper()}_{7_000_000_000 + index}"
+
+
+def generate_match(match_id: str, seed: int = None, game_creation: int = None) -> dict:
+    """
+    Generate a match-v5 payload with the fields the pipeline reads, plus a realistic
+    amount of per-participant stats so payload sizes are close to real ones.
+
+    Args:
+        match_id (str): Match ID (e.g. "EUW1_7000000001").
+        seed (int): Random seed. Defaults to a hash of the match ID, so payloads are stable.
+        game_creation (int): Game start in epoch milliseconds. Defaults to the last 7 days.
+
+    Returns:
+        dict: The match payload.
+    """
+    rng = random.Random(seed if seed is not None else match_id)
+    platform = match_id.split("_", 1)[0]
+    picks_and_bans = rng.sample(range(1, CHAMPION_COUNT + 1), 20)
+    picks, bans = picks_and_bans[:10], picks_and_bans[10:]
+    blue_wins = rng.random() < 0.5
+    game_creation = game_creation or int((time.time() - rng.uniform(0, 7 * 24 * 60 * 60)) * 1000)
+
+    participants = []
+    for slot, champion_id in enumerate(picks):
+        team_id = 100 if slot < 5 else 200
+        participants.append({
+            "participantId": slot + 1,
+            "puuid": f"{platform.lower()}-puuid-{rng.randrange(100_000):06d}",
+            "summonerName": f"Player{rng.randrange(100_000)}",
+            "teamId": team_id,
+            "championId": champion_id,
+            "teamPosition": POSITIONS[slot % 5],
+            "win": blue_wins if team_id == 100 else not blue_wins,
+            # Filler stats, as in real payloads
+            "kills": rng.randrange(20),
+            "deaths": rng.randrange(15),
+            "assists": rng.randrange(25),
+            "goldEarned": rng.randrange(5_000, 20_000),
+            "totalMinionsKilled": rng.randrange(300),
+            "totalDamageDealtToChampions": rng.randrange(50_000),
+            "visionScore": rng.randrange(100),
+            "item0": rng.randrange(1_000, 7_000),
+            "item1": rng.randrange(1_000, 7_000),
+            "item2": rng.randrange(1_000, 7_000),
+            "challenges": {f"stat{index}": rng.random() for index in range(60)},
+            "perks": {"styles": [{"selections": [{"perk": rng.randrange(8_000, 9_000)} for _ in range(4)]}]},
+        })
+
+    teams = [
+        {
+            "teamId": team_id,
+            "win": blue_wins if team_id == 100 else not blue_wins,
+            "bans": [
+                {"championId": champion_id, "pickTurn": turn + 1}
+                for turn, champion_id in enumerate(bans[offset:offset + 5])
+            ],
+        }
+        for team_id, offset in ((100, 0), (200, 5))
+    ]
+
+    return {
+        "metadata": {
+            "matchId": match_id,
+            "participants": [participant["puuid"] for participant in participants],
+        },
+        "info": {
+            "gameCreation": game_creation,
+            "gameDuration": rng.randrange(900, 2_400),
+            "gameVersion": GAME_VERSION,
+            "platformId": platform,
+            "queueId": 420,
+            "participants": participants,
+            "teams": teams,
+        },
+    }
+
+
+def generate_timeline(match_id: str, seed: int = None) -> dict:
+    """
+    Generate a match-v5 timeline payload: one frame per minute with every participant's
+    stats and a batch of events, several hundred KB like real timelines.
+
+    Args:
+        match_id (str): Match ID (e.g. "EUW1_7000000001").
+        seed (int): Random seed. Defaults to a hash of the match ID, so payloads are stable.
+
+    Returns:
+        dict: The timeline payload.
+    """
+    rng = random.Random(seed if seed is not None else f"{match_id}:timeline")
+    minutes = random.Random(match_id).randrange(900, 2_400) // 60
+
+    frames = []
+    for minute in range(minutes + 1):
+        participant_frames = {
+            str(participant_id): {
+                "participantId": participant_id,
+                "totalGold": 500 + minute * rng.randrange(300, 450),
+                "currentGold": rng.randrange(0, 1_500),
+                "xp": minute * rng.randrange(350, 500),
+                "level": min(1 + minute // 2, 18),
+                "minionsKilled": minute * rng.randrange(0, 9),
+                "jungleMinionsKilled": minute * rng.randrange(0, 5),
+                "position": {"x": rng.randrange(15_000), "y": rng.randrange(15_000)},
+                "championStats": {f"stat{index}": rng.randrange(1_000) for index in range(25)},
+                "damageStats": {f"stat{index}": rng.randrange(10_000) for index in range(12)},
+            }
+            for participant_id in range(1, 11)
+        }
+        events = [
+            {"type": "ITEM_PURCHASED", "participantId": rng.randrange(1, 11), "itemId": rng.randrange(1_000, 7_000),
+             "timestamp": minute * 60_000 + rng.randrange(60_000)}
+            for _ in range(rng.randrange(80, 200))
+        ]
+        frames.append({"events": events, "participantFrames": participant_frames, "timestamp": minute * 60_000})
+
+    return {
+        "metadata": {"matchId": match_id},
+        "info": {
+            "frameInterval": 60_000,
+            "frames": frames,
+            "participants": [{"participantId": participant_id} for participant_id in range(1, 11)],
+        },
+    }
+
+
+def iter_synthetic_matches(count: int, platform: str = "EUW1", seed: int = 0):
+    """
+    Lazily generate `count` match payloads, from thousands to millions of games.
+
+    Args:
+        count (int): Number of matches.
+        platform (str): Platform prefix of the match IDs.
+        seed (int): Base random seed.
+
+    Yields:
+        dict: Match payloads.
+    """
+    for index in range(count):
+        yield generate_match(synthetic_match_id(platform, index), seed=seed * 1_000_003 + index)
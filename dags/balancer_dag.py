@@ -0,0 +1,202 @@
+"""
+Airflow DAG of the collection and analysis pipeline.
+
+Collection fans out with dynamic task mapping: each league is split into chunks of players whose
+PUUIDs and match IDs are discovered in parallel, and the match IDs are split into chunks whose
+details are fetched in parallel. A failed chunk is retried on its own. Every task that calls the
+Riot API runs in the `riot_api` pool, sized to the key's rate budget. The aggregates and the
+per-role charts are mapped tasks as well.
+
+Stage outputs are exchanged through the checkpoints of `main.py`, with the logical date as run ID,
+so a DAG run can be resumed or inspected with `python main.py --run-id <date>`.
+
+Try it locally, on SQLite, from the repository root:
+    export AIRFLOW_HOME=$(pwd)/.airflow AIRFLOW__CORE__DAGS_FOLDER=$(pwd)/dags AIRFLOW__CORE__LOAD_EXAMPLES=False
+    airflow db migrate
+    airflow pools set riot_api 4 "Riot API rate budget"
+    airflow dags test league_balancer 2024-12-10
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+from airflow.decorators import dag, task
+
+# Tasks import the pipeline from the repository root and run from it, as its paths are relative
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+from main import AGGREGATES  # noqa: E402  (standard library imports only)
+
+# Pool of the tasks calling the Riot API. Each task process has its own rate limiter, kept in sync
+# with the key-wide counts reported by the API, so the pool bounds how many of them compete for the
+# budget at once (e.g. 4 slots for a development key's 20 requests per second).
+API_POOL = "riot_api"
+
+# Players per discovery chunk: one summoner request and up to MAX_MATCH_PAGES match ID pages each
+PLAYER_CHUNK_SIZE = 50
+
+# Match IDs per detail fetching chunk
+MATCH_CHUNK_SIZE = 500
+
+# Retries of a chunk, on top of the per-request retries of the API client
+CHUNK_RETRIES = 3
+CHUNK_RETRY_DELAY = timedelta(minutes=2)
+
+# Share of a chunk's match details that may stay missing (e.g. 404s, malformed payloads) before the
+# chunk fails and is retried. Below it, the missing IDs are logged and skipped, like in `main.py`.
+MAX_MISSING_FRACTION = 0.05
+
+
+def _run(ds: str):
+    # Pipeline state of the DAG run, read from and written to the checkpoints of main.py
+    os.chdir(PROJECT_DIR)
+    from main import Checkpoints, PipelineRun
+
+    return PipelineRun(ds, Checkpoints(ds))
+
+
+def _run_stage(stage: str, ds: str) -> None:
+    from main import STAGE_FUNCTIONS
+
+    run = _run(ds)
+    run.checkpoints.save(stage, STAGE_FUNCTIONS[stage](run))
+
+
+def _chunks(items: list, size: int) -> list:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+@dag(
+    dag_id="league_balancer",
+    schedule="@daily",
+    start_date=datetime(2024, 11, 1),
+    catchup=False,
+    max_active_runs=1,
+    default_args={"retries": 1, "retry_delay": timedelta(minutes=5)},
+    tags=["riot-api"],
+)
+def league_balancer():
+    @task
+    def leagues() -> list:
+        os.chdir(PROJECT_DIR)
+        from transform.regions import PLATFORMS, TIERS
+
+        return [{"platform": platform, "tier": tier} for platform in PLATFORMS for tier in TIERS]
+
+    @task(pool=API_POOL, retries=CHUNK_RETRIES, retry_delay=CHUNK_RETRY_DELAY)
+    def league_players(league: dict) -> list:
+        os.chdir(PROJECT_DIR)
+        from transform.fetch_players import get_summoners
+        from transform.regions import league_url
+
+        summoner_ids = get_summoners(league_url(league["platform"], league["tier"]))
+        if not summoner_ids:
+            raise RuntimeError(f"No players found in {league['platform']} {league['tier']}")
+        return [{**league, "summoner_ids": chunk} for chunk in _chunks(summoner_ids, PLAYER_CHUNK_SIZE)]
+
+    @task
+    def player_chunks(chunks_by_league: list) -> list:
+        return [chunk for chunks in chunks_by_league for chunk in chunks]
+
+    @task(pool=API_POOL, retries=CHUNK_RETRIES, retry_delay=CHUNK_RETRY_DELAY)
+    def discover_matches(chunk: dict) -> dict:
+        os.chdir(PROJECT_DIR)
+        from transform.fetch_players import get_all_matches, get_client, get_puuid
+
+        platform = chunk["platform"]
+        puuids = [puuid for puuid in get_client().map(lambda summoner_id: get_puuid(summoner_id, platform),
+                                                      chunk["summoner_ids"]) if puuid]
+        if not puuids:
+            raise RuntimeError(f"No PUUID resolved for {len(chunk['summoner_ids'])} players of {platform}")
+        return {"tier": chunk["tier"], "match_ids": get_all_matches(puuids, platform)}
+
+    @task
+    def match_chunks(discovered: list, ds=None) -> list:
+        from transform.regions import TIER_LEAGUES
+
+        # A match found in several tiers is tagged with the highest one
+        ranks = list(TIER_LEAGUES)
+        match_tiers = {}
+        for chunk in sorted(discovered, key=lambda chunk: ranks.index(chunk["tier"])):
+            for match_id in chunk["match_ids"]:
+                match_tiers.setdefault(match_id, chunk["tier"])
+
+        _run(ds).checkpoints.save("discover", match_tiers)
+        print(f"Total unique matches retrieved: {len(match_tiers)}")
+        return _chunks(list(match_tiers), MATCH_CHUNK_SIZE)
+
+    @task(pool=API_POOL, retries=CHUNK_RETRIES, retry_delay=CHUNK_RETRY_DELAY)
+    def fetch_details(match_ids: list) -> int:
+        os.chdir(PROJECT_DIR)
+        from transform.fetch_players import iter_match_details, match_cache
+
+        # Payloads land in the match cache, so a retry only requests the matches still missing
+        fetched = sum(1 for _ in iter_match_details(match_ids))
+        missing = match_cache.missing(match_ids)
+        if len(missing) > MAX_MISSING_FRACTION * len(match_ids):
+            raise RuntimeError(f"{len(missing)} of {len(match_ids)} match details could not be fetched")
+        if missing:
+            print(f"Skipping {len(missing)} of {len(match_ids)} match details that could not be fetched: "
+                  f"{', '.join(missing)}")
+        return fetched
+
+    @task
+    def flatten(fetched: list, ds=None) -> None:
+        _run(ds).checkpoints.save("fetch", {"items": sum(fetched)})
+        _run_stage("flatten", ds)
+
+    @task(pool=API_POOL, retries=CHUNK_RETRIES, retry_delay=CHUNK_RETRY_DELAY)
+    def timelines(ds=None) -> None:
+        _run_stage("timelines", ds)
+
+    @task
+    def enrich(ds=None) -> None:
+        _run_stage("enrich", ds)
+
+    @task
+    def features(ds=None) -> None:
+        _run_stage("features", ds)
+
+    @task
+    def aggregate(name: str, ds=None) -> None:
+        # The shared CSVs may be rewritten by an overlapping run: the run's own output is checkpointed
+        run = _run(ds)
+        run.checkpoints.save(f"aggregate.{name}", AGGREGATES[name](run))
+
+    @task
+    def aggregated(ds=None) -> None:
+        # Same checkpoint as the sequential stage, written once every mapped aggregate is done
+        checkpoints = _run(ds).checkpoints
+        checkpoints.save("aggregate", {name: checkpoints.load(f"aggregate.{name}")
+                                       for name in ("win_rates", "pick_ban_rates")})
+
+    @task
+    def chart_roles(ds=None) -> list:
+        return _run(ds).output("aggregate")["win_rates"]["role"].unique().tolist()
+
+    @task
+    def render(role: str, ds=None) -> list:
+        from analysis import plot_champion_win_rates
+        from main import analysis_window
+
+        # The whole table is passed, so colors and scales match the charts of the other roles.
+        # Charts show the window ending on the logical date, so a backfill does not overwrite today's charts.
+        run = _run(ds)
+        return plot_champion_win_rates(run.output("aggregate")["win_rates"], max_workers=1, roles=[role],
+                                       window=analysis_window(run))
+
+    players = player_chunks(league_players.expand(league=leagues()))
+    matches = match_chunks(discover_matches.expand(chunk=players))
+    flattened = flatten(fetch_details.expand(match_ids=matches))
+
+    enriched = enrich()
+    aggregates = aggregate.expand(name=list(AGGREGATES))
+    roles = chart_roles()
+    flattened >> [timelines(), features(), enriched]
+    enriched >> aggregates >> aggregated() >> roles
+    render.expand(role=roles)
+
+
+league_balancer()
@@ -1,38 +1,402 @@
-import pandas as pd
-from transform import (
-    get_all_puuids,
-    get_all_matches,
-    get_all_match_details,
-    save_matches_to_dataframe,
-    fetch_champion_mapping,
-    enrich_match_data,
-    calculate_win_rates,
-)
-from analysis import plot_champion_win_rates
-
-
-# Get summoner games on the past week
-summoner_puuids = get_all_puuids()
-summoner_matches = get_all_matches(summoner_puuids)
-all_match_details = get_all_match_details(summoner_matches)
-matches_df = save_matches_to_dataframe(all_match_details)
-matches_df.to_csv("datasets/summoner_matches.csv", index=False)
-
-print("Games data saved in 'datasets/summoner_matches.csv'")
-
-# Calculate winrates
-matches_df = pd.read_csv("datasets/summoner_matches.csv")
-champion_mapping = fetch_champion_mapping()
-matches_df = enrich_match_data(matches_df, champion_mapping)
-win_rate_df = calculate_win_rates(matches_df)
-matches_df.to_csv("datasets/detailed_matches.csv", index=False)
-win_rate_df.to_csv("datasets/champion_win_rates_by_role.csv", index=False)
-
-print("Detailled games data saved in 'datasets/detailed_matches.csv'.")
-print("Winrates for each champion and role saved in 'datasets/champion_win_rates_by_role.csv'.")
-
-# Visualization of the winrates on the past week
-winrates_df = pd.read_csv("datasets/champion_win_rates_by_role.csv")
-winrates_report = plot_champion_win_rates(winrates_df)
-
-print("Reports saved in 'reports/'")
\ No newline at end of file
+import argparse
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+# Pipeline stages, in execution order
+STAGES = ["discover", "fetch", "flatten", "timelines", "enrich", "aggregate", "features", "plot"]
+
+# Stage outputs of each run, by run ID
+CHECKPOINT_DIR = os.path.join("datasets", "checkpoints")
+SUCCESS_MARKER = "_SUCCESS"
+
+# Tables written by the aggregate stage
+WIN_RATES_PATH = os.path.join("datasets", "champion_win_rates_by_role.csv")
+PICK_BAN_RATES_PATH = os.path.join("datasets", "champion_pick_ban_rates.csv")
+
+
+class Checkpoints:
+    """
+    Saved stage outputs of one run, so that a failed run restarts at the failed stage.
+    JSON-serializable outputs are stored as JSON, DataFrames (or dicts of DataFrames) as Parquet.
+    """
+
+    def __init__(self, run_id: str, root: str = CHECKPOINT_DIR):
+        self.run_dir = os.path.join(root, run_id)
+
+    def path(self, stage: str) -> str:
+        return os.path.join(self.run_dir, stage)
+
+    def exists(self, stage: str) -> bool:
+        return os.path.exists(os.path.join(self.path(stage), SUCCESS_MARKER))
+
+    def save(self, stage: str, value) -> None:
+        import pandas as pd
+
+        stage_dir = self.path(stage)
+        if os.path.isdir(stage_dir):
+            shutil.rmtree(stage_dir)
+        os.makedirs(stage_dir)
+
+        if isinstance(value, pd.DataFrame):
+            value.to_parquet(os.path.join(stage_dir, "value.parquet"), index=False)
+        elif isinstance(value, dict) and value and all(isinstance(item, pd.DataFrame) for item in value.values()):
+            for key, frame in value.items():
+                frame.to_parquet(os.path.join(stage_dir, f"{key}.parquet"), index=False)
+        else:
+            with open(os.path.join(stage_dir, "value.json"), "w") as value_file:
+                json.dump(value, value_file)
+
+        open(os.path.join(stage_dir, SUCCESS_MARKER), "w").close()
+
+    def load(self, stage: str):
+        import pandas as pd
+
+        stage_dir = self.path(stage)
+        json_path = os.path.join(stage_dir, "value.json")
+        if os.path.exists(json_path):
+            with open(json_path) as value_file:
+                return json.load(value_file)
+
+        frames = {name[:-len(".parquet")]: pd.read_parquet(os.path.join(stage_dir, name))
+                  for name in sorted(os.listdir(stage_dir)) if name.endswith(".parquet")}
+        return frames["value"] if list(frames) == ["value"] else frames
+
+    def clear(self) -> None:
+        if os.path.isdir(self.run_dir):
+            shutil.rmtree(self.run_dir)
+
+
+class PipelineRun:
+    """
+    State of one run: outputs of the stages executed in this process, kept in memory,
+    with a fallback on the checkpoints of earlier executions.
+    """
+
+    def __init__(self, run_id: str, checkpoints: Checkpoints):
+        self.run_id = run_id
+        self.checkpoints = checkpoints
+        self.results = {}
+        # Stage records being timed, innermost last
+        self.timed_records = []
+
+    @contextmanager
+    def timed(self, record: dict):
+        """
+        Attribute the time spent in the block to `record` only: the enclosing timed record is
+        paused meanwhile, so a stage pulling items from a stream is not charged for producing them.
+
+        Args:
+            record (dict): Stage record yielded by `metrics.stage`.
+        """
+        from transform.metrics import metrics
+
+        parent = self.timed_records[-1] if self.timed_records else None
+        self.timed_records.append(record)
+        try:
+            if parent is None:
+                yield
+            else:
+                with metrics.paused(parent):
+                    yield
+        finally:
+            self.timed_records.pop()
+
+    def output(self, stage: str):
+        """
+        Return the output of a stage, from memory or from its checkpoint.
+        """
+        if stage not in self.results:
+            if not self.checkpoints.exists(stage):
+                raise RuntimeError(f"Stage '{stage}' has no checkpoint for run {self.run_id}, run it first.")
+            loader = STAGE_LOADERS.get(stage, lambda run: run.checkpoints.load(stage))
+            self.results[stage] = loader(self)
+        return self.results[stage]
+
+
+class StreamedOutput:
+    """
+    Output of a stage that is still being produced while a later stage consumes it.
+    Its checkpoint (`value`, or the item count) is written once the items are exhausted.
+    """
+
+    _END = object()
+
+    def __init__(self, run: PipelineRun, stage: str, items, value=None):
+        self.run = run
+        self.stage = stage
+        self.items = items
+        self.value = value
+        self.exhausted = False
+
+    def __iter__(self):
+        from transform.metrics import metrics
+
+        if self.exhausted:
+            return
+        count = 0
+        # Time spent producing the items, excluding the time the consumer spends on each one and the
+        # time upstream streams spend producing theirs. Recorded apart from the stage call itself.
+        with metrics.stage(f"pipeline.{self.stage}.stream") as record:
+            items = iter(self.items)
+            while True:
+                with self.run.timed(record):
+                    item = next(items, StreamedOutput._END)
+                if item is StreamedOutput._END:
+                    break
+                count += 1
+                with metrics.paused(record):
+                    yield item
+            record["rows"] = count
+        self.exhausted = True
+        self.run.checkpoints.save(self.stage, self.value if self.value is not None else {"items": count})
+
+
+def _match_tiers(run: PipelineRun) -> dict:
+    # Filled as discovery goes, when it streams into the fetch stage
+    discovered = run.output("discover")
+    return discovered.value if isinstance(discovered, StreamedOutput) else discovered
+
+
+# Stages. Heavy dependencies are imported inside each stage, only when it runs.
+
+def discover(run: PipelineRun) -> StreamedOutput:
+    from transform import PLATFORMS, TIERS, iter_new_match_ids
+
+    # Match IDs are streamed to the fetch stage as soon as they are first seen
+    match_tiers = {}
+    return StreamedOutput(run, "discover", iter_new_match_ids(PLATFORMS, TIERS, match_tiers), match_tiers)
+
+
+def fetch(run: PipelineRun) -> StreamedOutput:
+    from transform import iter_match_details, iter_streamed_match_details
+
+    # Payloads are streamed to the flatten stage; detail fetching overlaps with discovery when both run
+    discovered = run.output("discover")
+    if isinstance(discovered, StreamedOutput):
+        payloads = iter_streamed_match_details(iter(discovered))
+    else:
+        payloads = iter_match_details(list(discovered))
+    return StreamedOutput(run, "fetch", payloads)
+
+
+def load_fetch(run: PipelineRun):
+    from transform import iter_match_details
+
+    # Every payload of a completed fetch is in the match cache
+    return iter_match_details(list(_match_tiers(run)))
+
+
+def flatten(run: PipelineRun) -> dict:
+    from transform import write_match_dataset
+
+    payloads = run.output("fetch")
+    written = write_match_dataset(payloads, run.run_id, match_tiers=_match_tiers(run))
+    return {"collection_date": run.run_id, "written": written}
+
+
+def timelines(run: PipelineRun) -> dict:
+    from transform import iter_match_timelines, missing_timeline_ids, write_timeline_dataset
+
+    # Laning-phase gold, XP and CS of the matches whose timeline is not stored yet
+    match_ids = missing_timeline_ids(list(_match_tiers(run)))
+    written = write_timeline_dataset(iter_match_timelines(match_ids), run.run_id)
+    return {"written": written}
+
+
+def analysis_window(run: PipelineRun) -> list:
+    """
+    Return the game days (YYYY-MM-DD) of the run's analysis window, ending on its collection date.
+    """
+    from transform import HISTORY_DAYS
+    from transform.partials import window_days
+
+    return window_days(HISTORY_DAYS, date.fromisoformat(run.output("flatten")["collection_date"]))
+
+
+def enrich(run: PipelineRun):
+    from transform import enrich_match_data, load_table
+    from transform.partials import game_days
+
+    # Games played in the window, the same ones the pick/ban rates are summed over. They were
+    # collected on one of the window's days, but those dates also hold older games.
+    days = analysis_window(run)
+    games = load_table("matches", columns=["match_id", "game_creation"], dates=days)
+    played = games.loc[game_days(games['game_creation']).isin(days), 'match_id']
+    matches_df = load_table("participants", columns=["match_id", "team_id", "champion_id", "role", "win", "patch"],
+                            dates=days)
+    return enrich_match_data(matches_df[matches_df['match_id'].isin(played)].reset_index(drop=True))
+
+
+def aggregate_win_rates(run: PipelineRun):
+    from transform import calculate_win_rates
+
+    win_rate_df = calculate_win_rates(run.output("enrich"))
+    win_rate_df.to_csv(WIN_RATES_PATH, index=False)
+    print(f"Winrates for each champion and role saved in '{WIN_RATES_PATH}'.")
+    return win_rate_df
+
+
+def aggregate_pick_ban_rates(run: PipelineRun):
+    from transform import add_interval_columns, champion_names, query_rates
+
+    # Pick, ban and presence rates over the window, summed from the daily partial aggregates
+    pick_ban_df = query_rates(analysis_window(run))
+    pick_ban_df['champion_name'] = champion_names(pick_ban_df['champion_id'])
+    pick_ban_df = add_interval_columns(pick_ban_df, games_col="picks")
+    pick_ban_df.to_csv(PICK_BAN_RATES_PATH, index=False)
+    print(f"Pick, ban and presence rates saved in '{PICK_BAN_RATES_PATH}'.")
+    return pick_ban_df
+
+
+def aggregate_matchups(run: PipelineRun) -> str:
+    from transform import MatchupMatrices
+
+    # Lane matchups and teammate synergies of every champion pair
+    matchups_path = MatchupMatrices.from_participants(run.output("enrich")).save()
+    print(f"Matchup and synergy matrices saved in '{matchups_path}'.")
+    return matchups_path
+
+
+# Independent outputs of the aggregate stage, run one after the other here and in parallel by the DAG
+AGGREGATES = {
+    "win_rates": aggregate_win_rates,
+    "pick_ban_rates": aggregate_pick_ban_rates,
+    "matchups": aggregate_matchups,
+}
+
+
+def aggregate(run: PipelineRun) -> dict:
+    outputs = {name: function(run) for name, function in AGGREGATES.items()}
+    return {"win_rates": outputs["win_rates"], "pick_ban_rates": outputs["pick_ban_rates"]}
+
+
+def features(run: PipelineRun) -> dict:
+    from transform import DraftFeatureBuilder, load_table
+
+    # The draft design matrix grows with the matches collected by this run
+    collection_date = run.output("flatten")["collection_date"]
+    participants = load_table("participants", columns=["match_id", "team_id", "champion_id", "role", "win", "patch"],
+                              dates=[collection_date])
+    bans = load_table("bans", columns=["match_id", "champion_id"], dates=[collection_date])
+
+    builder = DraftFeatureBuilder.load()
+    added = builder.append(participants, bans)
+    features_dir = builder.save()
+    print(f"Draft feature matrix saved in '{features_dir}' ({added} new matches, {builder.n_features} features).")
+    return {"matches": added, "features": builder.n_features}
+
+
+def plot(run: PipelineRun) -> dict:
+    from analysis import plot_champion_win_rates
+
+    # Charts are titled with the aggregated window and named after its last day (the run's collection
+    # date), so re-running an older run does not overwrite today's
+    charts = plot_champion_win_rates(run.output("aggregate")["win_rates"], window=analysis_window(run))
+    print("Reports saved in 'reports/'")
+    return {"charts": charts}
+
+
+STAGE_FUNCTIONS = {
+    "discover": discover,
+    "fetch": fetch,
+    "flatten": flatten,
+    "timelines": timelines,
+    "enrich": enrich,
+    "aggregate": aggregate,
+    "features": features,
+    "plot": plot,
+}
+
+STAGE_LOADERS = {
+    "fetch": load_fetch,
+}
+
+
+def run_pipeline(stages: list, run_id: str, restart: bool = False) -> PipelineRun:
+    """
+    Run the given stages in order, handing outputs over in memory and checkpointing each one.
+
+    Args:
+        stages (list): Stages to run, in order.
+        run_id (str): Run identifier. It is also the collection date of the run (YYYY-MM-DD).
+        restart (bool): Discard the checkpoints of the run before starting.
+
+    Returns:
+        PipelineRun: The run state, with the output of every executed stage.
+    """
+    from transform.metrics import metrics
+
+    checkpoints = Checkpoints(run_id)
+    if restart:
+        checkpoints.clear()
+    run = PipelineRun(run_id, checkpoints)
+
+    for stage in stages:
+        print(f"[{run_id}] Running stage '{stage}'...")
+        # Streamed stages only start here; their items are timed as they are produced
+        with metrics.stage(f"pipeline.{stage}") as record, run.timed(record):
+            output = STAGE_FUNCTIONS[stage](run)
+            run.results[stage] = output
+            if not isinstance(output, StreamedOutput):
+                checkpoints.save(stage, output)
+
+    # Streamed outputs that no later stage consumed are drained (the last one pulls the earlier ones),
+    # so their checkpoints are written
+    for stage in reversed(stages):
+        if isinstance(run.results[stage], StreamedOutput):
+            for _ in run.results[stage]:
+                pass
+
+    # Run report: request latency, 429s, backoff and stage timings
+    json_path, prometheus_path = metrics.export("reports")
+    print(f"Run report saved in '{json_path}' and '{prometheus_path}'")
+    return run
+
+
+def select_stages(args, checkpoints: Checkpoints) -> list:
+    """
+    Resolve the stages to run from the command line arguments.
+    By default, a run resumes at its first stage without a checkpoint.
+    """
+    if args.stages:
+        return [stage for stage in STAGES if stage in args.stages]
+
+    last = STAGES.index(args.to)
+    if args.start:
+        first = STAGES.index(args.start)
+    elif args.restart:
+        first = 0
+    else:
+        pending = [index for index, stage in enumerate(STAGES) if not checkpoints.exists(stage)]
+        first = pending[0] if pending else len(STAGES)
+    return STAGES[first:last + 1]
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description="League of Legends Balancer pipeline.")
+    parser.add_argument("stages", nargs="*", metavar="stage",
+                        help=f"Stages to run ({', '.join(STAGES)}). Earlier stages are read from checkpoints.")
+    parser.add_argument("--from", dest="start", choices=STAGES, help="First stage to run")
+    parser.add_argument("--to", choices=STAGES, default=STAGES[-1], help="Last stage to run")
+    parser.add_argument("--run-id", default=datetime.now(timezone.utc).date().isoformat(),
+                        help="Run identifier and collection date (YYYY-MM-DD). Defaults to today (UTC).")
+    parser.add_argument("--restart", action="store_true", help="Discard the checkpoints of the run")
+    args = parser.parse_args(argv)
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+
+    checkpoints = Checkpoints(args.run_id)
+    stages = select_stages(args, checkpoints)
+    if not stages:
+        print(f"[{args.run_id}] Every stage is already complete. Use --restart to run again.")
+        return
+    run_pipeline(stages, args.run_id, restart=args.restart)
+
+
+# Guard needed by the report rendering process pool
+if __name__ == "__main__":
+    main()
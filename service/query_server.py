@@ -0,0 +1,337 @@
+"""
+Local HTTP query service over the partial aggregates.
+
+Usage:
+    python -m service.query_server --port 8000
+    curl "http://127.0.0.1:8000/rates?champion=Ahri&role=MIDDLE&region=europe&tier=CHALLENGER&window=7"
+"""
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from transform.fetch_champions import add_ban_counts, add_rate_columns
+from transform.partials import AGGREGATES_DIR, ingest_version, load_partials, utc_today, window_days
+from transform.regions import PLATFORM_ROUTING
+from transform.static_data import champion_names, stored_versions
+from transform.stats import add_interval_columns
+
+# Query results kept in memory, least recently used first out
+CACHE_SIZE = 1024
+
+# Query string parameters; every one but `window` and `end` takes comma-separated values
+FILTERS = ("champion", "role", "region", "tier", "patch", "window", "end")
+
+# Longest window accepted, in days
+MAX_WINDOW_DAYS = 3650
+
+
+class QueryError(ValueError):
+    """Invalid query parameters."""
+
+
+class AggregateIndex:
+    """
+    In-memory copy of the partial aggregates, with the dimensions stored as categoricals
+    so filters are boolean masks over a few arrays.
+
+    Args:
+        root (str): Root directory of the aggregate store.
+    """
+
+    def __init__(self, root: str = AGGREGATES_DIR):
+        self.version = ingest_version(root)
+        self.tables = {}
+        for name in ("champions", "bans", "matches"):
+            frame = load_partials(name, root=root)
+            for column in ("day", "patch", "platform", "tier", "role"):
+                if column in frame:
+                    frame[column] = frame[column].astype(str).astype("category")
+            self.tables[name] = frame
+
+        # Champion names from the local Data Dragon store only, so the service never goes online
+        versions = stored_versions()
+        champion_ids = np.unique(np.concatenate([self.tables["champions"]["champion_id"].to_numpy(dtype=np.int64),
+                                                 self.tables["bans"]["champion_id"].to_numpy(dtype=np.int64)]))
+        names = champion_names(champion_ids, versions[0]) if versions else np.full(len(champion_ids), None)
+        self.names = {champion_id: name for champion_id, name in zip(champion_ids.tolist(), names) if name}
+        self.ids_by_name = {name.lower(): champion_id for champion_id, name in self.names.items()}
+
+    def query(self, filters: dict) -> dict:
+        """
+        Sum the partials matching the filters into pick, ban, presence and win rates.
+
+        Args:
+            filters (dict): Normalized filters (see `parse_filters`).
+
+        Returns:
+            dict: The query, its total number of matches and one row per champion and role.
+        """
+        champion_ids = self._champion_ids(filters.get("champion"))
+        champions = self._filter("champions", filters, champion_ids)
+        bans = self._filter("bans", filters, champion_ids)
+        matches = self._filter("matches", filters, None)
+        total_matches = int(matches["matches"].sum())
+
+        rates = (champions.groupby(["champion_id", "role"], observed=True)[["picks", "wins"]].sum()
+                 .reset_index())
+        rates["role"] = rates["role"].astype(str)
+        # Bans are split over every role of a champion before the role filter keeps some of them
+        rates = add_ban_counts(rates, bans.groupby("champion_id")["bans"].sum())
+        if filters.get("role"):
+            rates = rates[rates["role"].isin(filters["role"])].reset_index(drop=True)
+        rates = add_interval_columns(add_rate_columns(rates, total_matches), games_col="picks", resamples=0)
+        rates.insert(1, "champion_name", rates["champion_id"].map(self.names))
+        rates = rates.sort_values(["picks", "champion_id"], ascending=[False, True])
+
+        return {
+            "query": {key: list(value) if isinstance(value, tuple) else value for key, value in filters.items()},
+            "version": self.version,
+            "total_matches": total_matches,
+            "rows": json.loads(rates.round(3).to_json(orient="records")),
+        }
+
+    def _champion_ids(self, champions: tuple) -> list:
+        if not champions:
+            return None
+        ids = []
+        for champion in champions:
+            if champion.isdigit():
+                ids.append(int(champion))
+            elif champion.lower() in self.ids_by_name:
+                ids.append(self.ids_by_name[champion.lower()])
+            else:
+                raise QueryError(f"Unknown champion: {champion}")
+        return ids
+
+    def _filter(self, name: str, filters: dict, champion_ids: list):
+        frame = self.tables[name]
+        mask = np.ones(len(frame), dtype=bool)
+        if filters.get("window"):
+            end_date = date.fromisoformat(filters["end"]) if filters.get("end") else None
+            mask &= frame["day"].isin(window_days(filters["window"], end_date)).to_numpy()
+        if filters.get("patch"):
+            mask &= frame["patch"].isin(filters["patch"]).to_numpy()
+        if filters.get("region"):
+            mask &= frame["platform"].isin(filters["region"]).to_numpy()
+        if filters.get("tier"):
+            mask &= frame["tier"].isin(filters["tier"]).to_numpy()
+        if champion_ids is not None and "champion_id" in frame:
+            mask &= frame["champion_id"].isin(champion_ids).to_numpy()
+        return frame[mask]
+
+
+def parse_filters(query_string: str) -> dict:
+    """
+    Parse and normalize the filters of a query string, so equivalent queries share a cache entry.
+    Regions are platforms ("euw1") or regional routes ("europe", expanded to their platforms).
+
+    Args:
+        query_string (str): URL query string.
+
+    Returns:
+        dict: Filter name -> sorted tuple of values (`window`: int, `end`: YYYY-MM-DD).
+
+    Raises:
+        QueryError: If a parameter is unknown or invalid.
+    """
+    params = parse_qs(query_string)
+    unknown = sorted(set(params) - set(FILTERS))
+    if unknown:
+        raise QueryError(f"Unknown parameter(s): {', '.join(unknown)}")
+
+    filters = {}
+    for name, values in params.items():
+        values = [value.strip() for raw in values for value in raw.split(",") if value.strip()]
+        if not values:
+            continue
+        if name == "window":
+            if not values[0].isdigit() or int(values[0]) < 1:
+                raise QueryError("window must be a positive number of days")
+            if int(values[0]) > MAX_WINDOW_DAYS:
+                raise QueryError(f"window must be at most {MAX_WINDOW_DAYS} days")
+            filters[name] = int(values[0])
+        elif name == "end":
+            try:
+                filters[name] = date.fromisoformat(values[0]).isoformat()
+            except ValueError:
+                raise QueryError("end must be a date (YYYY-MM-DD)")
+        elif name == "region":
+            platforms = set()
+            for value in values:
+                value = value.lower()
+                routed = [platform for platform, route in PLATFORM_ROUTING.items() if route == value]
+                if not routed and value not in PLATFORM_ROUTING:
+                    raise QueryError(f"Unknown region: {value}")
+                platforms.update(routed or [value])
+            filters[name] = tuple(sorted(platforms))
+        elif name in ("role", "tier"):
+            filters[name] = tuple(sorted(value.upper() for value in values))
+        else:
+            filters[name] = tuple(sorted(values))
+    if filters.get("window") and filters.get("end") and date.fromisoformat(filters["end"]).toordinal() <= filters["window"]:
+        raise QueryError("window must not start before year 1")
+    return filters
+
+
+class QueryService:
+    """
+    Query answering with an LRU cache of serialized responses and their ETags.
+    The index and the cache are rebuilt as soon as an ingest marks the partials as changed.
+
+    Args:
+        root (str): Root directory of the aggregate store.
+        cache_size (int): Number of cached responses.
+    """
+
+    def __init__(self, root: str = AGGREGATES_DIR, cache_size: int = CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.index = AggregateIndex(root)
+        self.cache = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def current_index(self) -> AggregateIndex:
+        """
+        Return the index, reloading it if an ingest finished since it was built.
+        """
+        version = ingest_version(self.root)
+        with self.lock:
+            if version != self.index.version:
+                self.index = AggregateIndex(self.root)
+                self.cache.clear()
+                self.stats["reloads"] += 1
+            return self.index
+
+    def rates(self, query_string: str) -> tuple:
+        """
+        Answer a rates query.
+
+        Args:
+            query_string (str): URL query string.
+
+        Returns:
+            tuple: (ETag, JSON body as bytes).
+        """
+        filters = parse_filters(query_string)
+        # A window without an end date ends today (UTC, like game days): resolve it so the cache key
+        # changes at midnight
+        if filters.get("window") and not filters.get("end"):
+            filters["end"] = utc_today().isoformat()
+        index = self.current_index()
+        key = (index.version, tuple(sorted(filters.items())))
+
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.cache[key]
+
+        body = json.dumps(index.query(filters)).encode("utf-8")
+        entry = (f'"{hashlib.sha1(body).hexdigest()}"', body)
+        with self.lock:
+            self.stats["misses"] += 1
+            self.cache[key] = entry
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return entry
+
+    def health(self) -> dict:
+        """
+        Return the index version, its size and the cache statistics.
+        """
+        index = self.current_index()
+        with self.lock:
+            return {
+                "version": index.version,
+                "rows": {name: len(frame) for name, frame in index.tables.items()},
+                "cache": {"entries": len(self.cache), **self.stats},
+            }
+
+
+def make_server(service: QueryService, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """
+    Build the HTTP server of a query service.
+
+    Args:
+        service (QueryService): The query service.
+        host (str): Interface to listen on.
+        port (int): Port to listen on (0 picks a free port).
+
+    Returns:
+        ThreadingHTTPServer: The server, not started yet.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path not in ("/health", "/rates"):
+                self._send(404, b'{"error": "Not found"}')
+                return
+
+            # Any failure is answered, so the client never sees the connection drop
+            try:
+                if parsed.path == "/health":
+                    self._send(200, json.dumps(service.health()).encode("utf-8"))
+                    return
+                etag, body = service.rates(parsed.query)
+            except QueryError as e:
+                self._send(400, json.dumps({"error": str(e)}).encode("utf-8"))
+                return
+            except Exception as e:
+                print(f"Error answering {self.path}: {e!r}")
+                self._send(500, json.dumps({"error": "Internal server error"}).encode("utf-8"))
+                return
+
+            if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                self._send(304, b"", etag)
+                return
+            self._send(200, body, etag)
+
+        def _send(self, status: int, body: bytes, etag: str = None):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            if status != 304:
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--root", default=AGGREGATES_DIR, help="Root directory of the partial aggregates")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="Number of cached responses")
+    args = parser.parse_args(argv)
+
+    server = make_server(QueryService(args.root, args.cache_size), args.host, args.port)
+    print(f"Query service listening on http://{args.host}:{server.server_address[1]}/rates")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
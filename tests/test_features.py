@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from transform.features import DraftFeatureBuilder
+from transform.matchups import LANE_ROLES
+
+
+def _team(match_id, team_id, champion_ids, win):
+    return [{"match_id": match_id, "team_id": team_id, "champion_id": champion_id, "role": role,
+             "win": win, "patch": "14.23"}
+            for champion_id, role in zip(champion_ids, LANE_ROLES)]
+
+
+def test_matrix_rows_and_labels():
+    participants = pd.DataFrame(
+        _team("EUW1_1", 100, [1, 2, 3, 4, 5], True) + _team("EUW1_1", 200, [6, 7, 8, 9, 10], False)
+        + _team("EUW1_2", 100, [1, 12, 13, 14, 15], False) + _team("EUW1_2", 200, [16, 17, 18, 19, 20], True)
+        # Red side only: no blue rows to take the label from
+        + _team("EUW1_3", 200, [1, 2, 3, 4, 5], True)
+        # Blue side missing a participant
+        + _team("EUW1_4", 100, [1, 2, 3, 4], True) + _team("EUW1_4", 200, [6, 7, 8, 9, 10], False)
+    )
+    bans = pd.DataFrame({"match_id": ["EUW1_1", "EUW1_1", "EUW1_2", "EUW1_3"], "champion_id": [30, 30, 31, 32]})
+
+    builder = DraftFeatureBuilder()
+    assert builder.append(participants, bans) == 2
+
+    matrix = builder.matrix()
+    assert builder.match_ids == ["EUW1_1", "EUW1_2"]
+    assert builder.labels().tolist() == [1, 0]
+    assert matrix.shape == (2, builder.n_features)
+    # 10 picks, the bans (one feature when both teams ban a champion) and the patch
+    assert np.diff(matrix.indptr).tolist() == [12, 12]
+    assert (matrix.data == 1).all()
+
+    names = np.asarray(builder.feature_names())
+    first = set(names[matrix.indices[matrix.indptr[0]:matrix.indptr[1]]])
+    assert {"pick:blue:TOP:1", "pick:red:UTILITY:10", "ban:30", "patch:14.23"} <= first
+    second = set(names[matrix.indices[matrix.indptr[1]:matrix.indptr[2]]])
+    assert {"pick:blue:TOP:1", "pick:red:TOP:16", "ban:31"} <= second
+    assert "ban:32" not in names
+
+
+def test_incomplete_batch_adds_nothing():
+    builder = DraftFeatureBuilder()
+    assert builder.append(pd.DataFrame(_team("EUW1_3", 200, [1, 2, 3, 4, 5], True))) == 0
+    assert builder.matrix().shape == (0, 0)
+    assert builder.labels().tolist() == []
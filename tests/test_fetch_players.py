@@ -0,0 +1,42 @@
+import pytest
+
+from transform import fetch_players
+from transform.match_cache import MatchCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    match_cache = MatchCache(str(tmp_path / "match_cache.sqlite"))
+    monkeypatch.setattr(fetch_players, "match_cache", match_cache)
+    monkeypatch.setattr(fetch_players, "RIOT_API_KEY", "test")
+    monkeypatch.setattr(fetch_players, "_client", None)
+    return match_cache
+
+
+def _payload(match_id):
+    return {"metadata": {"matchId": match_id}}
+
+
+def test_dispatcher_reads_the_cache_in_batches(cache, monkeypatch):
+    match_ids = [f"EUW1_{index}" for index in range(250)] + ["KR_1", "KR_2"]
+    for match_id in match_ids[:200]:
+        cache.put(match_id, _payload(match_id))
+
+    lookups = []
+    get_many = cache.get_many
+    monkeypatch.setattr(cache, "get_many", lambda batch: lookups.append(len(batch)) or get_many(batch))
+    monkeypatch.setattr(cache, "get", lambda match_id: pytest.fail("looked up one match at a time"))
+
+    def fetch(match_id):
+        if match_id == "KR_2":
+            raise ValueError("malformed payload")
+        return _payload(match_id)
+
+    counts = {"hits": 0, "misses": 0}
+    # Consumed from a generator, like the IDs streamed from discovery
+    fetched = list(fetch_players._iter_details_by_region((match_id for match_id in match_ids), counts, fetch))
+
+    assert lookups == [100, 100, 52]
+    assert counts == {"hits": 200, "misses": 52}
+    ids = sorted(match_data["metadata"]["matchId"] for match_data in fetched if match_data)
+    assert ids == sorted(match_ids[:-1])
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+from transform import match_cache
+from transform.match_cache import LOOKUP_BATCH_SIZE, MatchCache
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = SimpleNamespace(now=100 * DAY)
+    monkeypatch.setattr(match_cache, "time", SimpleNamespace(time=lambda: fake_clock.now))
+    return fake_clock
+
+
+def _payload(match_id):
+    return {"metadata": {"matchId": match_id}, "info": {"gameDuration": 1800, "participants": [{"win": True}]}}
+
+
+def _cached_ids(cache):
+    return sorted(match_id for (match_id,) in cache._connection().execute("SELECT match_id FROM matches"))
+
+
+def test_round_trip_and_replace(tmp_path):
+    cache = MatchCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get("EUW1_1") is None
+
+    cache.put("EUW1_1", _payload("EUW1_1"))
+    assert cache.get("EUW1_1") == _payload("EUW1_1")
+
+    cache.put("EUW1_1", {"metadata": {"matchId": "EUW1_1"}})
+    assert cache.get("EUW1_1") == {"metadata": {"matchId": "EUW1_1"}}
+    assert _cached_ids(cache) == ["EUW1_1"]
+
+
+def test_batched_lookups(tmp_path):
+    cache = MatchCache(str(tmp_path / "cache.sqlite"))
+    match_ids = [f"EUW1_{index}" for index in range(LOOKUP_BATCH_SIZE * 2 + 10)]
+    cached = match_ids[::3]
+    for match_id in cached:
+        cache.put(match_id, _payload(match_id))
+
+    assert dict(cache.iter_many(match_ids)) == {match_id: _payload(match_id) for match_id in cached}
+    assert cache.get_many(match_ids) == dict(cache.iter_many(match_ids))
+    # Missing IDs keep their order, across batches
+    assert cache.missing(match_ids) == [match_id for match_id in match_ids if match_id not in cached]
+    assert cache.missing([]) == []
+
+
+def test_evicts_expired_entries(tmp_path, clock):
+    cache = MatchCache(str(tmp_path / "cache.sqlite"), max_age_days=30)
+    cache.put("EUW1_old", _payload("EUW1_old"))
+    clock.now += 20 * DAY
+    cache.put("EUW1_recent", _payload("EUW1_recent"))
+    clock.now += 15 * DAY
+
+    assert cache.evict() == 1
+    assert _cached_ids(cache) == ["EUW1_recent"]
+
+
+def test_evicts_oldest_entries_beyond_the_size_limit(tmp_path, clock):
+    cache = MatchCache(str(tmp_path / "cache.sqlite"))
+    for index in range(4):
+        cache.put(f"EUW1_{index}", _payload(f"EUW1_{index}"))
+        clock.now += 1
+    # Refreshed entries count as recent
+    clock.now += 1
+    cache.put("EUW1_0", _payload("EUW1_0"))
+
+    sizes = dict(cache._connection().execute("SELECT match_id, size FROM matches"))
+    # Room for the two most recently fetched entries only
+    cache.max_size_mb = (sizes["EUW1_0"] + sizes["EUW1_3"] + 0.5) / (1024 * 1024)
+
+    assert cache.evict() == 2
+    assert _cached_ids(cache) == ["EUW1_0", "EUW1_3"]
+    assert cache.evict() == 0
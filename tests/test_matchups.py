@@ -0,0 +1,73 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from transform.matchups import LANE_ROLES, MatchupMatrices
+
+
+def _toy_participants(n_matches, seed, pool=12):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for match in range(n_matches):
+        blue_won = bool(rng.integers(2))
+        # A small pool, so pairs repeat across matches
+        champions = rng.choice(np.arange(1, pool + 1), size=10, replace=False)
+        for slot, champion_id in enumerate(champions):
+            role = LANE_ROLES[slot % 5]
+            # Some participants have no known lane
+            if rng.random() < 0.1:
+                role = None
+            rows.append({"match_id": f"EUW1_{seed}_{match}", "team_id": 100 if slot < 5 else 200,
+                         "champion_id": int(champion_id), "role": role, "win": blue_won == (slot < 5)})
+    return pd.DataFrame(rows)
+
+
+def _brute_force(participants, champion_ids):
+    position = {champion_id: index for index, champion_id in enumerate(champion_ids)}
+    size = len(champion_ids)
+    matchup_games = np.zeros((len(LANE_ROLES), size, size), dtype=np.int64)
+    matchup_wins = np.zeros_like(matchup_games)
+    synergy_games = np.zeros((size, size), dtype=np.int64)
+    synergy_wins = np.zeros_like(synergy_games)
+
+    for _, match in participants.groupby("match_id"):
+        players = match.to_dict("records")
+        for player, other in itertools.permutations(players, 2):
+            row, column = position[player["champion_id"]], position[other["champion_id"]]
+            if player["team_id"] == other["team_id"]:
+                synergy_games[row, column] += 1
+                synergy_wins[row, column] += player["win"]
+            elif player["role"] is not None and player["role"] == other["role"]:
+                lane = LANE_ROLES.index(player["role"])
+                matchup_games[lane, row, column] += 1
+                matchup_wins[lane, row, column] += player["win"]
+    return matchup_games, matchup_wins, synergy_games, synergy_wins
+
+
+def test_matrices_match_a_brute_force_count():
+    # The second batch brings champions the first did not have, growing the matrices
+    batches = [_toy_participants(30, seed=1, pool=10), _toy_participants(30, seed=2)]
+    matrices = MatchupMatrices.from_participants(batches[0]).update(batches[1])
+    participants = pd.concat(batches, ignore_index=True)
+    expected = _brute_force(participants, matrices.champion_ids.tolist())
+
+    assert matrices.champion_ids.tolist() == sorted(participants["champion_id"].unique())
+    np.testing.assert_array_equal(matrices.matchup_games, expected[0])
+    np.testing.assert_array_equal(matrices.matchup_wins, expected[1])
+    np.testing.assert_array_equal(matrices.synergy_games, expected[2])
+    np.testing.assert_array_equal(matrices.synergy_wins, expected[3])
+    assert matrices.matchup_games.sum() > 0
+
+
+def test_matchups_frame_reads_the_matrices():
+    participants = _toy_participants(40, seed=3)
+    matrices = MatchupMatrices.from_participants(participants)
+    champion_id = int(participants["champion_id"].iloc[0])
+
+    frame = matrices.matchups(champion_id, role="MIDDLE")
+    lane, position = LANE_ROLES.index("MIDDLE"), matrices._position(champion_id)
+    opponents = matrices.champion_ids[np.flatnonzero(matrices.matchup_games[lane, position])]
+    assert sorted(frame["opponent_id"]) == sorted(opponents.tolist())
+    assert (frame["games"] >= frame["wins"]).all()
+    assert frame["games"].sum() == matrices.matchup_games[lane, position].sum()
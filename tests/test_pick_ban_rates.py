@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from transform.fetch_champions import NO_PICK_ROLE, calculate_pick_ban_rates
+
+
+def _matches():
+    # Champion 1 is picked as TOP in m1 and m2, as MIDDLE in m3 and banned in m4.
+    # Champion 9 is banned in every game and never picked.
+    picks = pd.DataFrame({
+        "match_id": ["m1", "m2", "m3", "m4", "m1", "m2", "m3", "m4"],
+        "champion_id": [1, 1, 1, 3, 2, 2, 2, 2],
+        "role": ["TOP", "TOP", "MIDDLE", "TOP", "JUNGLE", "JUNGLE", "JUNGLE", "JUNGLE"],
+        "win": [True, False, True, False, False, True, False, True],
+    })
+    bans = pd.DataFrame({
+        "match_id": ["m1", "m2", "m3", "m4", "m4"],
+        "champion_id": [9, 9, 9, 9, 1],
+    })
+    return picks, bans
+
+
+def test_banned_only_champion_is_reported():
+    rates = calculate_pick_ban_rates(*_matches())
+    banned = rates[rates["champion_id"] == 9]
+
+    assert len(banned) == 1
+    assert banned["role"].iloc[0] == NO_PICK_ROLE
+    assert banned["picks"].iloc[0] == 0
+    assert banned["ban_rate"].iloc[0] == 100
+    assert banned["presence"].iloc[0] == 100
+
+
+def test_bans_are_split_across_roles():
+    rates = calculate_pick_ban_rates(*_matches()).set_index(["champion_id", "role"])
+
+    assert rates.loc[(1, "TOP"), "bans"] == pytest.approx(2 / 3)
+    assert rates.loc[(1, "MIDDLE"), "bans"] == pytest.approx(1 / 3)
+    assert rates.loc[1, "bans"].sum() == pytest.approx(1)
+    assert rates.loc[1, "presence"].sum() == pytest.approx(100)
+    assert rates.loc[1, "champion_presence"].tolist() == pytest.approx([100, 100])
+
+
+def test_presence_never_exceeds_every_game():
+    rates = calculate_pick_ban_rates(*_matches())
+
+    assert (rates["champion_presence"] <= 100).all()
+    assert (rates.groupby("champion_id")["presence"].sum() <= 100 + 1e-9).all()
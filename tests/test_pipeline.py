@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+import main
+from transform.metrics import metrics
+
+
+@pytest.fixture
+def streamed_stages(tmp_path, monkeypatch):
+    # discover streams into fetch, which streams into flatten, as in the real pipeline
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(metrics, "stages", [])
+
+    def discover(run):
+        return main.StreamedOutput(run, "discover", iter(range(3)))
+
+    def fetch(run):
+        def produce():
+            for item in run.output("discover"):
+                time.sleep(0.1)
+                yield item
+        return main.StreamedOutput(run, "fetch", produce())
+
+    def flatten(run):
+        return {"items": sum(1 for _ in run.output("fetch"))}
+
+    monkeypatch.setitem(main.STAGE_FUNCTIONS, "discover", discover)
+    monkeypatch.setitem(main.STAGE_FUNCTIONS, "fetch", fetch)
+    monkeypatch.setitem(main.STAGE_FUNCTIONS, "flatten", flatten)
+
+
+def test_streamed_stages_are_recorded_once_each(streamed_stages):
+    main.run_pipeline(["discover", "fetch", "flatten"], "2024-12-10")
+    records = {record["stage"]: record for record in metrics.stages}
+
+    names = [record["stage"] for record in metrics.stages]
+    assert sorted(names) == sorted(set(names))
+    assert records["pipeline.fetch.stream"]["rows"] == 3
+    # Fetch latency is charged to the stream producing the items, not to the stage pulling them
+    assert records["pipeline.fetch.stream"]["seconds"] >= 0.3
+    assert records["pipeline.flatten"]["seconds"] < 0.1
@@ -0,0 +1,94 @@
+import http.client
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+from service import query_server
+from service.query_server import MAX_WINDOW_DAYS, QueryError, QueryService, make_server, parse_filters
+from transform.partials import mark_ingest, write_partials
+
+
+def test_parse_filters_normalizes_values():
+    filters = parse_filters("role=middle,top&tier=challenger&region=europe&window=7&end=2024-12-10")
+
+    assert filters["role"] == ("MIDDLE", "TOP")
+    assert filters["tier"] == ("CHALLENGER",)
+    assert "euw1" in filters["region"]
+    assert filters["window"] == 7
+    assert filters["end"] == "2024-12-10"
+
+
+@pytest.mark.parametrize("query_string", [
+    "colour=blue",
+    "window=0",
+    "window=abc",
+    f"window={MAX_WINDOW_DAYS + 1}",
+    "window=100000000",
+    "window=10&end=0001-01-05",
+    "end=10/12/2024",
+    "region=atlantis",
+])
+def test_parse_filters_rejects_invalid_values(query_string):
+    with pytest.raises(QueryError):
+        parse_filters(query_string)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # No Data Dragon store in the working directory: champions are only known by ID
+    monkeypatch.chdir(tmp_path)
+    root = str(tmp_path / "aggregates")
+    tags = {"day": "2024-12-10", "patch": "14.24", "platform": "euw1", "tier": "CHALLENGER"}
+    write_partials({
+        "champions": pd.DataFrame([{**tags, "champion_id": 103, "role": "MIDDLE", "picks": 4, "wins": 3}]),
+        "bans": pd.DataFrame([{**tags, "champion_id": 103, "bans": 2}]),
+        "matches": pd.DataFrame([{**tags, "matches": 10}]),
+    }, root)
+    mark_ingest(root)
+
+    server = make_server(QueryService(root), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, path, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_rates_and_not_modified(server):
+    status, headers, body = _get(server, "/rates?champion=103&window=7&end=2024-12-10")
+    assert status == 200
+    rows = json.loads(body)["rows"]
+    assert [(row["champion_id"], row["picks"], row["bans"]) for row in rows] == [(103, 4, 2)]
+
+    status, _, body = _get(server, "/rates?champion=103&window=7&end=2024-12-10",
+                           {"If-None-Match": headers["ETag"]})
+    assert status == 304
+    assert body == b""
+
+
+def test_invalid_query_gets_400(server):
+    status, _, body = _get(server, "/rates?window=100000000")
+    assert status == 400
+    assert "window" in json.loads(body)["error"]
+
+
+def test_unexpected_error_gets_500(server, monkeypatch):
+    def broken(self, filters):
+        raise OSError("partials swapped while reading")
+
+    monkeypatch.setattr(query_server.AggregateIndex, "query", broken)
+    status, _, body = _get(server, "/rates?window=7")
+    assert status == 500
+    assert json.loads(body) == {"error": "Internal server error"}
@@ -0,0 +1,136 @@
+import pytest
+import requests
+
+from transform import riot_client
+from transform.riot_client import MAX_RETRIES, RateLimiter, RiotClient, parse_rate_limits
+
+
+class FakeClock:
+    """Stands in for the `time` module, so waits and penalties advance a fake clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """Answers each GET with the next queued response, raising queued exceptions."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None, stream=False):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(riot_client, "time", fake_clock)
+    return fake_clock
+
+
+def _client(responses):
+    client = RiotClient("test")
+    client.session = FakeSession(responses)
+    return client
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("20:1,100:120") == [(20, 1), (100, 120)]
+    assert parse_rate_limits("") == []
+    assert parse_rate_limits(None) == []
+
+
+def test_update_replaces_limits_and_syncs_counts(clock):
+    limiter = RateLimiter("20:1,100:120")
+    limiter.acquire("match-v5.match")
+
+    limiter.update("match-v5.match", {
+        "X-App-Rate-Limit": "50:10,100:120",
+        "X-App-Rate-Limit-Count": "1:10,40:120",
+        "X-Method-Rate-Limit": "3:10",
+        "X-Method-Rate-Limit-Count": "3:10",
+    })
+
+    assert [(window.limit, window.seconds) for window in limiter.app_windows] == [(50, 10), (100, 120)]
+    # The 120s window keeps its request and counts the ones made by other processes
+    assert [len(window.timestamps) for window in limiter.app_windows] == [1, 40]
+    assert len(limiter.method_windows["match-v5.match"][0].timestamps) == 3
+
+    # The method window is full: the next request waits for it, other methods do not
+    limiter.acquire("match-v5.ids")
+    assert clock.sleeps == []
+    limiter.acquire("match-v5.match")
+    assert clock.sleeps == [10.0]
+
+
+@pytest.mark.parametrize("limit_type, method_scoped", [("method", True), ("application", False)])
+def test_retry_after_penalizes_the_limited_scope(clock, limit_type, method_scoped):
+    client = _client([
+        FakeResponse(429, {"Retry-After": "7", "X-Rate-Limit-Type": limit_type}),
+        FakeResponse(200),
+    ])
+    url = "https://europe.api.riotgames.com/lol/match/v5/matches/EUW1_1"
+
+    response = client.get(url, "match-v5.match")
+
+    assert response.status_code == 200
+    assert client.session.calls == 2
+    # The retry waited for the penalty instead of backing off
+    assert clock.sleeps == [7.0]
+    limiter = client.limiter_for(url)
+    if method_scoped:
+        assert limiter.method_blocked_until["match-v5.match"] == 1007.0
+        assert limiter.blocked_until == 0.0
+    else:
+        assert limiter.blocked_until == 1007.0
+        assert limiter.method_blocked_until == {}
+
+
+def test_exhausted_retries_return_the_last_response(clock, capsys):
+    responses = [FakeResponse(429, {"Retry-After": "1", "X-Rate-Limit-Type": "application"})
+                 for _ in range(MAX_RETRIES + 1)]
+    client = _client(responses)
+
+    response = client.get("https://europe.api.riotgames.com/lol/match/v5/matches/EUW1_1", "match-v5.match")
+
+    assert response is responses[-1]
+    assert not response.closed
+    assert all(retried.closed for retried in responses[:-1])
+    assert client.session.calls == MAX_RETRIES + 1
+    assert f"after {MAX_RETRIES + 1} attempts: rate limited (application limit)" in capsys.readouterr().out
+
+
+def test_exhausted_retries_after_network_errors_return_none(clock, capsys):
+    client = _client([requests.exceptions.ConnectionError("connection reset")] * (MAX_RETRIES + 1))
+
+    assert client.get("https://euw1.api.riotgames.com/lol/summoner/v4/summoners/1", "summoner-v4.by-id") is None
+    assert "network error (connection reset)" in capsys.readouterr().out
+    # No backoff after the last attempt
+    assert len(clock.sleeps) == MAX_RETRIES
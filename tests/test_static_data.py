@@ -0,0 +1,41 @@
+import json
+import os
+
+import numpy as np
+import pytest
+import requests
+
+from transform import static_data
+
+
+@pytest.fixture
+def offline_store(tmp_path, monkeypatch):
+    # Version list knows 14.24.1, but only 14.23.1 was downloaded, and the network is down
+    root = tmp_path / "ddragon"
+    version_dir = root / "14.23.1"
+    version_dir.mkdir(parents=True)
+    (root / static_data.VERSIONS_FILE).write_text(json.dumps(["14.24.1", "14.23.1"]))
+    lookup = np.full(104, -1, dtype=np.int32)
+    lookup[[1, 103]] = [0, 1]
+    np.save(version_dir / "champion_lookup.npy", lookup)
+    np.save(version_dir / "champion_names.npy", np.array(["Annie", "Ahri"], dtype=f"<U{static_data.NAME_WIDTH}"))
+
+    def offline(*args, **kwargs):
+        raise requests.exceptions.ConnectionError("offline")
+
+    monkeypatch.setattr(static_data.requests, "get", offline)
+    monkeypatch.setattr(static_data, "_champion_tables", {})
+    return str(root)
+
+
+def test_champion_names_fall_back_to_stored_version(offline_store):
+    with pytest.warns(UserWarning, match="using 14.23.1 instead"):
+        names = static_data.champion_names([103, 1, 7], root=offline_store)
+    assert names.tolist() == ["Ahri", "Annie", None]
+
+
+def test_champion_names_without_stored_version(offline_store):
+    empty_root = os.path.join(os.path.dirname(offline_store), "empty")
+    with pytest.warns(UserWarning):
+        names = static_data.champion_names([103], version="14.24.1", root=empty_root)
+    assert names.tolist() == [None]
@@ -0,0 +1,23 @@
+import numpy as np
+
+from transform.stats import estimate_beta_prior
+
+
+def test_estimate_beta_prior_recovers_known_strength():
+    # Groups of very different sizes, as in a win rate table, drawn from a Beta(100, 100) prior
+    rng = np.random.default_rng(0)
+    strengths = []
+    for _ in range(20):
+        games = rng.integers(5, 2000, 300)
+        wins = rng.binomial(games, rng.beta(100, 100, 300))
+        alpha, beta = estimate_beta_prior(wins, games)
+        strengths.append(alpha + beta)
+
+    assert 150 < np.median(strengths) < 260
+    assert abs(np.mean(strengths) / 200 - 1) < 0.2
+
+
+def test_estimate_beta_prior_defaults_without_spread():
+    # Identical win rates leave no spread beyond binomial noise
+    alpha, beta = estimate_beta_prior([50, 500], [100, 1000], default_games=40)
+    assert (alpha, beta) == (20, 20)
@@ -0,0 +1,60 @@
+import pytest
+
+from benchmarks.synthetic import iter_synthetic_matches
+from transform import storage
+from transform.partials import load_partials
+from transform.storage import MatchIndex, load_table, write_match_dataset
+
+
+def _ingest(tmp_path, matches, chunk_size=5):
+    return write_match_dataset(matches, "2024-12-10", root=str(tmp_path / "lake"), chunk_size=chunk_size,
+                               aggregates_root=str(tmp_path / "aggregates"))
+
+
+def _counts(tmp_path):
+    aggregates = str(tmp_path / "aggregates")
+    return (len(load_table("matches", root=str(tmp_path / "lake"))),
+            int(load_partials("champions", root=aggregates)["picks"].sum()),
+            int(load_partials("matches", root=aggregates)["matches"].sum()))
+
+
+def test_duplicate_matches_are_skipped(tmp_path):
+    matches = list(iter_synthetic_matches(8))
+
+    assert _ingest(tmp_path, matches + matches[:3]) == 8
+    assert _ingest(tmp_path, matches) == 0
+    assert _counts(tmp_path) == (8, 80, 8)
+
+
+def test_reingest_after_failure_before_indexing(tmp_path, monkeypatch):
+    matches = list(iter_synthetic_matches(12))
+
+    # The second chunk is written to disk, then the process dies before its IDs are indexed
+    commit_chunk = MatchIndex.commit_chunk
+    commits = []
+
+    def crash_on_second_chunk(self, chunk_id, match_ids):
+        commits.append(chunk_id)
+        if len(commits) == 2:
+            raise KeyboardInterrupt("killed")
+        commit_chunk(self, chunk_id, match_ids)
+
+    monkeypatch.setattr(MatchIndex, "commit_chunk", crash_on_second_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        _ingest(tmp_path, matches)
+    assert _counts(tmp_path) == (10, 100, 10)
+
+    # The retry removes the interrupted chunk's files before writing its matches again
+    monkeypatch.setattr(MatchIndex, "commit_chunk", commit_chunk)
+    assert _ingest(tmp_path, matches) == 7
+    assert _counts(tmp_path) == (12, 120, 12)
+    assert load_table("matches", root=str(tmp_path / "lake"))["match_id"].is_unique
+
+
+def test_index_is_rebuilt_from_the_dataset(tmp_path):
+    matches = list(iter_synthetic_matches(6))
+    _ingest(tmp_path, matches)
+    (tmp_path / "lake" / storage.MATCH_INDEX_FILE).unlink()
+
+    assert _ingest(tmp_path, matches) == 0
+    assert _counts(tmp_path) == (6, 60, 6)
@@ -0,0 +1,42 @@
+import pytest
+
+from transform.storage import MatchIndex
+from transform.timelines import TIMELINE_INDEX_FILE, load_timelines, missing_timeline_ids, write_timeline_dataset
+
+
+def _timeline(match_id):
+    return [{"match_id": match_id, "participant_id": participant_id, "gold_at_10": 3000 + participant_id}
+            for participant_id in range(1, 11)]
+
+
+def test_only_missing_timelines_are_written(tmp_path):
+    root = str(tmp_path)
+    assert write_timeline_dataset([_timeline("EUW1_1"), _timeline("EUW1_2")], "2024-12-10", root=root) == 2
+
+    assert missing_timeline_ids(["EUW1_3", "EUW1_1", "EUW1_4"], root=root) == ["EUW1_3", "EUW1_4"]
+    assert write_timeline_dataset([_timeline("EUW1_2"), _timeline("EUW1_3")], "2024-12-11", root=root) == 1
+    assert len(load_timelines(root=root)) == 30
+
+
+def test_interrupted_chunk_is_rolled_back(tmp_path, monkeypatch):
+    root = str(tmp_path)
+
+    def killed(self, chunk_id, match_ids):
+        raise KeyboardInterrupt("killed")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(MatchIndex, "commit_chunk", killed)
+        with pytest.raises(KeyboardInterrupt):
+            write_timeline_dataset([_timeline("EUW1_1")], "2024-12-10", root=root)
+
+    assert missing_timeline_ids(["EUW1_1"], root=root) == ["EUW1_1"]
+    assert write_timeline_dataset([_timeline("EUW1_1")], "2024-12-10", root=root) == 1
+    assert len(load_timelines(root=root)) == 10
+
+
+def test_index_is_built_from_stored_timelines(tmp_path):
+    root = str(tmp_path)
+    write_timeline_dataset([_timeline("EUW1_1")], "2024-12-10", root=root)
+    (tmp_path / TIMELINE_INDEX_FILE).unlink()
+
+    assert missing_timeline_ids(["EUW1_1", "EUW1_2"], root=root) == ["EUW1_2"]
@@ -1,2 +1,66 @@
-from .fetch_champions import fetch_champion_mapping, enrich_match_data, calculate_win_rates
-from .fetch_players import get_all_puuids, get_all_matches, get_all_match_details, save_matches_to_dataframe
+import importlib
+
+# Public names and the submodule defining them. Submodules are only imported on first
+# access, so offline work never loads (or requires the configuration of) the API client.
+_EXPORTS = {
+    "fetch_champion_mapping": "fetch_champions",
+    "enrich_match_data": "fetch_champions",
+    "calculate_win_rates": "fetch_champions",
+    "calculate_pick_ban_rates": "fetch_champions",
+    "add_rate_columns": "fetch_champions",
+    "add_ban_counts": "fetch_champions",
+    "decode_ban_columns": "fetch_champions",
+    "HISTORY_DAYS": "fetch_players",
+    "get_all_puuids": "fetch_players",
+    "get_all_matches": "fetch_players",
+    "iter_new_match_ids": "fetch_players",
+    "get_all_match_details": "fetch_players",
+    "get_match_timeline": "fetch_players",
+    "iter_match_timelines": "fetch_players",
+    "iter_match_details": "fetch_players",
+    "iter_streamed_match_details": "fetch_players",
+    "save_matches_to_dataframe": "fetch_players",
+    "flatten_match": "flatten",
+    "normalize_match": "flatten",
+    "iter_participant_rows": "flatten",
+    "write_match_dataset": "storage",
+    "load_table": "storage",
+    "parse_timeline": "timelines",
+    "write_timeline_dataset": "timelines",
+    "load_timelines": "timelines",
+    "missing_timeline_ids": "timelines",
+    "add_lane_diffs": "timelines",
+    "query_window": "partials",
+    "query_patch": "partials",
+    "query_rates": "partials",
+    "compact_partials": "partials",
+    "rebuild_partials": "partials",
+    "mark_ingest": "partials",
+    "ingest_version": "partials",
+    "PLATFORMS": "regions",
+    "TIERS": "regions",
+    "PLATFORM_ROUTING": "regions",
+    "MatchupMatrices": "matchups",
+    "DraftFeatureBuilder": "features",
+    "add_interval_columns": "stats",
+    "wilson_interval": "stats",
+    "shrunk_win_rate": "stats",
+    "bootstrap_interval": "stats",
+    "champion_names": "static_data",
+    "champion_names_by_patch": "static_data",
+    "resolve_version": "static_data",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
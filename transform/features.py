@@ -0,0 +1,238 @@
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .fetch_champions import decode_ban_columns
+from .matchups import LANE_ROLES, TEAM_SIZE
+from .metrics import metrics
+
+# Location of the saved design matrix and its vocabulary
+FEATURES_DIR = os.path.join("datasets", "features")
+
+# Feature kinds
+PICK, BAN, PATCH = 0, 1, 2
+KIND_NAMES = {PICK: "pick", BAN: "ban", PATCH: "patch"}
+TEAM_NAMES = ("blue", "red")
+
+# Lane code of participants without a known team position
+UNKNOWN_LANE = len(LANE_ROLES)
+
+# Feature keys pack (kind, team, lane, value) into one integer; value is a champion ID or a patch code
+_VALUE_BASE = 1_000_000
+
+
+class DraftFeatureBuilder:
+    """
+    Incremental builder of a sparse draft design matrix, one row per match, with one-hot
+    features for each team's picks by role, the banned champions and the patch.
+    The label of a row is 1 when the blue team won. Matches where either team does not have
+    all of its participants are skipped, as their draft and label would be wrong.
+
+    Features are identified by integer keys and get a column the first time they are seen,
+    so appending matches with new champions or patches only adds columns at the end and
+    never changes the meaning of existing ones. Each batch is encoded with array operations
+    and stored as a CSR block; blocks are stacked on demand.
+    """
+
+    def __init__(self):
+        self.feature_keys = np.empty(0, dtype=np.int64)
+        self.blocks = []
+        self.label_blocks = []
+        self.match_ids = []
+        self._seen = set()
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_keys)
+
+    def append(self, participants_df: pd.DataFrame, bans_df: pd.DataFrame = None) -> int:
+        """
+        Add the matches of a batch of rows. Matches already in the matrix, or with fewer or more
+        than TEAM_SIZE participants on either team, are skipped.
+
+        Args:
+            participants_df (pd.DataFrame): Participant rows with `match_id`, `team_id`, `champion_id`,
+                                            `role`, `win` and optionally `patch`.
+            bans_df (pd.DataFrame): Ban rows with `match_id` and `champion_id` (e.g. the `bans` table).
+                                    If None, bans are decoded from the legacy `bans_team_*` columns
+                                    when present.
+
+        Returns:
+            int: The number of matches added.
+        """
+        with metrics.stage("draft_features") as stage:
+            rows = participants_df.dropna(subset=['match_id', 'team_id', 'champion_id', 'win'])
+            rows = rows[~rows['match_id'].isin(self._seen)]
+            # Keep only the matches with a full roster on both sides
+            team_sizes = (rows.groupby(['match_id', rows['team_id'] != 100]).size()
+                          .unstack(fill_value=0).reindex(columns=[False, True], fill_value=0))
+            complete = (team_sizes == TEAM_SIZE).all(axis=1)
+            if not complete.all():
+                print(f"Skipped {int((~complete).sum())} matches with an incomplete team")
+                rows = rows[rows['match_id'].isin(complete.index[complete])]
+            matches, match_ids = pd.factorize(rows['match_id'])
+            if len(match_ids) == 0:
+                stage["rows"] = 0
+                return 0
+
+            teams = (rows['team_id'].to_numpy() != 100).astype(np.int64)
+            lanes = pd.Categorical(rows['role'].astype(object), categories=LANE_ROLES).codes.astype(np.int64)
+            lanes[lanes < 0] = UNKNOWN_LANE
+            wins = rows['win'].to_numpy(dtype=bool)
+
+            # Label: result of the blue team
+            labels = np.zeros(len(match_ids), dtype=np.int8)
+            blue = teams == 0
+            labels[matches[blue]] = wins[blue]
+
+            row_index = [matches]
+            keys = [_encode(PICK, teams, lanes, rows['champion_id'].to_numpy(dtype=np.int64))]
+
+            if bans_df is None and 'bans_team_1' in rows:
+                bans_df = decode_ban_columns(rows)
+            if bans_df is not None:
+                # A champion banned by both teams is one feature
+                bans = bans_df.drop_duplicates(['match_id', 'champion_id'])
+                ban_matches = pd.Index(match_ids).get_indexer(bans['match_id'])
+                banned = ban_matches >= 0
+                row_index.append(ban_matches[banned])
+                keys.append(_encode(BAN, 0, 0, bans['champion_id'].to_numpy(dtype=np.int64)[banned]))
+
+            if 'patch' in rows:
+                match_patches = np.zeros(len(match_ids), dtype=np.int64)
+                match_patches[matches] = _patch_codes(rows['patch'])
+                row_index.append(np.arange(len(match_ids)))
+                keys.append(_encode(PATCH, 0, 0, match_patches))
+
+            columns = self._columns(np.concatenate(keys))
+            row_index = np.concatenate(row_index)
+            block = sp.csr_matrix(
+                (np.ones(len(columns), dtype=np.float32), (row_index, columns)),
+                shape=(len(match_ids), self.n_features),
+            )
+
+            self.blocks.append(block)
+            self.label_blocks.append(labels)
+            self.match_ids.extend(match_ids)
+            self._seen.update(match_ids)
+            stage["rows"] = len(match_ids)
+        return len(match_ids)
+
+    def matrix(self) -> sp.csr_matrix:
+        """
+        Return the design matrix of every appended match.
+
+        Returns:
+            scipy.sparse.csr_matrix: A (matches, features) matrix.
+        """
+        if not self.blocks:
+            return sp.csr_matrix((0, self.n_features), dtype=np.float32)
+        # Older blocks are widened to the current vocabulary; their new columns are all zero
+        widened = [sp.csr_matrix((block.data, block.indices, block.indptr), shape=(block.shape[0], self.n_features))
+                   for block in self.blocks]
+        matrix = sp.vstack(widened, format="csr")
+        self.blocks = [matrix]
+        return matrix
+
+    def labels(self) -> np.ndarray:
+        """
+        Return the label vector: 1 when the blue team won the match.
+
+        Returns:
+            np.ndarray: One label per row of the matrix.
+        """
+        if not self.label_blocks:
+            return np.empty(0, dtype=np.int8)
+        labels = np.concatenate(self.label_blocks)
+        self.label_blocks = [labels]
+        return labels
+
+    def feature_names(self) -> list:
+        """
+        Return readable column names (e.g. "pick:blue:MIDDLE:103", "ban:103", "patch:14.23").
+
+        Returns:
+            list: One name per column.
+        """
+        kinds, teams, lanes, values = _decode(self.feature_keys)
+        lane_names = [*LANE_ROLES, "UNKNOWN"]
+        names = []
+        for kind, team, lane, value in zip(kinds.tolist(), teams.tolist(), lanes.tolist(), values.tolist()):
+            if kind == PICK:
+                names.append(f"pick:{TEAM_NAMES[team]}:{lane_names[lane]}:{value}")
+            elif kind == BAN:
+                names.append(f"ban:{value}")
+            else:
+                names.append(f"patch:{value // 100}.{value % 100}" if value else "patch:unknown")
+        return names
+
+    def save(self, directory: str = FEATURES_DIR) -> str:
+        """
+        Save the matrix, labels, match IDs and vocabulary, so the next run can append to them.
+
+        Args:
+            directory (str): Output directory.
+
+        Returns:
+            str: The output directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        sp.save_npz(os.path.join(directory, "matrix.npz"), self.matrix())
+        np.savez_compressed(
+            os.path.join(directory, "vocabulary.npz"),
+            feature_keys=self.feature_keys,
+            labels=self.labels(),
+            match_ids=np.asarray(self.match_ids, dtype=str),
+        )
+        return directory
+
+    @classmethod
+    def load(cls, directory: str = FEATURES_DIR) -> "DraftFeatureBuilder":
+        """
+        Load a builder saved by `save`, or return an empty one if nothing was saved yet.
+
+        Args:
+            directory (str): Directory of the saved builder.
+
+        Returns:
+            DraftFeatureBuilder: The builder.
+        """
+        builder = cls()
+        matrix_path = os.path.join(directory, "matrix.npz")
+        if not os.path.exists(matrix_path):
+            return builder
+        with np.load(os.path.join(directory, "vocabulary.npz")) as vocabulary:
+            builder.feature_keys = vocabulary["feature_keys"]
+            builder.label_blocks = [vocabulary["labels"]]
+            builder.match_ids = vocabulary["match_ids"].tolist()
+        builder.blocks = [sp.load_npz(matrix_path).tocsr()]
+        builder._seen = set(builder.match_ids)
+        return builder
+
+    def _columns(self, keys: np.ndarray) -> np.ndarray:
+        # Unseen keys get new columns at the end, in sorted order
+        unique = np.unique(keys)
+        new_keys = unique[~np.isin(unique, self.feature_keys)]
+        self.feature_keys = np.concatenate([self.feature_keys, new_keys])
+        order = np.argsort(self.feature_keys, kind="stable")
+        return order[np.searchsorted(self.feature_keys[order], keys)]
+
+
+def _encode(kind: int, team, lane, value) -> np.ndarray:
+    return ((kind * 2 + np.asarray(team)) * (UNKNOWN_LANE + 1) + np.asarray(lane)) * _VALUE_BASE + np.asarray(value)
+
+
+def _decode(keys: np.ndarray) -> tuple:
+    values = keys % _VALUE_BASE
+    rest = keys // _VALUE_BASE
+    lanes = rest % (UNKNOWN_LANE + 1)
+    rest = rest // (UNKNOWN_LANE + 1)
+    return rest // 2, rest % 2, lanes, values
+
+
+def _patch_codes(patches: pd.Series) -> np.ndarray:
+    # "14.23" -> 1423, unparsable patches -> 0
+    parts = patches.astype(str).str.extract(r'^(\d+)\.(\d+)')
+    codes = pd.to_numeric(parts[0], errors='coerce') * 100 + pd.to_numeric(parts[1], errors='coerce')
+    return codes.fillna(0).to_numpy(dtype=np.int64)
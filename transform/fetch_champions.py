@@ -1,54 +1,68 @@
 import requests
-import os
-from dotenv import load_dotenv
+import warnings
+import numpy as np
+import pandas as pd
 
-# Load environment variables from the .env file
-load_dotenv()
+from .metrics import metrics
+from .static_data import champion_names_by_patch, load_champion_table, resolve_version
+from .stats import add_interval_columns
 
-# Retrieve the Riot Games API key
-RIOT_API_KEY = os.getenv("RIOT_API_KEY")
-if not RIOT_API_KEY:
-    raise ValueError("The API key is not defined in the .env file.")
+# Role of the rows of champions that were banned but never picked
+NO_PICK_ROLE = "NONE"
 
-# API URLs
-CHAMPION_DATA_URL = "http://ddragon.leagueoflegends.com/cdn/13.19.1/data/en_US/champion.json"
-MATCH_DETAILS_URL = "https://europe.api.riotgames.com/lol/match/v5/matches/{matchId}"
 
-
-def fetch_champion_mapping() -> dict:
+def fetch_champion_mapping(version: str = None) -> dict:
     """
-    Fetches champion data from Data Dragon and maps champion IDs to champion names.
+    Maps champion IDs to champion names using the local Data Dragon store.
+    The data of a version is downloaded once, then read from disk.
+
+    Args:
+        version (str): Data Dragon version (e.g. "14.23.1"). Defaults to the latest known version.
 
     Returns:
         dict: A dictionary mapping champion IDs (int) to their respective names (str).
     """
+    version = version or resolve_version()
+    if version is None:
+        print("Error fetching champion data: no Data Dragon version available")
+        return {}
     try:
-        response = requests.get(CHAMPION_DATA_URL, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        champion_data = data['data']
-        return {int(champ['key']): champ['name'] for champ in champion_data.values()}
+        lookup, names = load_champion_table(version)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching champion data: {e}")
         return {}
+    champion_ids = np.flatnonzero(np.asarray(lookup) >= 0)
+    return dict(zip(champion_ids.tolist(), np.asarray(names)[np.asarray(lookup)[champion_ids]].tolist()))
 
 
-def enrich_match_data(matches_df, champion_mapping: dict):
+def enrich_match_data(matches_df, champion_mapping: dict = None):
     """
     Enriches match data by adding champion names, roles, and additional details.
 
     Args:
-        matches_df (pd.DataFrame): DataFrame containing match data with a `champion_id` column.
-        champion_mapping (dict): A dictionary mapping champion IDs to names.
+        matches_df (pd.DataFrame): DataFrame containing match data with a `champion_id` column,
+                                   and optionally a `patch` column.
+        champion_mapping (dict): A dictionary mapping champion IDs to names. If None, names are
+                                 resolved from the Data Dragon version of each row's patch.
 
     Returns:
         pd.DataFrame: The enriched match data.
     """
-    # Map champion IDs to names
-    matches_df['champion_name'] = matches_df['champion_id'].map(champion_mapping)
-
-    # Fill missing roles with 'UNKNOWN'
-    matches_df['role'] = matches_df['role'].fillna('UNKNOWN')
+    with metrics.stage("enrich_match_data") as stage:
+        # Map champion IDs to names
+        if champion_mapping is None:
+            patches = matches_df['patch'] if 'patch' in matches_df else pd.Series("unknown", index=matches_df.index)
+            matches_df['champion_name'] = champion_names_by_patch(matches_df['champion_id'], patches)
+        else:
+            matches_df['champion_name'] = matches_df['champion_id'].map(champion_mapping)
+            missing = matches_df['champion_name'].isna()
+            if missing.any():
+                warnings.warn(f"No champion name found for {missing.sum()} rows "
+                              f"(champion IDs: {sorted(matches_df.loc[missing, 'champion_id'].unique().tolist())})")
+
+        # Fill missing roles with 'UNKNOWN'
+        matches_df['role'] = matches_df['role'].fillna('UNKNOWN')
+        stage["rows"] = len(matches_df)
 
     return matches_df
 
@@ -71,14 +85,142 @@ def calculate_win_rates(matches_df):
                       - `total_matches`
                       - `wins`
                       - `win_rate`
+                      - `win_rate_low`, `win_rate_high` (Wilson interval)
+                      - `shrunk_win_rate`, `shrunk_low`, `shrunk_high` (Bayesian-shrunk)
+                      - `bootstrap_low`, `bootstrap_high` (bootstrap interval)
     """
-    win_rates = (
-        matches_df.groupby(['champion_name', 'role'])
+    with metrics.stage("calculate_win_rates") as stage:
+        win_rates = (
+            matches_df.groupby(['champion_name', 'role'], observed=True)
+            .agg(
+                total_matches=('win', 'count'),
+                wins=('win', 'sum')
+            )
+            .reset_index()
+        )
+        win_rates['win_rate'] = (win_rates['wins'] / win_rates['total_matches']) * 100
+        stage["rows"] = len(matches_df)
+    return add_interval_columns(win_rates)
+
+
+def decode_ban_columns(matches_df):
+    """
+    Decode the legacy `bans_team_1`/`bans_team_2` columns into one row per ban.
+    Works on both list values and the "[104, 7, 81]" strings read back from CSV,
+    without parsing rows one by one.
+
+    Args:
+        matches_df (pd.DataFrame): Participant rows with `match_id`, `bans_team_1` and `bans_team_2`.
+
+    Returns:
+        pd.DataFrame: A DataFrame with `match_id` and `champion_id` columns.
+    """
+    # Ban lists are repeated on the 10 participant rows of a match
+    per_match = matches_df.drop_duplicates('match_id')[['match_id', 'bans_team_1', 'bans_team_2']]
+    bans = per_match.melt(id_vars='match_id', value_name='champion_id')[['match_id', 'champion_id']]
+
+    if bans['champion_id'].map(type).eq(str).any():
+        bans['champion_id'] = bans['champion_id'].str.strip('[]').str.split(',')
+
+    bans = bans.explode('champion_id')
+    bans['champion_id'] = pd.to_numeric(bans['champion_id'], errors='coerce')
+    bans = bans.dropna(subset=['champion_id'])
+    bans['champion_id'] = bans['champion_id'].astype(int)
+    return bans[bans['champion_id'] != -1]
+
+
+def calculate_pick_ban_rates(matches_df, bans_df=None):
+    """
+    Calculates pick rate, ban rate, presence and win rate for each champion and role.
+
+    Args:
+        matches_df (pd.DataFrame): Participant rows with columns `match_id`, `champion_id`,
+                                   `role`, `win` and optionally `champion_name`.
+        bans_df (pd.DataFrame): Ban rows with `match_id` and `champion_id` (e.g. the `bans` table).
+                                If None, bans are decoded from the legacy `bans_team_*` columns.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing, for each champion and role:
+                      - `champion_id`, `champion_name` (if available), `role`
+                      - `picks`, `wins`, `bans` (share of the champion's bans, see `add_ban_counts`)
+                      - `champion_bans`
+                      - `pick_rate`, `ban_rate`, `presence`, `win_rate` (percentages)
+                      - `champion_ban_rate`, `champion_presence` (percentages)
+                      Champions banned but never picked get one `NO_PICK_ROLE` row, without a name.
+    """
+    if bans_df is None:
+        bans_df = decode_ban_columns(matches_df)
+
+    total_matches = matches_df['match_id'].nunique()
+
+    # A champion banned by both teams only counts once for the match
+    bans_df = bans_df[bans_df['match_id'].isin(matches_df['match_id'].unique())]
+    unique_bans = bans_df.drop_duplicates(['match_id', 'champion_id'])
+    ban_counts = unique_bans['champion_id'].value_counts()
+
+    group_cols = ['champion_id', 'champion_name', 'role'] if 'champion_name' in matches_df else ['champion_id', 'role']
+    rates = (
+        matches_df.groupby(group_cols, observed=True)
         .agg(
-            total_matches=('win', 'count'),
+            picks=('win', 'size'),
             wins=('win', 'sum')
         )
         .reset_index()
     )
-    win_rates['win_rate'] = (win_rates['wins'] / win_rates['total_matches']) * 100
-    return win_rates
+    return add_rate_columns(add_ban_counts(rates, ban_counts), total_matches)
+
+
+def add_ban_counts(rates, ban_counts):
+    """
+    Adds the bans of each champion to a table of picks per champion and role.
+    Bans have no role, so they are split across a champion's roles in proportion to its picks:
+    `bans`, `ban_rate` and `presence` then add up over the roles instead of being repeated
+    on each of them. Champions banned but never picked get one row with the `NO_PICK_ROLE` role.
+
+    Args:
+        rates (pd.DataFrame): DataFrame with `champion_id`, `role`, `picks` and `wins` columns.
+        ban_counts (pd.Series): Matches in which each champion was banned, indexed by champion ID.
+
+    Returns:
+        pd.DataFrame: The table with `bans` (share of the role) and `champion_bans` (champion total).
+    """
+    ban_counts = ban_counts[ban_counts > 0]
+    banned_only = ban_counts.index.difference(rates['champion_id'].unique())
+    if len(banned_only):
+        rates = pd.concat([rates, pd.DataFrame({
+            'champion_id': banned_only.astype(rates['champion_id'].dtype),
+            'role': NO_PICK_ROLE,
+            'picks': 0,
+            'wins': 0,
+        })], ignore_index=True)
+
+    rates['champion_bans'] = rates['champion_id'].map(ban_counts).fillna(0).astype(int)
+    champion_picks = rates.groupby('champion_id')['picks'].transform('sum')
+    share = (rates['picks'] / champion_picks.where(champion_picks > 0)).fillna(1.0)
+    rates['bans'] = rates['champion_bans'] * share
+    return rates
+
+
+def add_rate_columns(rates, total_matches: int):
+    """
+    Adds pick rate, ban rate, presence and win rate columns from `picks`, `wins` and `bans` counters,
+    and the champion-level ban rate and presence when `champion_bans` is present.
+
+    Args:
+        rates (pd.DataFrame): DataFrame with `picks`, `wins` and `bans` columns
+                              (and optionally `champion_id` and `champion_bans`).
+        total_matches (int): Number of matches the counters were collected on.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with the rate columns (percentages).
+    """
+    total_matches = max(total_matches, 1)
+    rates['pick_rate'] = (rates['picks'] / total_matches) * 100
+    rates['ban_rate'] = (rates['bans'] / total_matches) * 100
+    rates['presence'] = ((rates['picks'] + rates['bans']) / total_matches) * 100
+    rates['win_rate'] = (rates['wins'] / rates['picks'].where(rates['picks'] > 0)) * 100
+    if 'champion_bans' in rates:
+        champion_picks = rates.groupby('champion_id')['picks'].transform('sum')
+        rates['champion_ban_rate'] = (rates['champion_bans'] / total_matches) * 100
+        rates['champion_presence'] = ((champion_picks + rates['champion_bans']) / total_matches) * 100
+    return rates
@@ -1,37 +1,98 @@
-import requests
+import itertools
+import queue
+import threading
 import time
 import pandas as pd
 import os
 from dotenv import load_dotenv
 
+from .flatten import iter_participant_rows
+from .match_cache import MatchCache
+from .metrics import metrics
+from .regions import (
+    DEFAULT_PLATFORM,
+    MATCH_DETAILS_URL,
+    MATCH_TIMELINE_URL,
+    MATCH_URL,
+    PLATFORMS,
+    SUMMONER_URL,
+    TIER_LEAGUES,
+    TIERS,
+    league_url,
+    region_of,
+    region_of_match,
+)
+from .riot_client import RiotClient
+from .timelines import TIMELINE_MINUTES, parse_timeline
+
 # Load environment variables from the .env file
 load_dotenv()
 
-# Retrieve the Riot Games API key
+# Retrieve the Riot Games API key (only required once a request is made)
 RIOT_API_KEY = os.getenv("RIOT_API_KEY")
-if not RIOT_API_KEY:
-    raise ValueError("The API key is not defined in the .env file.")
-
-# Riot Games API URLs
-MASTER_URL = "https://euw1.api.riotgames.com/lol/league/v4/masterleagues/by-queue/RANKED_SOLO_5x5"
-GRANDMASTER_URL = "https://euw1.api.riotgames.com/lol/league/v4/grandmasterleagues/by-queue/RANKED_SOLO_5x5"
-CHALLENGER_URL = "https://euw1.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/RANKED_SOLO_5x5"
-SUMMONER_URL = "https://euw1.api.riotgames.com/lol/summoner/v4/summoners/"
-MATCH_URL = "https://europe.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
-MATCH_DETAILS_URL = "https://europe.api.riotgames.com/lol/match/v5/matches/{matchId}"
-MASTERY_URL = "https://euw1.api.riotgames.com/lol/champion-mastery/v4/champion-masteries/by-summoner/{summonerId}"
-
-# API request headers
-headers = {"X-Riot-Token": RIOT_API_KEY}
-
-# Parameters for match history requests
-params = {
-    "startTime": int(time.time()) - (7 * 24 * 60 * 60),  # 7 days of history
-    "endTime": int(time.time()),
-    "queue": 420,  # Ranked Solo/Duo
-    "start": 0,
-    "count": 100,
-}
+
+# Riot Games API URLs of the default platform
+MASTER_URL = league_url(DEFAULT_PLATFORM, "MASTER")
+GRANDMASTER_URL = league_url(DEFAULT_PLATFORM, "GRANDMASTER")
+CHALLENGER_URL = league_url(DEFAULT_PLATFORM, "CHALLENGER")
+
+# Shared API client (pooled connections, one rate limit budget per routing host), created on first use
+_client = None
+_client_lock = threading.Lock()
+
+# Local store of finished match payloads, which never change once a game is over
+match_cache = MatchCache()
+
+# Days of match history to collect
+HISTORY_DAYS = int(os.getenv("HISTORY_DAYS", 7))
+
+# Match IDs per page of the match-v5 by-puuid endpoint (its maximum)
+MATCH_PAGE_SIZE = 100
+
+# Upper bound on pages requested per player, in case the window never runs out
+MAX_MATCH_PAGES = 20
+
+# Match IDs looked up in the cache at once before being dispatched to the region pools.
+# A streamed source is read in batches too, so its IDs wait for at most one page worth of others.
+DISPATCH_BATCH_SIZE = MATCH_PAGE_SIZE
+
+
+def get_client() -> RiotClient:
+    """
+    Return the shared API client, creating it on first use.
+
+    Returns:
+        RiotClient: The shared client.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = RIOT_API_KEY or os.getenv("RIOT_API_KEY")
+            if not api_key:
+                raise ValueError("The API key is not defined in the .env file.")
+            _client = RiotClient(api_key)
+        return _client
+
+
+def match_params(history_days: int = HISTORY_DAYS, start: int = 0) -> dict:
+    """
+    Build the parameters of match history requests for the given window.
+
+    Args:
+        history_days (int): Number of days of history to request.
+        start (int): Index of the first match ID of the page.
+
+    Returns:
+        dict: Query parameters for the match-v5 by-puuid endpoint.
+    """
+    now = int(time.time())
+    return {
+        "startTime": now - (history_days * 24 * 60 * 60),
+        "endTime": now,
+        "queue": 420,  # Ranked Solo/Duo
+        "start": start,
+        "count": MATCH_PAGE_SIZE,
+    }
 
 
 def get_summoners(url: str) -> list:
@@ -44,112 +105,166 @@ def get_summoners(url: str) -> list:
     Returns:
         list: A list of summoner IDs.
     """
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        return [entry['summonerId'] for entry in data['entries']]
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching summoners from {url}: {e}")
+    response = get_client().get(url, "league-v4.league")
+    if response is None or response.status_code != 200:
+        status = response.status_code if response is not None else "network"
+        print(f"Error fetching summoners from {url}: {status}")
         return []
+    return [entry['summonerId'] for entry in response.json()['entries']]
 
 
-def get_puuid(summoner_id: str) -> str:
+def get_puuid(summoner_id: str, platform: str = DEFAULT_PLATFORM) -> str:
     """
     Convert a summoner ID to a PUUID.
 
     Args:
         summoner_id (str): Summoner ID.
+        platform (str): Platform the summoner plays on (e.g. "euw1").
 
     Returns:
         str: The corresponding PUUID, or None if an error occurs.
     """
-    try:
-        response = requests.get(f"{SUMMONER_URL}{summoner_id}", headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json().get('puuid')
-        elif response.status_code == 429:
-            print("Rate limit exceeded. Retrying after 15 seconds...")
-            time.sleep(15)
-            return get_puuid(summoner_id)
-        else:
-            print(f"Error {response.status_code}: {response.text}")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Network error while converting summoner ID: {e}")
+    url = SUMMONER_URL.format(platform=platform)
+    response = get_client().get(f"{url}{summoner_id}", "summoner-v4.by-id")
+    if response is None:
+        print(f"Network error while converting summoner ID {summoner_id}")
         return None
+    if response.status_code == 200:
+        return response.json().get('puuid')
+    print(f"Error {response.status_code}: {response.text}")
+    return None
 
 
-def get_all_puuids() -> list:
+def get_all_puuids(platform: str = DEFAULT_PLATFORM, tier: str = "CHALLENGER") -> list:
     """
-    Retrieve all PUUIDs for Challenger players.
+    Retrieve all PUUIDs for the players of an apex tier on a platform.
+
+    Args:
+        platform (str): Platform routing value (e.g. "euw1").
+        tier (str): Tier name ("CHALLENGER", "GRANDMASTER" or "MASTER").
 
     Returns:
         list: A list of PUUIDs.
     """
-    challenger_summoners = get_summoners(CHALLENGER_URL)
-    puuids = []
-
-    for i, summoner_id in enumerate(challenger_summoners):
-        if i > 0 and i % 20 == 0:  # Pause after every 20 requests
-            time.sleep(1)
-        puuid = get_puuid(summoner_id)
-        if puuid:
-            puuids.append(puuid)
+    summoners = get_summoners(league_url(platform, tier))
+    puuids = [puuid for puuid in get_client().map(lambda summoner_id: get_puuid(summoner_id, platform), summoners)
+              if puuid]
 
-    print(f"Total PUUIDs retrieved: {len(puuids)}")
+    print(f"Total PUUIDs retrieved for {platform} {tier}: {len(puuids)}")
     return puuids
 
 
-def get_matches(puuid: str) -> list:
+def get_matches(puuid: str, platform: str = DEFAULT_PLATFORM, history_days: int = HISTORY_DAYS) -> list:
     """
-    Retrieve match IDs associated with a given PUUID.
+    Retrieve every match ID of a player within the history window.
+    Pages are requested until one comes back short, so very active players keep all their games.
 
     Args:
         puuid (str): The player's PUUID.
+        platform (str): Platform the player plays on (e.g. "euw1").
+        history_days (int): Number of days of history to request.
 
     Returns:
-        list: A list of match IDs.
-    """
-    url = MATCH_URL.format(puuid=puuid)
-    try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 429:
-            print("Rate limit exceeded. Retrying after 15 seconds...")
-            time.sleep(15)
-            return get_matches(puuid)
-        else:
+        list: A list of match IDs, most recent first.
+    """
+    url = MATCH_URL.format(region=region_of(platform), puuid=puuid)
+    # Every page uses the same window, so games played meanwhile do not shift the pages
+    params = match_params(history_days)
+    match_ids = []
+    for page in range(MAX_MATCH_PAGES):
+        params["start"] = page * MATCH_PAGE_SIZE
+        response = get_client().get(url, "match-v5.ids", params=dict(params))
+        if response is None:
+            print(f"Network error fetching matches for {puuid}")
+            break
+        if response.status_code != 200:
             print(f"Error {response.status_code}: {response.text}")
-            return []
-    except requests.exceptions.RequestException as e:
-        print(f"Network error fetching matches for {puuid}: {e}")
-        return []
+            break
+        page_ids = response.json()
+        match_ids.extend(page_ids)
+        if len(page_ids) < MATCH_PAGE_SIZE:
+            break
+    return match_ids
 
 
-def get_all_matches(puuids: list) -> list:
+def get_all_matches(puuids: list, platform: str = DEFAULT_PLATFORM) -> list:
     """
     Retrieve all match IDs for a list of PUUIDs.
 
     Args:
         puuids (list): List of PUUIDs.
+        platform (str): Platform the players play on (e.g. "euw1").
 
     Returns:
         list: A list of unique match IDs.
     """
-    matches = []
-    for i, puuid in enumerate(puuids):
-        if i > 0 and i % 10 == 0:  # Pause after every 10 requests
-            time.sleep(2)
-        match_ids = get_matches(puuid)
-        matches.extend(match_ids)
+    seen = {}
+    for match_ids in get_client().imap_unordered(lambda puuid: get_matches(puuid, platform), puuids):
+        seen.update(dict.fromkeys(match_ids))
 
-    unique_matches = list(set(matches))
+    unique_matches = list(seen)
     print(f"Total unique matches retrieved: {len(unique_matches)}")
     return unique_matches
 
 
+def iter_new_match_ids(platforms: list = PLATFORMS, tiers: list = TIERS, match_tiers: dict = None):
+    """
+    Discover the match IDs of every player of the given tiers, on several platforms at the same time,
+    and yield each one as soon as it is first seen. A game appears in up to ten players' histories,
+    so the shared seen-set lets detail fetching start on a match right away, and only once.
+    Tiers are walked from the highest down, so a match found in several tiers is tagged with the highest one.
+
+    Args:
+        platforms (list): Platform routing values (e.g. ["euw1", "eun1", "na1", "kr"]).
+        tiers (list): Tier names to collect.
+        match_tiers (dict): Seen-set shared with the caller, filled with match ID -> tier.
+            Match IDs already in it are not yielded again.
+
+    Yields:
+        str: Newly seen match IDs.
+    """
+    match_tiers = {} if match_tiers is None else match_tiers
+    lock = threading.Lock()
+    new_ids = queue.Queue()
+    finished = object()
+    client = get_client()
+
+    def discover_platform(platform):
+        try:
+            for tier in [tier for tier in TIER_LEAGUES if tier in tiers]:
+                puuids = get_all_puuids(platform, tier)
+                for match_ids in client.imap_unordered(lambda puuid: get_matches(puuid, platform), puuids):
+                    with lock:
+                        fresh = [match_id for match_id in match_ids if match_id not in match_tiers]
+                        match_tiers.update(dict.fromkeys(fresh, tier))
+                    metrics.count("match_ids_duplicate_total", len(match_ids) - len(fresh))
+                    for match_id in fresh:
+                        new_ids.put(match_id)
+        except Exception as e:
+            print(f"Error discovering matches on {platform}: {e}")
+        finally:
+            new_ids.put(finished)
+
+    with metrics.stage("discovery") as stage:
+        # One thread per platform, each against its own rate limit budget
+        for platform in platforms:
+            threading.Thread(target=discover_platform, args=(platform,), daemon=True).start()
+
+        discovered = 0
+        remaining = len(platforms)
+        while remaining:
+            match_id = new_ids.get()
+            if match_id is finished:
+                remaining -= 1
+                continue
+            discovered += 1
+            with metrics.paused(stage):
+                yield match_id
+        stage["rows"] = discovered
+
+    print(f"Total unique matches retrieved on {', '.join(platforms)}: {discovered}")
+
+
 def get_match_details(match_id: str) -> dict:
     """
     Retrieve details of a match by its match ID.
@@ -160,26 +275,39 @@ def get_match_details(match_id: str) -> dict:
     Returns:
         dict: Match details, or None if an error occurs.
     """
-    url = MATCH_DETAILS_URL.format(matchId=match_id)
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 429:
-            print("Rate limit exceeded. Retrying after 15 seconds...")
-            time.sleep(15)
-            return get_match_details(match_id)
-        else:
-            print(f"Error {response.status_code}: {response.text}")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Network error fetching match details for {match_id}: {e}")
+    url = MATCH_DETAILS_URL.format(region=region_of_match(match_id), matchId=match_id)
+    response = get_client().get(url, "match-v5.match")
+    if response is None:
+        print(f"Network error fetching match details for {match_id}")
         return None
+    if response.status_code == 200:
+        return response.json()
+    print(f"Error {response.status_code}: {response.text}")
+    return None
+
+
+def fetch_and_cache_match_details(match_id: str) -> dict:
+    """
+    Retrieve details of a match from the API and store them in the match cache.
+
+    Args:
+        match_id (str): Match ID.
+
+    Returns:
+        dict: Match details, or None if an error occurs.
+    """
+    match_data = get_match_details(match_id)
+    if match_data:
+        match_cache.put(match_id, match_data)
+    return match_data
 
 
 def get_all_match_details(match_ids: list) -> list:
     """
     Retrieve details for a list of match IDs.
+    Cached matches are read from the local match cache, only missing ones are fetched.
+    Legacy in-memory path, kept for scripts: every payload is held in the returned list.
+    The pipeline streams details with `iter_streamed_match_details` into `write_match_dataset`.
 
     Args:
         match_ids (list): List of match IDs.
@@ -187,21 +315,228 @@ def get_all_match_details(match_ids: list) -> list:
     Returns:
         list: A list of match details.
     """
+    cached = match_cache.get_many(match_ids)
+    missing_ids = [match_id for match_id in match_ids if match_id not in cached]
+    fetched = dict(zip(missing_ids, get_client().map(fetch_and_cache_match_details, missing_ids)))
+
     matches_data = []
-    for i, match_id in enumerate(match_ids):
-        if i > 0 and i % 5 == 0:  # Pause after every 5 requests
-            time.sleep(1)
-        match_data = get_match_details(match_id)
+    for match_id in match_ids:
+        match_data = cached.get(match_id) or fetched.get(match_id)
         if match_data:
             matches_data.append(match_data)
 
+    evicted = match_cache.evict()
+    fetched_count = sum(1 for match_data in fetched.values() if match_data)
+    print(f"Match details read from cache: {len(cached)}, fetched: {fetched_count} of {len(missing_ids)}, "
+          f"evicted: {evicted}")
     print(f"Total match details retrieved: {len(matches_data)}")
     return matches_data
 
 
+def iter_match_details(match_ids: list):
+    """
+    Yield match details one at a time: cached matches first, then fetched ones as they arrive.
+    Nothing is kept in memory once a payload has been consumed.
+
+    Args:
+        match_ids (list): List of match IDs.
+
+    Yields:
+        dict: Match details.
+    """
+    # Stage timings leave out the time the consumer spends on each payload
+    cached_count = 0
+    with metrics.stage("details.cache") as stage:
+        for _, match_data in match_cache.iter_many(match_ids):
+            cached_count += 1
+            with metrics.paused(stage):
+                yield match_data
+        stage["rows"] = cached_count
+
+    missing_ids = match_cache.missing(match_ids)
+    fetched_count = 0
+    with metrics.stage("details.fetch") as stage:
+        for match_data in _iter_details_by_region(missing_ids):
+            if match_data:
+                fetched_count += 1
+                with metrics.paused(stage):
+                    yield match_data
+        stage["rows"] = fetched_count
+
+    metrics.count("match_cache_hits_total", cached_count)
+    metrics.count("match_cache_misses_total", len(missing_ids))
+    evicted = match_cache.evict()
+    print(f"Match details read from cache: {cached_count}, fetched: {fetched_count}, evicted: {evicted}")
+
+
+def iter_streamed_match_details(match_ids):
+    """
+    Yield match details for match IDs that arrive while they are still being discovered
+    (e.g. from `iter_new_match_ids`). IDs are looked up in the match cache in batches of
+    `DISPATCH_BATCH_SIZE` as they arrive, and missing ones are handed to their region's worker pool.
+
+    Args:
+        match_ids (iterable): Stream of unique match IDs.
+
+    Yields:
+        dict: Match details, in completion order.
+    """
+    counts = {"hits": 0, "misses": 0}
+    yielded = 0
+    with metrics.stage("details.stream") as stage:
+        for match_data in _iter_details_by_region(match_ids, counts):
+            if match_data:
+                yielded += 1
+                with metrics.paused(stage):
+                    yield match_data
+        stage["rows"] = yielded
+
+    metrics.count("match_cache_hits_total", counts["hits"])
+    metrics.count("match_cache_misses_total", counts["misses"])
+    evicted = match_cache.evict()
+    print(f"Match details read from cache: {counts['hits']}, fetched: {yielded - counts['hits']}, "
+          f"evicted: {evicted}")
+
+
+def get_match_timeline(match_id: str, minutes: list = TIMELINE_MINUTES) -> list:
+    """
+    Retrieve the timeline of a match, keeping only participant gold, XP and CS at the given minutes.
+    The response is parsed while it downloads and never held in memory as a whole.
+
+    Args:
+        match_id (str): Match ID.
+        minutes (list): Minute marks to extract.
+
+    Returns:
+        list: One row per participant (see `parse_timeline`), or an empty list if an error occurs.
+    """
+    url = MATCH_TIMELINE_URL.format(region=region_of_match(match_id), matchId=match_id)
+    response = get_client().get(url, "match-v5.timeline", stream=True)
+    if response is None:
+        print(f"Network error fetching the timeline of {match_id}")
+        return []
+    with response:
+        if response.status_code != 200:
+            print(f"Error {response.status_code}: {response.text}")
+            return []
+        response.raw.decode_content = True
+        try:
+            return parse_timeline(response.raw, match_id, minutes)
+        except Exception as e:
+            print(f"Error parsing the timeline of {match_id}: {e}")
+            return []
+
+
+def iter_match_timelines(match_ids: list, minutes: list = TIMELINE_MINUTES):
+    """
+    Yield the extracted timeline rows of several matches as they arrive,
+    with one worker pool per region.
+
+    Args:
+        match_ids (list): List of match IDs.
+        minutes (list): Minute marks to extract.
+
+    Yields:
+        list: The participant rows of one match.
+    """
+    fetched = 0
+    with metrics.stage("timelines.fetch") as stage:
+        for rows in _iter_details_by_region(match_ids, fetch=lambda match_id: get_match_timeline(match_id, minutes)):
+            if rows:
+                fetched += 1
+                with metrics.paused(stage):
+                    yield rows
+        stage["rows"] = fetched
+    print(f"Total timelines retrieved: {fetched}")
+
+
+def _iter_details_by_region(match_ids, cache_counts: dict = None, fetch=None):
+    # One worker pool per region, so a saturated region never holds up the others. A dispatcher
+    # thread reads the (possibly still growing) stream of IDs and starts each region's pool on
+    # its first match. With `cache_counts`, cached payloads are served without a request.
+    fetch = fetch or fetch_and_cache_match_details
+    client = get_client()
+    results = queue.Queue(maxsize=client.max_workers * 2)
+    started = object()
+    finished = object()
+
+    # A failing match is logged and skipped, the rest of its region keeps going
+    def fetch_one(match_id):
+        try:
+            return fetch(match_id)
+        except Exception as e:
+            print(f"Error fetching match {match_id}: {e}")
+            return None
+
+    def fetch_region(region_ids):
+        try:
+            for match_data in client.imap_unordered(fetch_one, iter(region_ids.get, finished)):
+                results.put(match_data)
+        except Exception as e:
+            print(f"Error fetching match details: {e}")
+        finally:
+            results.put(finished)
+
+    def dispatch_one(match_id, region_queues):
+        region = region_of_match(match_id)
+        if region not in region_queues:
+            region_queues[region] = queue.Queue()
+            results.put(started)
+            threading.Thread(target=fetch_region, args=(region_queues[region],), daemon=True).start()
+        region_queues[region].put(match_id)
+
+    def cached_payloads(batch):
+        if cache_counts is None:
+            return {}
+        try:
+            return match_cache.get_many(batch)
+        except Exception as e:
+            print(f"Error reading {len(batch)} match details from the cache: {e}")
+            return {}
+
+    def dispatch():
+        region_queues = {}
+        ids = iter(match_ids)
+        try:
+            # The cache is read one batch of IDs at a time rather than one query per match
+            for batch in iter(lambda: list(itertools.islice(ids, DISPATCH_BATCH_SIZE)), []):
+                cached = cached_payloads(batch)
+                for match_id in batch:
+                    try:
+                        if cached.get(match_id):
+                            cache_counts["hits"] += 1
+                            results.put(cached[match_id])
+                            continue
+                        if cache_counts is not None:
+                            cache_counts["misses"] += 1
+                        dispatch_one(match_id, region_queues)
+                    except Exception as e:
+                        print(f"Skipping match {match_id}: {e}")
+        except Exception as e:
+            print(f"Error dispatching match IDs: {e}")
+        finally:
+            for region_ids in region_queues.values():
+                region_ids.put(finished)
+            results.put(finished)
+
+    threading.Thread(target=dispatch, daemon=True).start()
+
+    remaining = 1
+    while remaining:
+        match_data = results.get()
+        if match_data is started:
+            remaining += 1
+        elif match_data is finished:
+            remaining -= 1
+        else:
+            yield match_data
+
+
 def save_matches_to_dataframe(matches_data: list) -> pd.DataFrame:
     """
     Save match data into a DataFrame.
+    Legacy in-memory path, kept for scripts: the pipeline writes matches to the Parquet
+    dataset with `write_match_dataset` instead.
 
     Args:
         matches_data (list): List of match details.
@@ -209,26 +544,4 @@ def save_matches_to_dataframe(matches_data: list) -> pd.DataFrame:
     Returns:
         pd.DataFrame: A DataFrame containing structured match data.
     """
-    rows = []
-    for match in matches_data:
-        match_id = match.get('metadata', {}).get('matchId')
-        participants = match.get('info', {}).get('participants', [])
-        teams = match.get('info', {}).get('teams', [])
-
-        # Collect bans for each team
-        bans_team_1 = [ban["championId"] for ban in teams[0].get("bans", [])] if len(teams) > 0 else []
-        bans_team_2 = [ban["championId"] for ban in teams[1].get("bans", [])] if len(teams) > 1 else []
-
-        for participant in participants:
-            rows.append({
-                "match_id": match_id,
-                "summoner_name": participant.get('summonerName'),
-                "champion_id": participant.get('championId'),
-                "role": participant.get('teamPosition'),
-                "win": participant.get('win'),
-                "bans_team_1": bans_team_1,
-                "bans_team_2": bans_team_2,
-            })
-
-    return pd.DataFrame(rows)
-
+    return pd.DataFrame(list(iter_participant_rows(matches_data)))
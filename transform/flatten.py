@@ -0,0 +1,123 @@
+# Team positions reported by match-v5 (empty for remakes and some custom games)
+ROLES = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY", "UNKNOWN"]
+
+
+def flatten_match(match: dict) -> list:
+    """
+    Flatten a match payload into one row per participant.
+
+    Args:
+        match (dict): Match details as returned by the match-v5 API.
+
+    Returns:
+        list: A list of participant rows (dict).
+    """
+    match_id = match.get('metadata', {}).get('matchId')
+    participants = match.get('info', {}).get('participants', [])
+    teams = match.get('info', {}).get('teams', [])
+
+    # Collect bans for each team
+    bans_team_1 = [ban["championId"] for ban in teams[0].get("bans", [])] if len(teams) > 0 else []
+    bans_team_2 = [ban["championId"] for ban in teams[1].get("bans", [])] if len(teams) > 1 else []
+
+    return [
+        {
+            "match_id": match_id,
+            "summoner_name": participant.get('summonerName'),
+            "team_id": participant.get('teamId'),
+            "champion_id": participant.get('championId'),
+            "role": participant.get('teamPosition'),
+            "win": participant.get('win'),
+            "bans_team_1": bans_team_1,
+            "bans_team_2": bans_team_2,
+        }
+        for participant in participants
+    ]
+
+
+def patch_from_game_version(game_version: str) -> str:
+    """
+    Extract the patch ("14.23") from a match `gameVersion` ("14.23.636.4567").
+
+    Args:
+        game_version (str): Game version reported in the match info.
+
+    Returns:
+        str: The major.minor patch, or "unknown" if the version cannot be parsed.
+    """
+    parts = (game_version or "").split(".")
+    if len(parts) < 2:
+        return "unknown"
+    return f"{parts[0]}.{parts[1]}"
+
+
+def normalize_match(match: dict, tier: str = None) -> tuple:
+    """
+    Split a match payload into normalized match, participant and ban rows.
+    Bans are stored once per match instead of being repeated on every participant row.
+
+    Args:
+        match (dict): Match details as returned by the match-v5 API.
+        tier (str): Tier the match was collected from (e.g. "CHALLENGER"), if known.
+
+    Returns:
+        tuple: (match_row, participant_rows, ban_rows).
+    """
+    info = match.get('info', {})
+    match_id = match.get('metadata', {}).get('matchId')
+    patch = patch_from_game_version(info.get('gameVersion'))
+
+    match_row = {
+        "match_id": match_id,
+        "platform": (info.get('platformId') or "").lower(),
+        "tier": tier,
+        "game_creation": info.get('gameCreation'),
+        "game_duration": info.get('gameDuration'),
+        "game_version": info.get('gameVersion'),
+        "patch": patch,
+    }
+
+    participant_rows = [
+        {
+            "match_id": match_id,
+            "participant_id": participant.get('participantId'),
+            "puuid": participant.get('puuid'),
+            "summoner_name": participant.get('summonerName'),
+            "team_id": participant.get('teamId'),
+            "champion_id": participant.get('championId'),
+            "role": participant.get('teamPosition') or "UNKNOWN",
+            "win": participant.get('win'),
+            "patch": patch,
+        }
+        for participant in info.get('participants', [])
+    ]
+
+    # A championId of -1 means the player did not ban
+    ban_rows = [
+        {
+            "match_id": match_id,
+            "team_id": team.get('teamId'),
+            "pick_turn": ban.get('pickTurn'),
+            "champion_id": ban.get('championId'),
+            "patch": patch,
+        }
+        for team in info.get('teams', [])
+        for ban in team.get('bans', [])
+        if ban.get('championId', -1) != -1
+    ]
+
+    return match_row, participant_rows, ban_rows
+
+
+def iter_participant_rows(matches):
+    """
+    Flatten match payloads lazily, dropping each payload once its rows are produced.
+
+    Args:
+        matches (iterable): Iterable of match details (e.g. a generator of API responses).
+
+    Yields:
+        dict: One participant row at a time.
+    """
+    for match in matches:
+        yield from flatten_match(match)
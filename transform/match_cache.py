@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Default location and eviction policy of the match cache
+DEFAULT_CACHE_PATH = os.path.join("datasets", "match_cache.sqlite")
+MAX_AGE_DAYS = 30
+MAX_SIZE_MB = 2048
+
+# SQLite caps the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+
+class MatchCache:
+    """
+    Persistent store of raw match-v5 payloads, keyed by match ID.
+
+    Payloads are stored zlib-compressed in a SQLite database in WAL mode, so several
+    fetch workers (threads or processes) can read and write it at the same time.
+    Every write is committed immediately, which lets an interrupted run resume
+    without losing the matches it already downloaded.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_age_days: float = MAX_AGE_DAYS,
+                 max_size_mb: float = MAX_SIZE_MB):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.max_size_mb = max_size_mb
+        self.local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared between threads, so each worker gets its own
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS matches ("
+                "match_id TEXT PRIMARY KEY, "
+                "payload BLOB NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "fetched_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS matches_fetched_at ON matches (fetched_at)")
+            connection.commit()
+            self.local.connection = connection
+        return connection
+
+    def iter_many(self, match_ids: list):
+        """
+        Yield cached payloads one batch of lookups at a time.
+
+        Args:
+            match_ids (list): List of match IDs.
+
+        Yields:
+            tuple: (match_id, payload) for every cached match.
+        """
+        connection = self._connection()
+        for start in range(0, len(match_ids), LOOKUP_BATCH_SIZE):
+            batch = match_ids[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = connection.execute(
+                f"SELECT match_id, payload FROM matches WHERE match_id IN ({placeholders})", batch
+            ).fetchall()
+            for match_id, payload in rows:
+                yield match_id, json.loads(zlib.decompress(payload))
+
+    def get(self, match_id: str) -> dict:
+        """
+        Look up one match.
+
+        Args:
+            match_id (str): Match ID.
+
+        Returns:
+            dict: The decoded payload, or None if the match is not cached.
+        """
+        row = self._connection().execute(
+            "SELECT payload FROM matches WHERE match_id = ?", (match_id,)
+        ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def get_many(self, match_ids: list) -> dict:
+        """
+        Look up several matches in batched queries.
+
+        Args:
+            match_ids (list): List of match IDs.
+
+        Returns:
+            dict: A dictionary mapping the cached match IDs to their decoded payloads.
+        """
+        return dict(self.iter_many(match_ids))
+
+    def missing(self, match_ids: list) -> list:
+        """
+        Return the match IDs that are not cached yet, preserving their order.
+
+        Args:
+            match_ids (list): List of match IDs.
+
+        Returns:
+            list: The match IDs absent from the cache.
+        """
+        connection = self._connection()
+        cached = set()
+        for start in range(0, len(match_ids), LOOKUP_BATCH_SIZE):
+            batch = match_ids[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = connection.execute(f"SELECT match_id FROM matches WHERE match_id IN ({placeholders})", batch)
+            cached.update(match_id for (match_id,) in rows)
+        return [match_id for match_id in match_ids if match_id not in cached]
+
+    def put(self, match_id: str, payload: dict) -> None:
+        """
+        Store (or replace) the payload of a match.
+
+        Args:
+            match_id (str): Match ID.
+            payload (dict): Raw match-v5 payload.
+        """
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO matches (match_id, payload, size, fetched_at) VALUES (?, ?, ?, ?)",
+                (match_id, blob, len(blob), time.time()),
+            )
+
+    def evict(self) -> int:
+        """
+        Remove entries older than `max_age_days`, then the oldest entries until the
+        cache fits in `max_size_mb`.
+
+        Returns:
+            int: The number of evicted matches.
+        """
+        connection = self._connection()
+        with connection:
+            expired = connection.execute(
+                "DELETE FROM matches WHERE fetched_at < ?",
+                (time.time() - self.max_age_days * 24 * 60 * 60,),
+            ).rowcount
+            oversized = connection.execute(
+                "DELETE FROM matches WHERE match_id IN ("
+                "SELECT match_id FROM ("
+                "SELECT match_id, SUM(size) OVER (ORDER BY fetched_at DESC, match_id) AS running_size "
+                "FROM matches) WHERE running_size > ?)",
+                (int(self.max_size_mb * 1024 * 1024),),
+            ).rowcount
+        return expired + oversized
@@ -0,0 +1,265 @@
+import numpy as np
+import pandas as pd
+
+from .flatten import ROLES
+from .metrics import metrics
+from .stats import wilson_interval
+
+# Lanes of a matchup: the opponent is the enemy champion with the same team position
+LANE_ROLES = ROLES[:5]
+
+# Players per team, i.e. champion slots of a roster
+TEAM_SIZE = 5
+
+# Teammate pairs of a roster, as slot indices
+_PAIR_SLOTS = np.triu_indices(TEAM_SIZE, k=1)
+
+# Default location of the saved matrices
+MATCHUPS_PATH = "datasets/matchups.npz"
+
+
+class MatchupMatrices:
+    """
+    Lane matchup and teammate synergy counters of every champion pair.
+
+    Champions are mapped to dense indices, and each batch of participant rows is laid out as
+    fixed-size per-match arrays (one champion index per team and lane, one roster per team),
+    so pairs are read by array indexing instead of self-joining the participants on `match_id`.
+    Pair counts are accumulated with a single `np.bincount` over flattened pair indices.
+
+    Attributes:
+        champion_ids (np.ndarray): Sorted champion IDs; position i is the dense index of a champion.
+        matchup_games (np.ndarray): (lanes, champions, champions) games of a champion (row)
+                                    against an enemy champion (column) in the same lane.
+        matchup_wins (np.ndarray): Wins of the row champion in those games.
+        synergy_games (np.ndarray): (champions, champions) games played on the same team.
+        synergy_wins (np.ndarray): Wins of those games.
+    """
+
+    def __init__(self):
+        self.champion_ids = np.empty(0, dtype=np.int64)
+        self.matchup_games = np.zeros((len(LANE_ROLES), 0, 0), dtype=np.int64)
+        self.matchup_wins = np.zeros((len(LANE_ROLES), 0, 0), dtype=np.int64)
+        self.synergy_games = np.zeros((0, 0), dtype=np.int64)
+        self.synergy_wins = np.zeros((0, 0), dtype=np.int64)
+
+    @classmethod
+    def from_participants(cls, participants_df: pd.DataFrame) -> "MatchupMatrices":
+        """
+        Build the matrices from participant rows.
+
+        Args:
+            participants_df (pd.DataFrame): Rows with `match_id`, `team_id`, `champion_id`, `role`
+                                            and `win` (e.g. the `participants` table).
+
+        Returns:
+            MatchupMatrices: The counters of these matches.
+        """
+        matrices = cls()
+        matrices.update(participants_df)
+        return matrices
+
+    def update(self, participants_df: pd.DataFrame) -> "MatchupMatrices":
+        """
+        Add the matches of a batch of participant rows. Batches must not share matches.
+
+        Args:
+            participants_df (pd.DataFrame): Participant rows, as in `from_participants`.
+
+        Returns:
+            MatchupMatrices: self.
+        """
+        with metrics.stage("matchups") as stage:
+            rows = participants_df.dropna(subset=['match_id', 'team_id', 'champion_id', 'win'])
+            self._add_champions(np.unique(rows['champion_id'].to_numpy(dtype=np.int64)))
+
+            champions = np.searchsorted(self.champion_ids, rows['champion_id'].to_numpy(dtype=np.int64))
+            matches, match_ids = pd.factorize(rows['match_id'])
+            teams = (rows['team_id'].to_numpy() != 100).astype(np.int64)
+            wins = rows['win'].to_numpy(dtype=bool)
+            lanes = pd.Categorical(rows['role'].astype(object), categories=LANE_ROLES).codes.astype(np.int64)
+
+            # Result of each team (0: blue, 1: red) of each match
+            team_wins = np.zeros((len(match_ids), 2), dtype=bool)
+            team_wins[matches, teams] = wins
+
+            self._add_matchups(matches, teams, lanes, champions, team_wins)
+            self._add_synergies(matches, teams, champions, team_wins)
+            stage["rows"] = len(match_ids)
+        return self
+
+    def matchups(self, champion_id: int, role: str = None, min_games: int = 0, names: dict = None) -> pd.DataFrame:
+        """
+        Lane matchups of a champion against every opponent it met.
+
+        Args:
+            champion_id (int): Champion ID.
+            role (str): Lane ("TOP", "JUNGLE", "MIDDLE", "BOTTOM" or "UTILITY"). All lanes if None.
+            min_games (int): Minimum number of games of a matchup.
+            names (dict): Optional mapping of champion IDs to names, added as `opponent_name`.
+
+        Returns:
+            pd.DataFrame: One row per lane and opponent, with `role`, `opponent_id`, `games`, `wins`,
+                          `win_rate`, `win_rate_low` and `win_rate_high` (percentages),
+                          sorted by games played.
+        """
+        position = self._position(champion_id)
+        lanes = range(len(LANE_ROLES)) if role is None else [LANE_ROLES.index(role)]
+        frames = []
+        if position is not None:
+            for lane in lanes:
+                frames.append(self._pair_frame(self.matchup_games[lane, position], self.matchup_wins[lane, position],
+                                               "opponent_id", role=LANE_ROLES[lane]))
+        return self._finish(frames, champion_id, "opponent_id", min_games, names)
+
+    def synergies(self, champion_id: int, min_games: int = 0, names: dict = None) -> pd.DataFrame:
+        """
+        Results of a champion with every teammate it played with.
+
+        Args:
+            champion_id (int): Champion ID.
+            min_games (int): Minimum number of games played together.
+            names (dict): Optional mapping of champion IDs to names, added as `teammate_name`.
+
+        Returns:
+            pd.DataFrame: One row per teammate, with `teammate_id`, `games`, `wins`, `win_rate`,
+                          `win_rate_low` and `win_rate_high` (percentages), sorted by games played.
+        """
+        position = self._position(champion_id)
+        frames = []
+        if position is not None:
+            frames.append(self._pair_frame(self.synergy_games[position], self.synergy_wins[position], "teammate_id"))
+        return self._finish(frames, champion_id, "teammate_id", min_games, names)
+
+    def save(self, path: str = MATCHUPS_PATH) -> str:
+        """
+        Save the matrices to a compressed NumPy archive.
+
+        Args:
+            path (str): Output path.
+
+        Returns:
+            str: The output path.
+        """
+        np.savez_compressed(
+            path,
+            champion_ids=self.champion_ids,
+            matchup_games=self.matchup_games,
+            matchup_wins=self.matchup_wins,
+            synergy_games=self.synergy_games,
+            synergy_wins=self.synergy_wins,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str = MATCHUPS_PATH) -> "MatchupMatrices":
+        """
+        Load matrices saved by `save`.
+
+        Args:
+            path (str): Archive path.
+
+        Returns:
+            MatchupMatrices: The saved counters.
+        """
+        matrices = cls()
+        with np.load(path) as archive:
+            for name in ("champion_ids", "matchup_games", "matchup_wins", "synergy_games", "synergy_wins"):
+                setattr(matrices, name, archive[name])
+        return matrices
+
+    def _add_champions(self, champion_ids: np.ndarray) -> None:
+        # Grow the matrices when a batch brings champions not seen yet, keeping IDs sorted
+        new_ids = np.setdiff1d(champion_ids, self.champion_ids)
+        if new_ids.size == 0:
+            return
+        merged = np.union1d(self.champion_ids, new_ids)
+        old = np.searchsorted(merged, self.champion_ids)
+        size = len(merged)
+
+        for name in ("matchup_games", "matchup_wins"):
+            grown = np.zeros((len(LANE_ROLES), size, size), dtype=np.int64)
+            grown[:, old[:, None], old] = getattr(self, name)
+            setattr(self, name, grown)
+        for name in ("synergy_games", "synergy_wins"):
+            grown = np.zeros((size, size), dtype=np.int64)
+            grown[old[:, None], old] = getattr(self, name)
+            setattr(self, name, grown)
+        self.champion_ids = merged
+
+    def _add_matchups(self, matches, teams, lanes, champions, team_wins) -> None:
+        # Champion index of each (match, team, lane), -1 when the lane is unknown
+        laned = lanes >= 0
+        slots = np.full((len(team_wins), 2, len(LANE_ROLES)), -1, dtype=np.int64)
+        slots[matches[laned], teams[laned], lanes[laned]] = champions[laned]
+
+        match_index, lane_index = np.nonzero((slots[:, 0] >= 0) & (slots[:, 1] >= 0))
+        blue = slots[match_index, 0, lane_index]
+        red = slots[match_index, 1, lane_index]
+
+        # Each matchup counts once from each side
+        size = len(self.champion_ids)
+        rows = np.concatenate([blue, red])
+        columns = np.concatenate([red, blue])
+        won = np.concatenate([team_wins[match_index, 0], team_wins[match_index, 1]])
+        flat = (np.concatenate([lane_index, lane_index]) * size + rows) * size + columns
+        self.matchup_games += self._count(flat, self.matchup_games.shape)
+        self.matchup_wins += self._count(flat, self.matchup_games.shape, won)
+
+    def _add_synergies(self, matches, teams, champions, team_wins) -> None:
+        # Roster of each (match, team): champions in row order, -1 padded
+        team_keys = matches * 2 + teams
+        order = np.argsort(team_keys, kind="stable")
+        sorted_keys = team_keys[order]
+        slot = np.empty(len(order), dtype=np.int64)
+        slot[order] = np.arange(len(order)) - np.searchsorted(sorted_keys, sorted_keys, side="left")
+
+        in_roster = slot < TEAM_SIZE
+        rosters = np.full((len(team_wins) * 2, TEAM_SIZE), -1, dtype=np.int64)
+        rosters[team_keys[in_roster], slot[in_roster]] = champions[in_roster]
+
+        first, second = rosters[:, _PAIR_SLOTS[0]], rosters[:, _PAIR_SLOTS[1]]
+        valid = (first >= 0) & (second >= 0)
+        won = np.broadcast_to(team_wins.reshape(-1)[:, None], first.shape)[valid]
+        first, second = first[valid], second[valid]
+
+        # Each pair counts once from each teammate's side
+        rows = np.concatenate([first, second])
+        columns = np.concatenate([second, first])
+        flat = rows * len(self.champion_ids) + columns
+        won = np.concatenate([won, won])
+        self.synergy_games += self._count(flat, self.synergy_games.shape)
+        self.synergy_wins += self._count(flat, self.synergy_games.shape, won)
+
+    @staticmethod
+    def _count(flat: np.ndarray, shape: tuple, weights: np.ndarray = None) -> np.ndarray:
+        if weights is not None:
+            flat = flat[weights]
+        return np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+    def _position(self, champion_id: int):
+        position = np.searchsorted(self.champion_ids, champion_id)
+        if position < len(self.champion_ids) and self.champion_ids[position] == champion_id:
+            return position
+        return None
+
+    def _pair_frame(self, games: np.ndarray, wins: np.ndarray, other_col: str, role: str = None) -> pd.DataFrame:
+        played = np.flatnonzero(games)
+        frame = pd.DataFrame({other_col: self.champion_ids[played], "games": games[played], "wins": wins[played]})
+        if role is not None:
+            frame.insert(0, "role", role)
+        return frame
+
+    @staticmethod
+    def _finish(frames: list, champion_id: int, other_col: str, min_games: int, names: dict) -> pd.DataFrame:
+        columns = (["role"] if other_col == "opponent_id" else []) + [other_col, "games", "wins"]
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        frame = frame[frame["games"] >= max(min_games, 1)].astype({"games": np.int64, "wins": np.int64})
+        frame.insert(0, "champion_id", champion_id)
+
+        frame["win_rate"] = frame["wins"] / frame["games"] * 100
+        low, high = wilson_interval(frame["wins"].to_numpy(), frame["games"].to_numpy())
+        frame["win_rate_low"], frame["win_rate_high"] = low * 100, high * 100
+        if names is not None:
+            frame[other_col.replace("_id", "_name")] = frame[other_col].map(names)
+        return frame.sort_values("games", ascending=False).reset_index(drop=True)
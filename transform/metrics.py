@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = "lol_balancer"
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets, in the Prometheus format.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip([*self.buckets, float("inf")], self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {"count": self.count, "sum": round(self.sum, 6), "buckets": buckets}
+
+
+class Metrics:
+    """
+    Thread-safe registry of run measurements: request latency per endpoint, counters
+    (requests, 429s, retries), seconds spent waiting or backing off, rate limit headroom
+    and per-stage timings.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.latency = defaultdict(Histogram)
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self.stages = []
+
+    def observe_request(self, endpoint: str, seconds: float, status) -> None:
+        """
+        Record the latency and status of one API request.
+
+        Args:
+            endpoint (str): API method name (e.g. "match-v5.match").
+            seconds (float): Request duration.
+            status: HTTP status code, or "error" for network errors.
+        """
+        with self.lock:
+            self.latency[endpoint].observe(seconds)
+            self.counters[("requests_total", (("endpoint", endpoint), ("status", str(status))))] += 1
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name (str): Counter name (e.g. "retries_total").
+            value (float): Increment.
+            **labels: Counter labels.
+        """
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """
+        Set a gauge to its latest value.
+
+        Args:
+            name (str): Gauge name (e.g. "rate_limit_headroom").
+            value (float): Current value.
+            **labels: Gauge labels.
+        """
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a pipeline stage. The caller can set `rows` on the yielded dict.
+
+        Args:
+            name (str): Stage name.
+
+        Yields:
+            dict: The stage record.
+        """
+        record = {"stage": name, "rows": None}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            paused = record.pop("paused_seconds", 0.0)
+            record["seconds"] = round(time.perf_counter() - start - paused, 4)
+            if paused:
+                record["paused_seconds"] = round(paused, 4)
+            with self.lock:
+                self.stages.append(record)
+
+    @contextmanager
+    def paused(self, record: dict):
+        """
+        Leave a stretch of time out of a stage's duration. Generator stages wrap their `yield`
+        in it, so the time their consumer spends on each item is not counted as theirs.
+
+        Args:
+            record (dict): The stage record yielded by `stage`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["paused_seconds"] = record.get("paused_seconds", 0.0) + time.perf_counter() - start
+
+    def to_dict(self) -> dict:
+        """
+        Return every measurement as a JSON-serializable dictionary.
+        """
+        with self.lock:
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": round(time.time() - self.started_at, 4),
+                "latency_seconds": {endpoint: histogram.to_dict() for endpoint, histogram in self.latency.items()},
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                           for (name, labels), value in sorted(self.gauges.items())],
+                "stages": list(self.stages),
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Return every measurement in the Prometheus text exposition format.
+        """
+        report = self.to_dict()
+        lines = []
+
+        name = f"{METRIC_PREFIX}_request_latency_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for endpoint, histogram in report["latency_seconds"].items():
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {histogram["count"]}')
+
+        for kind, entries in (("counter", report["counters"]), ("gauge", report["gauges"])):
+            declared = set()
+            for entry in entries:
+                metric = f"{METRIC_PREFIX}_{entry['name']}"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} {kind}")
+                    declared.add(metric)
+                lines.append(f"{metric}{_labels(entry['labels'])} {entry['value']}")
+
+        # A stage can run several times (e.g. once per chunk): one series per stage name
+        totals = {}
+        for record in report["stages"]:
+            total = totals.setdefault(record["stage"], {"seconds": 0.0, "rows": None, "runs": 0})
+            total["seconds"] += record["seconds"]
+            total["runs"] += 1
+            if record.get("rows") is not None:
+                total["rows"] = (total["rows"] or 0) + record["rows"]
+
+        stage_metrics = (
+            (f"{METRIC_PREFIX}_stage_seconds", "seconds"),
+            (f"{METRIC_PREFIX}_stage_rows", "rows"),
+            (f"{METRIC_PREFIX}_stage_runs", "runs"),
+        )
+        for metric, field in stage_metrics:
+            lines.append(f"# TYPE {metric} gauge")
+            for stage, total in totals.items():
+                if total[field] is not None:
+                    value = round(total[field], 4) if field == "seconds" else total[field]
+                    lines.append(f'{metric}{{stage="{stage}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str = "reports", name: str = "run_report") -> tuple:
+        """
+        Write the run report as JSON and Prometheus text files.
+
+        Args:
+            directory (str): Output directory.
+            name (str): Base file name.
+
+        Returns:
+            tuple: Paths of the JSON and Prometheus files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f"{name}.json")
+        prometheus_path = os.path.join(directory, f"{name}.prom")
+        with open(json_path, "w") as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+        with open(prometheus_path, "w") as prometheus_file:
+            prometheus_file.write(self.to_prometheus())
+        return json_path, prometheus_path
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+# Process-wide registry
+metrics = Metrics()
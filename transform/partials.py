@@ -0,0 +1,332 @@
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta, timezone
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .fetch_champions import add_ban_counts, add_rate_columns
+
+# Root of the partial aggregates
+AGGREGATES_DIR = os.path.join("datasets", "aggregates")
+
+# Partials are partitioned by game day (YYYY-MM-DD) and tagged by platform and tier
+PARTIAL_PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+
+# Additive counters: summing any set of partials gives the counters of their union
+PARTIAL_SCHEMAS = {
+    "champions": pa.schema([
+        ("day", pa.string()),
+        ("patch", pa.string()),
+        ("platform", pa.string()),
+        ("tier", pa.string()),
+        ("champion_id", pa.int16()),
+        ("role", pa.string()),
+        ("picks", pa.int64()),
+        ("wins", pa.int64()),
+    ]),
+    "bans": pa.schema([
+        ("day", pa.string()),
+        ("patch", pa.string()),
+        ("platform", pa.string()),
+        ("tier", pa.string()),
+        ("champion_id", pa.int16()),
+        ("bans", pa.int64()),
+    ]),
+    "matches": pa.schema([
+        ("day", pa.string()),
+        ("patch", pa.string()),
+        ("platform", pa.string()),
+        ("tier", pa.string()),
+        ("matches", pa.int64()),
+    ]),
+}
+
+# Marker rewritten whenever the partials change, so readers know when to reload them
+INGEST_MARKER = "_LAST_INGEST"
+
+# Directory of the aggregate store where compaction and rebuilds write tables before swapping them in
+STAGING_DIR = "_staging"
+
+PARTIAL_DIMENSIONS = ("day", "patch", "platform", "tier", "champion_id", "role")
+PARTIAL_KEYS = {name: [field for field in schema.names if field in PARTIAL_DIMENSIONS]
+                for name, schema in PARTIAL_SCHEMAS.items()}
+
+
+def game_days(game_creation: pd.Series) -> pd.Series:
+    """
+    Return the game day (YYYY-MM-DD, UTC) of match creation timestamps, as used by the partials.
+
+    Args:
+        game_creation (pd.Series): Match creation timestamps, in milliseconds.
+
+    Returns:
+        pd.Series: The game days.
+    """
+    return pd.to_datetime(game_creation, unit='ms').dt.strftime('%Y-%m-%d')
+
+
+def build_partials(matches_df: pd.DataFrame, participants_df: pd.DataFrame, bans_df: pd.DataFrame) -> dict:
+    """
+    Build additive counters per game day, patch, platform, tier, champion and role from a batch of new matches.
+
+    Args:
+        matches_df (pd.DataFrame): Rows of the `matches` table (`match_id`, `game_creation`, `patch`,
+                                   `platform`, `tier`).
+        participants_df (pd.DataFrame): Rows of the `participants` table for the same matches.
+        bans_df (pd.DataFrame): Rows of the `bans` table for the same matches.
+
+    Returns:
+        dict: A DataFrame of counters for each partial table ("champions", "bans", "matches").
+    """
+    # Match-level tags copied onto participant and ban rows
+    tags = pd.DataFrame({
+        'match_id': matches_df['match_id'].values,
+        'day': game_days(matches_df['game_creation']).values,
+        'platform': matches_df['platform'].fillna('unknown').astype(str).values,
+        'tier': matches_df['tier'].fillna('UNKNOWN').astype(str).values,
+    })
+    matches = matches_df[['match_id', 'patch']].merge(tags, on='match_id')
+    participants = participants_df.merge(tags, on='match_id')
+    # A champion banned by both teams only counts once for the match
+    bans = bans_df.drop_duplicates(['match_id', 'champion_id']).merge(tags, on='match_id')
+
+    champions = (
+        participants.astype({'role': str})
+        .groupby(PARTIAL_KEYS["champions"], observed=True)
+        .agg(picks=('win', 'size'), wins=('win', 'sum'))
+        .reset_index()
+    )
+    ban_counts = bans.groupby(PARTIAL_KEYS["bans"], observed=True).size().rename('bans').reset_index()
+    match_counts = matches.groupby(PARTIAL_KEYS["matches"], observed=True).size().rename('matches').reset_index()
+
+    return {"champions": champions, "bans": ban_counts, "matches": match_counts}
+
+
+def write_partials(partials: dict, root: str = AGGREGATES_DIR, basename_template: str = None) -> None:
+    """
+    Append partial counters to the aggregate store.
+
+    Args:
+        partials (dict): Output of `build_partials`.
+        root (str): Root directory of the aggregate store.
+        basename_template (str): File name template (e.g. "part-<chunk>-{i}.parquet"). Defaults to unique names.
+    """
+    for name, frame in partials.items():
+        if frame.empty:
+            continue
+        table = pa.Table.from_pandas(frame, schema=PARTIAL_SCHEMAS[name], preserve_index=False)
+        pq.write_to_dataset(table, os.path.join(root, name), partition_cols=["day"],
+                            basename_template=basename_template)
+
+
+def mark_ingest(root: str = AGGREGATES_DIR) -> None:
+    """
+    Record that the partials changed (end of an ingest, compaction or rebuild).
+
+    Args:
+        root (str): Root directory of the aggregate store.
+    """
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, INGEST_MARKER)
+    with open(path + ".tmp", "w") as marker_file:
+        marker_file.write(str(time.time_ns()))
+    os.replace(path + ".tmp", path)
+
+
+def ingest_version(root: str = AGGREGATES_DIR) -> str:
+    """
+    Return an identifier of the current state of the partials, which changes with every ingest.
+
+    Args:
+        root (str): Root directory of the aggregate store.
+
+    Returns:
+        str: The version, or "0" if nothing was ingested yet.
+    """
+    try:
+        with open(os.path.join(root, INGEST_MARKER)) as marker_file:
+            return marker_file.read().strip() or "0"
+    except OSError:
+        return "0"
+
+
+def load_partials(name: str, days: list = None, patches: list = None, root: str = AGGREGATES_DIR,
+                  platforms: list = None, tiers: list = None) -> pd.DataFrame:
+    """
+    Load partial counters, reading only the requested day partitions.
+
+    Args:
+        name (str): Partial table name ("champions", "bans" or "matches").
+        days (list): Game days (YYYY-MM-DD) to read. All days are read if None.
+        patches (list): Patches to keep. All patches are kept if None.
+        root (str): Root directory of the aggregate store.
+        platforms (list): Platforms to keep (e.g. ["euw1", "kr"]). All platforms are kept if None.
+        tiers (list): Tiers to keep (e.g. ["CHALLENGER"]). All tiers are kept if None.
+
+    Returns:
+        pd.DataFrame: The partial counters.
+    """
+    path = os.path.join(root, name)
+    if not os.path.isdir(path):
+        return PARTIAL_SCHEMAS[name].empty_table().to_pandas()
+
+    filters = []
+    if days is not None:
+        filters.append(("day", "in", list(days)))
+    if patches is not None:
+        filters.append(("patch", "in", list(patches)))
+    if platforms is not None:
+        filters.append(("platform", "in", list(platforms)))
+    if tiers is not None:
+        filters.append(("tier", "in", list(tiers)))
+
+    table = pq.read_table(path, filters=filters or None, partitioning=PARTIAL_PARTITIONING)
+    return table.to_pandas()
+
+
+def compact_partials(root: str = AGGREGATES_DIR) -> None:
+    """
+    Merge the partial files written by successive ingests into one file per day.
+
+    Args:
+        root (str): Root directory of the aggregate store.
+    """
+    staging = os.path.join(root, STAGING_DIR)
+    if os.path.isdir(staging):
+        shutil.rmtree(staging)
+    for name in PARTIAL_SCHEMAS:
+        frame = load_partials(name, root=root)
+        if frame.empty:
+            continue
+        frame['day'] = frame['day'].astype(str)
+        counters = [field for field in PARTIAL_SCHEMAS[name].names if field not in PARTIAL_KEYS[name]]
+        merged = frame.groupby(PARTIAL_KEYS[name], observed=True)[counters].sum().reset_index()
+        write_partials({name: merged}, staging)
+        _swap_table(staging, root, name)
+    shutil.rmtree(staging, ignore_errors=True)
+    mark_ingest(root)
+
+
+def rebuild_partials(dataset_root: str = None, root: str = AGGREGATES_DIR) -> None:
+    """
+    Recompute every partial from the full match dataset (e.g. after changing the counters).
+
+    Args:
+        dataset_root (str): Root directory of the match dataset. Defaults to `storage.DATASET_DIR`.
+        root (str): Root directory of the aggregate store.
+    """
+    from .storage import DATASET_DIR, load_table
+
+    dataset_root = dataset_root or DATASET_DIR
+    matches_df = load_table("matches", columns=["match_id", "game_creation", "patch", "platform", "tier"],
+                            root=dataset_root)
+    participants_df = load_table("participants", columns=["match_id", "champion_id", "role", "win", "patch"],
+                                 root=dataset_root)
+    bans_df = load_table("bans", columns=["match_id", "champion_id", "patch"], root=dataset_root)
+
+    staging = os.path.join(root, STAGING_DIR)
+    if os.path.isdir(staging):
+        shutil.rmtree(staging)
+    write_partials(build_partials(matches_df, participants_df, bans_df), staging)
+    for name in PARTIAL_SCHEMAS:
+        _swap_table(staging, root, name)
+    shutil.rmtree(staging, ignore_errors=True)
+    mark_ingest(root)
+
+
+def _swap_table(staging: str, root: str, name: str) -> None:
+    # A directory cannot replace a non-empty one in a single rename: the old table is moved aside,
+    # the new one renamed in, then the old one deleted. Readers never see a half-written table,
+    # and the table is only missing between the two renames. A table absent from staging is removed.
+    path = os.path.join(root, name)
+    new_path = os.path.join(staging, name)
+    old_path = os.path.join(staging, f"{name}.old")
+    if os.path.isdir(old_path):
+        shutil.rmtree(old_path)
+    if os.path.isdir(path):
+        os.replace(path, old_path)
+    if os.path.isdir(new_path):
+        os.replace(new_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def utc_today() -> date:
+    """
+    Return the current date in UTC, the time zone game days are bucketed in.
+    """
+    return datetime.now(timezone.utc).date()
+
+
+def window_days(days: int, end_date: date = None) -> list:
+    """
+    List the game days of a rolling window ending on `end_date` (included).
+
+    Args:
+        days (int): Window length in days.
+        end_date (date): Last day of the window. Defaults to today (UTC).
+
+    Returns:
+        list: Days formatted as YYYY-MM-DD.
+    """
+    end_date = end_date or utc_today()
+    return [(end_date - timedelta(days=offset)).isoformat() for offset in range(days)]
+
+
+def query_rates(days: list = None, patches: list = None, root: str = AGGREGATES_DIR,
+                platforms: list = None, tiers: list = None) -> pd.DataFrame:
+    """
+    Sum the partials of the requested days and patches into pick, ban, presence and win rates.
+
+    Args:
+        days (list): Game days (YYYY-MM-DD) to include. All days are included if None.
+        patches (list): Patches to include. All patches are included if None.
+        root (str): Root directory of the aggregate store.
+        platforms (list): Platforms to include. All platforms are included if None.
+        tiers (list): Tiers to include. All tiers are included if None.
+
+    Returns:
+        pd.DataFrame: The same columns as `calculate_pick_ban_rates`, without champion names.
+    """
+    champions = load_partials("champions", days, patches, root, platforms, tiers)
+    bans = load_partials("bans", days, patches, root, platforms, tiers)
+    total_matches = int(load_partials("matches", days, patches, root, platforms, tiers)['matches'].sum())
+
+    rates = champions.groupby(['champion_id', 'role'], observed=True)[['picks', 'wins']].sum().reset_index()
+    ban_counts = bans.groupby('champion_id')['bans'].sum()
+    return add_rate_columns(add_ban_counts(rates, ban_counts), total_matches)
+
+
+def query_window(days: int = 7, end_date: date = None, patches: list = None,
+                 root: str = AGGREGATES_DIR, platforms: list = None, tiers: list = None) -> pd.DataFrame:
+    """
+    Rates over a rolling window of game days (e.g. 1, 7, 14 or 30 days).
+
+    Args:
+        days (int): Window length in days.
+        end_date (date): Last day of the window. Defaults to today (UTC).
+        patches (list): Patches to include. All patches are included if None.
+        root (str): Root directory of the aggregate store.
+        platforms (list): Platforms to include. All platforms are included if None.
+        tiers (list): Tiers to include. All tiers are included if None.
+
+    Returns:
+        pd.DataFrame: Pick, ban, presence and win rates per champion and role.
+    """
+    return query_rates(window_days(days, end_date), patches, root, platforms, tiers)
+
+
+def query_patch(patch: str, root: str = AGGREGATES_DIR) -> pd.DataFrame:
+    """
+    Rates over every game of a patch.
+
+    Args:
+        patch (str): Patch (e.g. "14.23").
+        root (str): Root directory of the aggregate store.
+
+    Returns:
+        pd.DataFrame: Pick, ban, presence and win rates per champion and role.
+    """
+    return query_rates(None, [patch], root)
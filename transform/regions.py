@@ -0,0 +1,103 @@
+import os
+
+# Platform routing values (league-v4, summoner-v4) mapped to regional routing values (match-v5)
+PLATFORM_ROUTING = {
+    "br1": "americas",
+    "la1": "americas",
+    "la2": "americas",
+    "na1": "americas",
+    "oc1": "sea",
+    "ph2": "sea",
+    "sg2": "sea",
+    "th2": "sea",
+    "tw2": "sea",
+    "vn2": "sea",
+    "jp1": "asia",
+    "kr": "asia",
+    "eun1": "europe",
+    "euw1": "europe",
+    "me1": "europe",
+    "ru": "europe",
+    "tr1": "europe",
+}
+
+# Apex tiers and their league-v4 endpoints, from highest to lowest
+TIER_LEAGUES = {
+    "CHALLENGER": "challengerleagues",
+    "GRANDMASTER": "grandmasterleagues",
+    "MASTER": "masterleagues",
+}
+
+# Collection scope, e.g. PLATFORMS=euw1,eun1,na1,kr and TIERS=CHALLENGER,GRANDMASTER,MASTER
+DEFAULT_PLATFORM = "euw1"
+PLATFORMS = [platform.strip().lower() for platform in os.getenv("PLATFORMS", DEFAULT_PLATFORM).split(",") if platform.strip()]
+TIERS = [tier.strip().upper() for tier in os.getenv("TIERS", "CHALLENGER").split(",") if tier.strip()]
+
+# API host, overridable to target a local stand-in (e.g. RIOT_API_HOST=http://127.0.0.1:8765/{route})
+RIOT_API_HOST = os.getenv("RIOT_API_HOST", "https://{route}.api.riotgames.com")
+PLATFORM_HOST = RIOT_API_HOST.replace("{route}", "{platform}")
+REGION_HOST = RIOT_API_HOST.replace("{route}", "{region}")
+
+# URL templates
+LEAGUE_URL = PLATFORM_HOST + "/lol/league/v4/{league}/by-queue/RANKED_SOLO_5x5"
+SUMMONER_URL = PLATFORM_HOST + "/lol/summoner/v4/summoners/"
+MATCH_URL = REGION_HOST + "/lol/match/v5/matches/by-puuid/{puuid}/ids"
+MATCH_DETAILS_URL = REGION_HOST + "/lol/match/v5/matches/{matchId}"
+MATCH_TIMELINE_URL = REGION_HOST + "/lol/match/v5/matches/{matchId}/timeline"
+MASTERY_URL = PLATFORM_HOST + "/lol/champion-mastery/v4/champion-masteries/by-summoner/{summonerId}"
+
+
+def region_of(platform: str) -> str:
+    """
+    Return the regional routing value serving match-v5 for a platform.
+
+    Args:
+        platform (str): Platform routing value (e.g. "euw1").
+
+    Returns:
+        str: The regional routing value (e.g. "europe").
+    """
+    try:
+        return PLATFORM_ROUTING[platform.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown platform: {platform}")
+
+
+def platform_of_match(match_id: str) -> str:
+    """
+    Return the platform a match was played on, from its ID prefix ("EUW1_7213807322").
+
+    Args:
+        match_id (str): Match ID.
+
+    Returns:
+        str: The platform routing value (e.g. "euw1").
+    """
+    return match_id.split("_", 1)[0].lower()
+
+
+def region_of_match(match_id: str) -> str:
+    """
+    Return the regional routing value serving a match.
+
+    Args:
+        match_id (str): Match ID.
+
+    Returns:
+        str: The regional routing value (e.g. "europe").
+    """
+    return region_of(platform_of_match(match_id))
+
+
+def league_url(platform: str, tier: str) -> str:
+    """
+    Build the league-v4 URL of an apex tier on a platform.
+
+    Args:
+        platform (str): Platform routing value (e.g. "kr").
+        tier (str): Tier name ("CHALLENGER", "GRANDMASTER" or "MASTER").
+
+    Returns:
+        str: The league URL.
+    """
+    return LEAGUE_URL.format(platform=platform, league=TIER_LEAGUES[tier.upper()])
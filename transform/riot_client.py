@@ -0,0 +1,324 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import metrics
+
+# Development key limits, used until the first response reports the real ones
+DEFAULT_APP_RATE_LIMIT = "20:1,100:120"
+
+# Retry policy
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 1.0
+MAX_BACKOFF = 60.0
+
+# Concurrency: the limiter decides the real throughput, workers only need to keep it busy
+DEFAULT_WORKERS = 20
+
+
+def parse_rate_limits(header: str) -> list:
+    """
+    Parse a Riot rate limit header into (requests, seconds) pairs.
+
+    Args:
+        header (str): Header value such as "20:1,100:120".
+
+    Returns:
+        list: A list of (limit, window_seconds) tuples.
+    """
+    limits = []
+    for part in (header or "").split(","):
+        if ":" not in part:
+            continue
+        count, seconds = part.split(":", 1)
+        limits.append((int(count), int(seconds)))
+    return limits
+
+
+class RateWindow:
+    """
+    Sliding window of request timestamps for a single "limit:seconds" pair.
+    """
+
+    def __init__(self, limit: int, seconds: int):
+        self.limit = limit
+        self.seconds = seconds
+        self.timestamps = deque()
+
+    def wait_time(self, now: float) -> float:
+        """
+        Seconds to wait before one more request fits in the window.
+        """
+        while self.timestamps and self.timestamps[0] <= now - self.seconds:
+            self.timestamps.popleft()
+        if len(self.timestamps) < self.limit:
+            return 0.0
+        return self.timestamps[len(self.timestamps) - self.limit] + self.seconds - now
+
+    def record(self, now: float) -> None:
+        self.timestamps.append(now)
+
+    def sync_count(self, count: int, now: float) -> None:
+        """
+        Align the local count with the one reported by the API (e.g. other processes sharing the key).
+        """
+        missing = count - len(self.timestamps)
+        for _ in range(max(missing, 0)):
+            self.timestamps.append(now)
+
+
+class RateLimiter:
+    """
+    Application and per-method rate limiter for one routing host.
+
+    Limits start from DEFAULT_APP_RATE_LIMIT and are replaced by the values of the
+    X-App-Rate-Limit and X-Method-Rate-Limit headers as soon as responses come in.
+    """
+
+    def __init__(self, app_limits: str = DEFAULT_APP_RATE_LIMIT, host: str = ""):
+        self.host = host
+        self.lock = threading.Lock()
+        self.app_header = app_limits
+        self.app_windows = [RateWindow(limit, seconds) for limit, seconds in parse_rate_limits(app_limits)]
+        self.method_headers = {}
+        self.method_windows = {}
+        self.blocked_until = 0.0
+        self.method_blocked_until = {}
+
+    def _windows(self, method: str) -> list:
+        return self.app_windows + self.method_windows.get(method, [])
+
+    def acquire(self, method: str) -> None:
+        """
+        Block until a request for `method` fits in every window, then reserve it.
+
+        Args:
+            method (str): Name of the API method (e.g. "match-v5.match").
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = max(
+                    self.blocked_until - now,
+                    self.method_blocked_until.get(method, 0.0) - now,
+                    *(window.wait_time(now) for window in self._windows(method)),
+                    0.0,
+                )
+                if wait <= 0:
+                    for window in self._windows(method):
+                        window.record(now)
+                    return
+            metrics.count("rate_limiter_wait_seconds_total", wait, host=self.host, endpoint=method)
+            time.sleep(wait)
+
+    def update(self, method: str, response_headers) -> None:
+        """
+        Refresh the windows from the rate limit headers of a response.
+
+        Args:
+            method (str): Name of the API method the response belongs to.
+            response_headers (Mapping): Response headers.
+        """
+        app_header = response_headers.get("X-App-Rate-Limit")
+        method_header = response_headers.get("X-Method-Rate-Limit")
+        with self.lock:
+            now = time.monotonic()
+            if app_header and app_header != self.app_header:
+                self.app_header = app_header
+                self.app_windows = self._rebuild(self.app_windows, app_header)
+            if method_header and method_header != self.method_headers.get(method):
+                self.method_headers[method] = method_header
+                self.method_windows[method] = self._rebuild(self.method_windows.get(method, []), method_header)
+
+            self._sync(self.app_windows, response_headers.get("X-App-Rate-Limit-Count"), now)
+            self._sync(self.method_windows.get(method, []), response_headers.get("X-Method-Rate-Limit-Count"), now)
+
+        # Remaining requests in each window, as reported by the API
+        for scope, limit_header, count_header in (
+            ("application", app_header, response_headers.get("X-App-Rate-Limit-Count")),
+            (method, method_header, response_headers.get("X-Method-Rate-Limit-Count")),
+        ):
+            counts = {seconds: count for count, seconds in parse_rate_limits(count_header)}
+            for limit, seconds in parse_rate_limits(limit_header):
+                if seconds in counts:
+                    metrics.set_gauge("rate_limit_headroom", limit - counts[seconds],
+                                      host=self.host, scope=scope, window=f"{seconds}s")
+
+    def penalize(self, seconds: float, method: str = None) -> None:
+        """
+        Pause every request (or only `method`) for the given number of seconds.
+        """
+        with self.lock:
+            until = time.monotonic() + seconds
+            if method is None:
+                self.blocked_until = max(self.blocked_until, until)
+            else:
+                self.method_blocked_until[method] = max(self.method_blocked_until.get(method, 0.0), until)
+
+    @staticmethod
+    def _rebuild(windows: list, header: str) -> list:
+        # Keep the timestamps already recorded for windows whose duration did not change
+        previous = {window.seconds: window.timestamps for window in windows}
+        rebuilt = []
+        for limit, seconds in parse_rate_limits(header):
+            window = RateWindow(limit, seconds)
+            window.timestamps = previous.get(seconds, deque())
+            rebuilt.append(window)
+        return rebuilt
+
+    @staticmethod
+    def _sync(windows: list, count_header: str, now: float) -> None:
+        counts = {seconds: count for count, seconds in parse_rate_limits(count_header)}
+        for window in windows:
+            if window.seconds in counts:
+                window.sync_count(counts[window.seconds], now)
+
+
+class RiotClient:
+    """
+    Shared Riot API client with pooled keep-alive connections and header-driven rate limiting.
+
+    One RateLimiter is kept per routing host (euw1, europe, ...), as Riot enforces limits per host.
+    """
+
+    def __init__(self, api_key: str, max_workers: int = DEFAULT_WORKERS, timeout: int = 10):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"X-Riot-Token": api_key})
+        self.limiters = {}
+        self.limiters_lock = threading.Lock()
+
+    def limiter_for(self, url: str) -> RateLimiter:
+        """
+        Return the rate limiter of the host serving `url`.
+        """
+        host = urlparse(url).netloc
+        with self.limiters_lock:
+            if host not in self.limiters:
+                self.limiters[host] = RateLimiter(host=host)
+            return self.limiters[host]
+
+    def get(self, url: str, method: str, params: dict = None, stream: bool = False):
+        """
+        Perform a rate-limited GET request, retrying on 429, 5xx and network errors.
+
+        Args:
+            url (str): Request URL.
+            method (str): Name of the API method, used for per-method limits.
+            params (dict): Optional query parameters.
+            stream (bool): Leave the body unread, so large payloads can be parsed incrementally
+                           from `response.raw`. The caller must close the response.
+
+        Returns:
+            requests.Response: The final response. When every attempt failed, the last 429 or 5xx
+                               response (so callers report its status), or None if the last
+                               attempt failed with a network error.
+        """
+        limiter = self.limiter_for(url)
+        backoff = DEFAULT_RETRY_AFTER
+        response = None
+        reason = None
+
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt > 0:
+                metrics.count("retries_total", endpoint=method)
+            limiter.acquire(method)
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+            except requests.exceptions.RequestException as e:
+                metrics.observe_request(method, time.perf_counter() - start, "error")
+                print(f"Network error on {method} (attempt {attempt + 1}): {e}")
+                response = None
+                reason = f"network error ({e})"
+                if attempt < MAX_RETRIES:
+                    self._backoff(backoff, method)
+                    backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+
+            metrics.observe_request(method, time.perf_counter() - start, response.status_code)
+            limiter.update(method, response.headers)
+
+            if response.status_code == 429:
+                retry_after = float(response.headers.get("Retry-After", backoff))
+                # Method-level 429s only pause this method, everything else pauses the host
+                limit_type = response.headers.get("X-Rate-Limit-Type", "service")
+                scope = method if limit_type == "method" else None
+                limiter.penalize(retry_after, scope)
+                metrics.count("rate_limited_total", endpoint=method, limit_type=limit_type)
+                metrics.count("retry_after_seconds_total", retry_after, endpoint=method)
+                reason = f"rate limited ({limit_type} limit)"
+            elif response.status_code >= 500:
+                reason = f"server error {response.status_code}"
+            else:
+                return response
+
+            if attempt == MAX_RETRIES:
+                break
+            # Release the connection of a streamed response that is retried
+            response.close()
+            if response.status_code == 429:
+                print(f"Rate limit exceeded on {method}. Retrying after {retry_after:g} seconds...")
+            else:
+                print(f"Server error {response.status_code} on {method}. Retrying after {backoff:g} seconds...")
+                self._backoff(backoff, method)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+        metrics.count("failed_requests_total", endpoint=method)
+        print(f"Giving up on {url} after {MAX_RETRIES + 1} attempts: {reason}")
+        return response
+
+    @staticmethod
+    def _backoff(seconds: float, method: str) -> None:
+        metrics.count("backoff_seconds_total", seconds, endpoint=method)
+        time.sleep(seconds)
+
+    def map(self, func, items) -> list:
+        """
+        Apply `func` to every item concurrently, preserving the input order.
+
+        Args:
+            func (callable): Function performing one or more client requests.
+            items (iterable): Items to process.
+
+        Returns:
+            list: The results of `func`, in the order of `items`.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, items))
+
+    def imap_unordered(self, func, items):
+        """
+        Apply `func` to every item concurrently and yield results as soon as they complete.
+        At most twice `max_workers` calls are in flight, so results never pile up in memory.
+
+        Args:
+            func (callable): Function performing one or more client requests.
+            items (iterable): Items to process.
+
+        Yields:
+            The results of `func`, in completion order.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            for item in items:
+                pending.add(executor.submit(func, item))
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                else:
+                    # Items may arrive slowly (e.g. from discovery), so finished calls are not held back
+                    done = {future for future in pending if future.done()}
+                    pending -= done
+                for future in done:
+                    yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
@@ -0,0 +1,217 @@
+import json
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import requests
+
+# Data Dragon URLs
+DDRAGON_VERSIONS_URL = "https://ddragon.leagueoflegends.com/api/versions.json"
+DDRAGON_DATA_URL = "https://ddragon.leagueoflegends.com/cdn/{version}/data/en_US/{name}.json"
+
+# Local store: datasets/ddragon/<version>/{champion.json, champion_lookup.npy, champion_names.npy}
+STATIC_DATA_DIR = os.path.join("datasets", "ddragon")
+VERSIONS_FILE = "versions.json"
+
+# Width of the fixed-size name array, large enough for every champion name
+NAME_WIDTH = 32
+
+# Loaded lookup tables, by version
+_champion_tables = {}
+
+
+def fetch_versions(refresh: bool = False, root: str = STATIC_DATA_DIR) -> list:
+    """
+    Return the Data Dragon versions, newest first. The list is cached on disk and only
+    downloaded again when `refresh` is set or when no copy exists.
+
+    Args:
+        refresh (bool): Download the list even if a local copy exists.
+        root (str): Root directory of the static data store.
+
+    Returns:
+        list: Data Dragon versions (e.g. ["14.24.1", "14.23.1", ...]).
+    """
+    path = os.path.join(root, VERSIONS_FILE)
+    if refresh or not os.path.exists(path):
+        try:
+            response = requests.get(DDRAGON_VERSIONS_URL, timeout=10)
+            response.raise_for_status()
+            os.makedirs(root, exist_ok=True)
+            with open(path, "w") as versions_file:
+                json.dump(response.json(), versions_file)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching Data Dragon versions: {e}")
+
+    if os.path.exists(path):
+        with open(path) as versions_file:
+            return json.load(versions_file)
+    return stored_versions(root)
+
+
+def stored_versions(root: str = STATIC_DATA_DIR) -> list:
+    """
+    Return the versions whose champion data is available locally, newest first.
+
+    Args:
+        root (str): Root directory of the static data store.
+
+    Returns:
+        list: Locally stored versions.
+    """
+    if not os.path.isdir(root):
+        return []
+    versions = [name for name in os.listdir(root)
+                if os.path.exists(os.path.join(root, name, "champion_names.npy"))]
+    return sorted(versions, key=_version_key, reverse=True)
+
+
+def resolve_version(patch: str = None, root: str = STATIC_DATA_DIR) -> str:
+    """
+    Resolve a game patch ("14.23") to the matching Data Dragon version ("14.23.1").
+    A patch that is not known yet (e.g. released after the cached version list) triggers
+    a refresh of the list. The latest version is returned when `patch` is None.
+
+    Args:
+        patch (str): Major.minor patch, as extracted from a match `gameVersion`.
+        root (str): Root directory of the static data store.
+
+    Returns:
+        str: The Data Dragon version, or None if no version is known.
+    """
+    versions = fetch_versions(root=root)
+    if patch is None:
+        return versions[0] if versions else None
+
+    matching = [version for version in versions if version.startswith(f"{patch}.")]
+    if not matching:
+        versions = fetch_versions(refresh=True, root=root)
+        matching = [version for version in versions if version.startswith(f"{patch}.")]
+    if matching:
+        return matching[0]
+
+    # Closest older version: champion IDs never change, only new champions are missing
+    older = [version for version in versions if _version_key(version) <= _version_key(f"{patch}.0")]
+    return older[0] if older else (versions[0] if versions else None)
+
+
+def load_champion_table(version: str, root: str = STATIC_DATA_DIR) -> tuple:
+    """
+    Load the champion lookup arrays of a version, downloading them on first use.
+    Arrays are memory-mapped, so each process only pages in what it reads.
+
+    Args:
+        version (str): Data Dragon version (e.g. "14.23.1").
+        root (str): Root directory of the static data store.
+
+    Returns:
+        tuple: (lookup, names) where `lookup[champion_id]` is an index into `names`, or -1.
+    """
+    if version in _champion_tables:
+        return _champion_tables[version]
+
+    version_dir = os.path.join(root, version)
+    lookup_path = os.path.join(version_dir, "champion_lookup.npy")
+    names_path = os.path.join(version_dir, "champion_names.npy")
+
+    if not os.path.exists(names_path):
+        _download_champions(version, version_dir)
+
+    table = (np.load(lookup_path, mmap_mode="r"), np.load(names_path, mmap_mode="r"))
+    _champion_tables[version] = table
+    return table
+
+
+def _download_champions(version: str, version_dir: str) -> None:
+    response = requests.get(DDRAGON_DATA_URL.format(version=version, name="champion"), timeout=10)
+    response.raise_for_status()
+    data = response.json()
+
+    os.makedirs(version_dir, exist_ok=True)
+    with open(os.path.join(version_dir, "champion.json"), "w") as champion_file:
+        json.dump(data, champion_file)
+
+    champion_ids = np.array([int(champ['key']) for champ in data['data'].values()], dtype=np.int32)
+    names = np.array([champ['name'] for champ in data['data'].values()], dtype=f"<U{NAME_WIDTH}")
+
+    # Dense ID -> row index table: a lookup is a single array indexing operation
+    lookup = np.full(champion_ids.max() + 1, -1, dtype=np.int32)
+    lookup[champion_ids] = np.arange(len(champion_ids), dtype=np.int32)
+
+    np.save(os.path.join(version_dir, "champion_lookup.npy"), lookup)
+    np.save(os.path.join(version_dir, "champion_names.npy"), names)
+
+
+def champion_names(champion_ids, version: str = None, root: str = STATIC_DATA_DIR) -> np.ndarray:
+    """
+    Map champion IDs to names with a vectorized array lookup.
+    If the data of the version cannot be downloaded, the newest version already in the
+    store is used instead, so names still resolve offline.
+
+    Args:
+        champion_ids (array-like): Champion IDs.
+        version (str): Data Dragon version. Defaults to the latest known version.
+        root (str): Root directory of the static data store.
+
+    Returns:
+        np.ndarray: Champion names (object array), None where the ID is unknown.
+    """
+    version = version or resolve_version(root=root)
+    champion_ids = np.asarray(champion_ids, dtype=np.int64)
+    if version is None:
+        warnings.warn("No Data Dragon version available, champion names cannot be resolved")
+        return np.full(champion_ids.shape, None, dtype=object)
+
+    try:
+        lookup, names = load_champion_table(version, root)
+    except requests.exceptions.RequestException as e:
+        # Offline: fall back to the newest version already in the store
+        fallback = stored_versions(root)
+        if not fallback:
+            warnings.warn(f"Could not download Data Dragon {version} ({e}) and no version is stored, "
+                          f"champion names cannot be resolved")
+            return np.full(champion_ids.shape, None, dtype=object)
+        warnings.warn(f"Could not download Data Dragon {version} ({e}), using {fallback[0]} instead")
+        lookup, names = load_champion_table(fallback[0], root)
+    in_range = (champion_ids >= 0) & (champion_ids < len(lookup))
+    rows = np.full(champion_ids.shape, -1, dtype=np.int64)
+    rows[in_range] = lookup[champion_ids[in_range]]
+
+    result = np.full(champion_ids.shape, None, dtype=object)
+    known = rows >= 0
+    result[known] = names[rows[known]].astype(object)
+    return result
+
+
+def champion_names_by_patch(champion_ids: pd.Series, patches: pd.Series, root: str = STATIC_DATA_DIR) -> pd.Series:
+    """
+    Map champion IDs to names using the Data Dragon version of each row's patch.
+
+    Args:
+        champion_ids (pd.Series): Champion IDs.
+        patches (pd.Series): Patch of each row (e.g. "14.23").
+        root (str): Root directory of the static data store.
+
+    Returns:
+        pd.Series: Champion names aligned with `champion_ids`. Unknown IDs are NaN and reported.
+    """
+    result = pd.Series(None, index=champion_ids.index, dtype=object)
+    patch_values = patches.astype(str).to_numpy()
+    id_values = champion_ids.to_numpy()
+
+    for patch in pd.unique(patch_values):
+        mask = patch_values == patch
+        version = resolve_version(None if patch == "unknown" else patch, root)
+        if version is None:
+            continue
+        result.iloc[np.flatnonzero(mask)] = champion_names(id_values[mask], version, root)
+
+    missing = result.isna()
+    if missing.any():
+        unknown_ids = sorted(pd.unique(champion_ids[missing]).tolist())
+        warnings.warn(f"No champion name found for {missing.sum()} rows (champion IDs: {unknown_ids})")
+    return result
+
+
+def _version_key(version: str) -> tuple:
+    return tuple(int(part) if part.isdigit() else 0 for part in version.split("."))
@@ -0,0 +1,174 @@
+import numpy as np
+
+from .metrics import metrics
+
+# Standard normal quantile of a two-sided 95% interval
+Z_95 = 1.959963984540054
+
+# Bootstrap resamples per group
+BOOTSTRAP_RESAMPLES = 10_000
+
+# Upper bound on the binomial draws held in memory at once (groups x resamples)
+BOOTSTRAP_BATCH_DRAWS = 5_000_000
+
+# Prior weight, in games, used when the spread between groups is too small to estimate it
+DEFAULT_PRIOR_GAMES = 50
+
+# Fixed seed, so the same counts always give the same intervals (and unchanged charts are skipped)
+BOOTSTRAP_SEED = 0
+
+
+def wilson_interval(wins, games, z: float = Z_95) -> tuple:
+    """
+    Wilson score interval of a win rate, for every group at once.
+
+    Args:
+        wins (array-like): Wins per group.
+        games (array-like): Games per group.
+        z (float): Standard normal quantile of the confidence level.
+
+    Returns:
+        tuple: (low, high) arrays of proportions. Groups without games get (0, 1).
+    """
+    wins = np.asarray(wins, dtype=float)
+    games = np.asarray(games, dtype=float)
+    safe_games = np.maximum(games, 1)
+    rate = wins / safe_games
+
+    denominator = 1 + z ** 2 / safe_games
+    center = (rate + z ** 2 / (2 * safe_games)) / denominator
+    margin = z * np.sqrt(rate * (1 - rate) / safe_games + z ** 2 / (4 * safe_games ** 2)) / denominator
+
+    empty = games == 0
+    return np.where(empty, 0.0, center - margin), np.where(empty, 1.0, center + margin)
+
+
+def estimate_beta_prior(wins, games, default_games: float = DEFAULT_PRIOR_GAMES) -> tuple:
+    """
+    Empirical Bayes Beta prior of the win rates, by the method of moments: the prior mean is
+    the pooled win rate, and its strength is set by the spread between groups that is not
+    explained by binomial noise.
+
+    Args:
+        wins (array-like): Wins per group.
+        games (array-like): Games per group.
+        default_games (float): Prior strength used when the spread cannot be estimated.
+
+    Returns:
+        tuple: (alpha, beta) parameters of the prior.
+    """
+    wins = np.asarray(wins, dtype=float)
+    games = np.asarray(games, dtype=float)
+    played = games > 0
+    if not played.any():
+        return default_games / 2, default_games / 2
+
+    mean = wins[played].sum() / games[played].sum()
+    rates = wins[played] / games[played]
+    weights = games[played] / games[played].sum()
+    observed_variance = np.sum(weights * (rates - mean) ** 2)
+    # Expected binomial noise of the same games-weighted spread: sum(w_i * p(1-p) / n_i) = p(1-p) * k / N
+    noise_variance = mean * (1 - mean) * played.sum() / games[played].sum()
+    prior_variance = observed_variance - noise_variance
+
+    if prior_variance <= 0 or not 0 < mean < 1:
+        strength = default_games
+    else:
+        strength = max(mean * (1 - mean) / prior_variance - 1, 1.0)
+    return mean * strength, (1 - mean) * strength
+
+
+def shrunk_win_rate(wins, games, prior: tuple = None, z: float = Z_95) -> tuple:
+    """
+    Bayesian-shrunk win rates: the Beta posterior mean of every group, pulled towards the
+    pooled win rate in proportion to how few games it has, with its credible interval
+    (normal approximation of the Beta posterior).
+
+    Args:
+        wins (array-like): Wins per group.
+        games (array-like): Games per group.
+        prior (tuple): (alpha, beta) of the prior. Defaults to `estimate_beta_prior`.
+        z (float): Standard normal quantile of the credible level.
+
+    Returns:
+        tuple: (rate, low, high) arrays of proportions.
+    """
+    wins = np.asarray(wins, dtype=float)
+    games = np.asarray(games, dtype=float)
+    alpha, beta = prior if prior is not None else estimate_beta_prior(wins, games)
+
+    posterior_alpha = wins + alpha
+    posterior_games = games + alpha + beta
+    rate = posterior_alpha / posterior_games
+    margin = z * np.sqrt(rate * (1 - rate) / (posterior_games + 1))
+    return rate, np.clip(rate - margin, 0, 1), np.clip(rate + margin, 0, 1)
+
+
+def bootstrap_interval(wins, games, resamples: int = BOOTSTRAP_RESAMPLES, confidence: float = 0.95,
+                       seed: int = BOOTSTRAP_SEED, batch_draws: int = BOOTSTRAP_BATCH_DRAWS) -> tuple:
+    """
+    Percentile bootstrap interval of every group's win rate. Resampling a group's games with
+    replacement amounts to a binomial draw, so all groups are resampled at once with one
+    (groups x resamples) draw per batch instead of a Python loop per group.
+
+    Args:
+        wins (array-like): Wins per group.
+        games (array-like): Games per group.
+        resamples (int): Resamples per group.
+        confidence (float): Confidence level.
+        seed (int): Random seed.
+        batch_draws (int): Maximum number of draws held in memory at once.
+
+    Returns:
+        tuple: (low, high) arrays of proportions. Groups without games get (0, 1).
+    """
+    wins = np.asarray(wins, dtype=np.int64)
+    games = np.asarray(games, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+
+    low = np.zeros(len(games))
+    high = np.ones(len(games))
+    played = np.flatnonzero(games > 0)
+    batch_size = max(batch_draws // max(resamples, 1), 1)
+    for start in range(0, len(played), batch_size):
+        groups = played[start:start + batch_size]
+        n = games[groups]
+        draws = rng.binomial(n[:, None], (wins[groups] / n)[:, None], (len(groups), resamples))
+        low[groups], high[groups] = np.quantile(draws / n[:, None], quantiles, axis=1)
+    return low, high
+
+
+def add_interval_columns(df, wins_col: str = "wins", games_col: str = "total_matches",
+                         resamples: int = BOOTSTRAP_RESAMPLES, seed: int = BOOTSTRAP_SEED):
+    """
+    Adds confidence intervals to every group of a win rate table (percentages):
+    - `win_rate_low`, `win_rate_high`: Wilson score interval
+    - `shrunk_win_rate`, `shrunk_low`, `shrunk_high`: Bayesian-shrunk win rate and its credible interval
+    - `bootstrap_low`, `bootstrap_high`: percentile bootstrap interval (skipped if `resamples` is 0)
+
+    Args:
+        df (pd.DataFrame): DataFrame with one row per group and its win and game counts.
+        wins_col (str): Column holding the wins.
+        games_col (str): Column holding the games.
+        resamples (int): Bootstrap resamples per group.
+        seed (int): Bootstrap random seed.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with the interval columns.
+    """
+    with metrics.stage("win_rate_intervals") as stage:
+        wins = df[wins_col].to_numpy()
+        games = df[games_col].to_numpy()
+
+        low, high = wilson_interval(wins, games)
+        df['win_rate_low'], df['win_rate_high'] = low * 100, high * 100
+
+        rate, low, high = shrunk_win_rate(wins, games)
+        df['shrunk_win_rate'], df['shrunk_low'], df['shrunk_high'] = rate * 100, low * 100, high * 100
+
+        if resamples:
+            low, high = bootstrap_interval(wins, games, resamples=resamples, seed=seed)
+            df['bootstrap_low'], df['bootstrap_high'] = low * 100, high * 100
+        stage["rows"] = len(df)
+    return df
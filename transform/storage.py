@@ -0,0 +1,317 @@
+import glob
+import os
+import sqlite3
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .flatten import ROLES, normalize_match
+from .metrics import metrics
+from .partials import AGGREGATES_DIR, PARTIAL_SCHEMAS, build_partials, mark_ingest, write_partials
+
+# Root of the partitioned match dataset
+DATASET_DIR = os.path.join("datasets", "lake")
+
+# Number of matches buffered before a chunk of each table is written
+DEFAULT_MATCH_CHUNK_SIZE = 5_000
+
+# Index of the match IDs already in the dataset, kept next to its tables
+MATCH_INDEX_FILE = "_match_ids.sqlite"
+
+# Match IDs per lookup query of the index
+MATCH_INDEX_BATCH = 500
+
+# Every table is partitioned by collection date (YYYY-MM-DD) and game patch (e.g. "14.23")
+PARTITION_COLS = ["collection_date", "patch"]
+PARTITIONING = ds.partitioning(
+    pa.schema([("collection_date", pa.string()), ("patch", pa.string())]),
+    flavor="hive",
+)
+
+ROLE_TYPE = pa.dictionary(pa.int8(), pa.string())
+
+SCHEMAS = {
+    "matches": pa.schema([
+        ("match_id", pa.string()),
+        ("platform", pa.string()),
+        ("tier", pa.string()),
+        ("game_creation", pa.int64()),
+        ("game_duration", pa.int32()),
+        ("game_version", pa.string()),
+        ("collection_date", pa.string()),
+        ("patch", pa.string()),
+    ]),
+    "participants": pa.schema([
+        ("match_id", pa.string()),
+        ("participant_id", pa.int8()),
+        ("puuid", pa.string()),
+        ("summoner_name", pa.string()),
+        ("team_id", pa.int16()),
+        ("champion_id", pa.int16()),
+        ("role", ROLE_TYPE),
+        ("win", pa.bool_()),
+        ("collection_date", pa.string()),
+        ("patch", pa.string()),
+    ]),
+    "bans": pa.schema([
+        ("match_id", pa.string()),
+        ("team_id", pa.int16()),
+        ("pick_turn", pa.int8()),
+        ("champion_id", pa.int16()),
+        ("collection_date", pa.string()),
+        ("patch", pa.string()),
+    ]),
+}
+
+
+class MatchIndex:
+    """
+    Persisted set of the match IDs in the dataset, so an ingest checks its matches against an
+    indexed SQLite table instead of loading every match ID of the lake. The index is built from
+    the `matches` table the first time it is opened (or after it was deleted).
+
+    A chunk is recorded as pending before its files are written, and its match IDs are indexed in
+    the same transaction that clears it. A chunk still pending when an ingest starts was interrupted:
+    its files are deleted (see `rollback_pending`), so retrying it never counts a match twice.
+
+    Subclasses index other tables (e.g. timelines) by overriding `index_file`, `stored_ids`
+    and `chunk_dirs`.
+
+    Args:
+        root (str): Root directory of the dataset.
+    """
+
+    index_file = MATCH_INDEX_FILE
+
+    def __init__(self, root: str = DATASET_DIR):
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, self.index_file)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            created = self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'matches'"
+            ).fetchone() is None
+            self.connection.execute("CREATE TABLE IF NOT EXISTS matches (match_id TEXT PRIMARY KEY)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS pending_chunks "
+                                    "(chunk_id TEXT PRIMARY KEY, aggregates_root TEXT NOT NULL)")
+        if created:
+            self.add(self.stored_ids(root))
+
+    def stored_ids(self, root: str):
+        """
+        Return every match ID of the indexed table, to build the index.
+        """
+        return load_table("matches", columns=["match_id"], root=root)["match_id"]
+
+    def chunk_dirs(self, root: str, aggregates_root: str) -> list:
+        """
+        Return the directories a chunk writes files to.
+        """
+        return ([os.path.join(root, name) for name in SCHEMAS]
+                + [os.path.join(aggregates_root, name) for name in PARTIAL_SCHEMAS])
+
+    def existing(self, match_ids: list) -> set:
+        """
+        Return the given match IDs that are already in the dataset.
+
+        Args:
+            match_ids (list): Match IDs.
+
+        Returns:
+            set: The indexed match IDs among them.
+        """
+        found = set()
+        for start in range(0, len(match_ids), MATCH_INDEX_BATCH):
+            batch = list(match_ids[start:start + MATCH_INDEX_BATCH])
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(f"SELECT match_id FROM matches WHERE match_id IN ({placeholders})", batch)
+            found.update(row[0] for row in rows)
+        return found
+
+    def add(self, match_ids) -> None:
+        """
+        Record match IDs written to the dataset.
+
+        Args:
+            match_ids (iterable): Match IDs.
+        """
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO matches (match_id) VALUES (?)",
+                                        ((match_id,) for match_id in match_ids))
+
+    def begin_chunk(self, chunk_id: str, aggregates_root: str) -> None:
+        """
+        Record a chunk as pending, before any of its files is written.
+
+        Args:
+            chunk_id (str): Chunk identifier, part of the name of every file of the chunk.
+            aggregates_root (str): Root directory of the partial aggregates the chunk writes to.
+        """
+        with self.connection:
+            self.connection.execute("INSERT INTO pending_chunks (chunk_id, aggregates_root) VALUES (?, ?)",
+                                    (chunk_id, os.path.abspath(aggregates_root)))
+
+    def commit_chunk(self, chunk_id: str, match_ids: list) -> None:
+        """
+        Index the match IDs of a written chunk and clear it, in one transaction.
+
+        Args:
+            chunk_id (str): Chunk identifier.
+            match_ids (list): Match IDs written by the chunk.
+        """
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO matches (match_id) VALUES (?)",
+                                        ((match_id,) for match_id in match_ids))
+            self.connection.execute("DELETE FROM pending_chunks WHERE chunk_id = ?", (chunk_id,))
+
+    def rollback_pending(self, root: str) -> int:
+        """
+        Delete the files of the chunks left pending by an interrupted ingest.
+
+        Args:
+            root (str): Root directory of the dataset.
+
+        Returns:
+            int: The number of chunks rolled back.
+        """
+        chunks = self.connection.execute("SELECT chunk_id, aggregates_root FROM pending_chunks").fetchall()
+        for chunk_id, aggregates_root in chunks:
+            for table_dir in self.chunk_dirs(root, aggregates_root):
+                for path in glob.glob(os.path.join(table_dir, "**", chunk_file_pattern(chunk_id)), recursive=True):
+                    os.remove(path)
+            with self.connection:
+                self.connection.execute("DELETE FROM pending_chunks WHERE chunk_id = ?", (chunk_id,))
+            print(f"Rolled back the files of interrupted ingest chunk {chunk_id}")
+        return len(chunks)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def write_match_dataset(matches, collection_date: str, root: str = DATASET_DIR,
+                        chunk_size: int = DEFAULT_MATCH_CHUNK_SIZE, aggregates_root: str = AGGREGATES_DIR,
+                        match_tiers: dict = None) -> int:
+    """
+    Normalize match payloads into the matches, participants and bans tables and append
+    them to the partitioned Parquet dataset, one chunk at a time.
+    Matches already present in the dataset are skipped, so overlapping runs do not
+    duplicate games. The partial aggregates of the new matches are written alongside.
+
+    Args:
+        matches (iterable): Iterable of match details (e.g. a generator of API responses).
+        collection_date (str): Collection date partition (YYYY-MM-DD).
+        root (str): Root directory of the dataset.
+        chunk_size (int): Number of matches per written chunk.
+        aggregates_root (str): Root directory of the partial aggregates.
+        match_tiers (dict): Optional mapping of match IDs to the tier they were collected from.
+
+    Returns:
+        int: The number of new matches written.
+    """
+    # Only the IDs of this ingest are looked up, so its cost does not grow with the dataset
+    index = MatchIndex(root)
+    if index.rollback_pending(root):
+        mark_ingest(aggregates_root)
+    match_tiers = match_tiers or {}
+    buffers = {name: [] for name in SCHEMAS}
+    pending = {}
+    written = 0
+
+    def flush():
+        nonlocal written
+        existing = index.existing(list(pending))
+        for match_id, (match_row, participant_rows, ban_rows) in pending.items():
+            if match_id in existing:
+                continue
+            buffers["matches"].append(match_row)
+            buffers["participants"].extend(participant_rows)
+            buffers["bans"].extend(ban_rows)
+        new_ids = [match_id for match_id in pending if match_id not in existing]
+        if new_ids:
+            chunk_id = uuid.uuid4().hex
+            index.begin_chunk(chunk_id, aggregates_root)
+            _flush_tables(buffers, collection_date, root, aggregates_root, chunk_id)
+            # Indexed once the chunk is on disk, in the transaction that clears it
+            index.commit_chunk(chunk_id, new_ids)
+            written += len(new_ids)
+        pending.clear()
+
+    try:
+        for match in matches:
+            match_id = match.get('metadata', {}).get('matchId')
+            match_row, participant_rows, ban_rows = normalize_match(match, match_tiers.get(match_id))
+            pending.setdefault(match_row["match_id"], (match_row, participant_rows, ban_rows))
+            if len(pending) >= chunk_size:
+                flush()
+        if pending:
+            flush()
+    finally:
+        index.close()
+
+    # Readers of the partials (e.g. the query service) reload once the ingest is complete
+    if written:
+        mark_ingest(aggregates_root)
+    print(f"Total new matches written to {root}: {written}")
+    return written
+
+
+def chunk_file_pattern(chunk_id: str) -> str:
+    """
+    Return the glob pattern of the files written by a chunk. Replacing `*` with `{i}` gives
+    the `basename_template` to write them with.
+    """
+    return f"part-{chunk_id}-*.parquet"
+
+
+def _flush_tables(buffers: dict, collection_date: str, root: str, aggregates_root: str, chunk_id: str) -> None:
+    # Every file of the chunk is named after it, so an interrupted chunk can be found and deleted
+    basename_template = chunk_file_pattern(chunk_id).replace("*", "{i}")
+    tables = {}
+    for name, rows in buffers.items():
+        for row in rows:
+            row["collection_date"] = collection_date
+        tables[name] = pa.Table.from_pylist(rows, schema=SCHEMAS[name])
+        if rows:
+            pq.write_to_dataset(tables[name], os.path.join(root, name), partition_cols=PARTITION_COLS,
+                                basename_template=basename_template)
+            metrics.count("dataset_rows_written_total", len(rows), table=name)
+        rows.clear()
+
+    # Only the new matches are counted, so each ingest costs O(new matches)
+    partials = build_partials(*(tables[name].to_pandas() for name in ("matches", "participants", "bans")))
+    write_partials(partials, aggregates_root, basename_template)
+
+
+def load_table(name: str, columns: list = None, dates: list = None, patches: list = None,
+               root: str = DATASET_DIR) -> pd.DataFrame:
+    """
+    Load a table of the match dataset, reading only the requested columns and partitions.
+
+    Args:
+        name (str): Table name ("matches", "participants" or "bans").
+        columns (list): Columns to read. All columns are read if None.
+        dates (list): Collection dates (YYYY-MM-DD) to read. All dates are read if None.
+        patches (list): Patches (e.g. "14.23") to read. All patches are read if None.
+        root (str): Root directory of the dataset.
+
+    Returns:
+        pd.DataFrame: The requested slice of the table.
+    """
+    path = os.path.join(root, name)
+    if not os.path.isdir(path):
+        return SCHEMAS[name].empty_table().select(columns or SCHEMAS[name].names).to_pandas()
+
+    filters = []
+    if dates is not None:
+        filters.append(("collection_date", "in", list(dates)))
+    if patches is not None:
+        filters.append(("patch", "in", list(patches)))
+
+    table = pq.read_table(path, columns=columns, filters=filters or None, partitioning=PARTITIONING)
+    frame = table.to_pandas()
+    if "role" in frame.columns:
+        frame["role"] = frame["role"].astype(pd.CategoricalDtype(ROLES))
+    return frame
@@ -0,0 +1,251 @@
+import os
+import uuid
+import ijson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .metrics import metrics
+from .storage import DATASET_DIR, MatchIndex, chunk_file_pattern
+
+# Minute marks read from each timeline (e.g. TIMELINE_MINUTES=10,15)
+TIMELINE_MINUTES = [int(minute) for minute in os.getenv("TIMELINE_MINUTES", "10,15").split(",") if minute]
+
+# participantFrames fields kept at each minute mark, and the column they are summed into
+FRAME_FIELDS = {
+    "totalGold": "gold",
+    "xp": "xp",
+    "minionsKilled": "cs",
+    "jungleMinionsKilled": "cs",
+}
+FRAME_COLUMNS = list(dict.fromkeys(FRAME_FIELDS.values()))
+
+# Prefixes of the streamed JSON events: frames are one minute apart, frame i is minute i
+FRAME_PREFIX = "info.frames.item"
+PARTICIPANT_FRAME_PREFIX = "info.frames.item.participantFrames."
+
+# Number of timelines buffered before a chunk is written
+DEFAULT_TIMELINE_CHUNK_SIZE = 5_000
+
+# Timelines carry no patch, so they are only partitioned by collection date
+TIMELINE_PARTITIONING = ds.partitioning(pa.schema([("collection_date", pa.string())]), flavor="hive")
+
+# Index of the match IDs whose timeline is stored, kept next to the dataset tables
+TIMELINE_INDEX_FILE = "_timeline_ids.sqlite"
+
+
+class TimelineIndex(MatchIndex):
+    """
+    Persisted set of the match IDs whose timeline is in the dataset, with the same chunk
+    bookkeeping as `MatchIndex`. It is built from the `timelines` table the first time it is opened.
+
+    Args:
+        root (str): Root directory of the dataset.
+    """
+
+    index_file = TIMELINE_INDEX_FILE
+
+    def stored_ids(self, root: str):
+        return load_timelines(columns=["match_id"], root=root)["match_id"].unique()
+
+    def chunk_dirs(self, root: str, aggregates_root: str) -> list:
+        return [os.path.join(root, "timelines")]
+
+
+def timeline_columns(minutes: list = TIMELINE_MINUTES) -> list:
+    """
+    Return the per-minute columns of the timeline table (e.g. "gold_at_10").
+
+    Args:
+        minutes (list): Minute marks.
+
+    Returns:
+        list: Column names, minute by minute.
+    """
+    return [f"{column}_at_{minute}" for minute in minutes for column in FRAME_COLUMNS]
+
+
+def timeline_schema(minutes: list = TIMELINE_MINUTES) -> pa.Schema:
+    """
+    Return the Arrow schema of the timeline table for the given minute marks.
+    """
+    return pa.schema(
+        [("match_id", pa.string()), ("participant_id", pa.int8())]
+        + [(column, pa.int32()) for column in timeline_columns(minutes)]
+        + [("collection_date", pa.string())]
+    )
+
+
+def parse_timeline(stream, match_id: str, minutes: list = TIMELINE_MINUTES) -> list:
+    """
+    Extract participant gold, XP and CS at the given minute marks from a match-v5 timeline,
+    parsing the JSON incrementally. Events and every other field are skipped without being
+    built, and parsing stops after the last minute mark, so a ~1 MB timeline never sits in memory.
+
+    Args:
+        stream: Binary file-like object with the timeline JSON (e.g. a streamed response body).
+        match_id (str): Match ID of the timeline.
+        minutes (list): Minute marks to extract.
+
+    Returns:
+        list: One row (dict) per participant, with `match_id`, `participant_id` and the
+              `<gold|xp|cs>_at_<minute>` values reached by the game.
+    """
+    wanted = set(minutes)
+    last_minute = max(minutes)
+    rows = {}
+    frame = -1
+
+    for prefix, event, value in ijson.parse(stream):
+        if prefix == FRAME_PREFIX and event == "start_map":
+            frame += 1
+            if frame > last_minute:
+                break
+            continue
+        if frame not in wanted or event != "number" or not prefix.startswith(PARTICIPANT_FRAME_PREFIX):
+            continue
+
+        participant_id, _, field = prefix[len(PARTICIPANT_FRAME_PREFIX):].partition(".")
+        column = FRAME_FIELDS.get(field)
+        if column is None:
+            continue
+        row = rows.setdefault(participant_id, {"match_id": match_id, "participant_id": int(participant_id)})
+        key = f"{column}_at_{frame}"
+        row[key] = row.get(key, 0) + int(value)
+
+    return list(rows.values())
+
+
+def missing_timeline_ids(match_ids: list, root: str = DATASET_DIR) -> list:
+    """
+    Return the match IDs whose timeline is not in the dataset yet. Only the given IDs are
+    looked up in the index, so the cost does not grow with the dataset.
+
+    Args:
+        match_ids (list): Match IDs.
+        root (str): Root directory of the dataset.
+
+    Returns:
+        list: The match IDs without a stored timeline, in their original order.
+    """
+    index = TimelineIndex(root)
+    try:
+        index.rollback_pending(root)
+        existing = index.existing(list(match_ids))
+    finally:
+        index.close()
+    return [match_id for match_id in match_ids if match_id not in existing]
+
+
+def write_timeline_dataset(timelines, collection_date: str, root: str = DATASET_DIR,
+                           minutes: list = TIMELINE_MINUTES, chunk_size: int = DEFAULT_TIMELINE_CHUNK_SIZE) -> int:
+    """
+    Append parsed timelines to the `timelines` table of the dataset, one chunk at a time.
+    Timelines already in the dataset are skipped.
+
+    Args:
+        timelines (iterable): Iterable of per-match row lists, as returned by `parse_timeline`.
+        collection_date (str): Collection date partition (YYYY-MM-DD).
+        root (str): Root directory of the dataset.
+        minutes (list): Minute marks of the rows.
+        chunk_size (int): Number of timelines per written chunk.
+
+    Returns:
+        int: The number of timelines written.
+    """
+    schema = timeline_schema(minutes)
+    index = TimelineIndex(root)
+    index.rollback_pending(root)
+    pending = {}
+    written = 0
+
+    def flush():
+        nonlocal written
+        existing = index.existing(list(pending))
+        new_ids = [match_id for match_id in pending if match_id not in existing]
+        if new_ids:
+            buffer = [dict(row, collection_date=collection_date) for match_id in new_ids for row in pending[match_id]]
+            # Same chunk protocol as the match dataset: files named after the chunk, indexed once written
+            chunk_id = uuid.uuid4().hex
+            index.begin_chunk(chunk_id, root)
+            pq.write_to_dataset(pa.Table.from_pylist(buffer, schema=schema), os.path.join(root, "timelines"),
+                                partition_cols=["collection_date"],
+                                basename_template=chunk_file_pattern(chunk_id).replace("*", "{i}"))
+            index.commit_chunk(chunk_id, new_ids)
+            metrics.count("dataset_rows_written_total", len(buffer), table="timelines")
+            written += len(new_ids)
+        pending.clear()
+
+    try:
+        for rows in timelines:
+            if not rows:
+                continue
+            pending.setdefault(rows[0]["match_id"], rows)
+            if len(pending) >= chunk_size:
+                flush()
+        if pending:
+            flush()
+    finally:
+        index.close()
+
+    print(f"Total new timelines written to {root}: {written}")
+    return written
+
+
+def load_timelines(columns: list = None, dates: list = None, root: str = DATASET_DIR,
+                   minutes: list = TIMELINE_MINUTES) -> pd.DataFrame:
+    """
+    Load the `timelines` table, reading only the requested columns and collection dates.
+
+    Args:
+        columns (list): Columns to read. All columns are read if None.
+        dates (list): Collection dates (YYYY-MM-DD) to read. All dates are read if None.
+        root (str): Root directory of the dataset.
+        minutes (list): Minute marks of the table.
+
+    Returns:
+        pd.DataFrame: One row per participant, joinable to the participants table
+                      on (`match_id`, `participant_id`).
+    """
+    path = os.path.join(root, "timelines")
+    if not os.path.isdir(path):
+        return timeline_schema(minutes).empty_table().select(columns or timeline_schema(minutes).names).to_pandas()
+
+    filters = [("collection_date", "in", list(dates))] if dates is not None else None
+    return pq.read_table(path, columns=columns, filters=filters, partitioning=TIMELINE_PARTITIONING).to_pandas()
+
+
+def add_lane_diffs(timelines_df: pd.DataFrame, participants_df: pd.DataFrame,
+                   minutes: list = TIMELINE_MINUTES) -> pd.DataFrame:
+    """
+    Join timelines to participants and add the difference with the lane opponent
+    (e.g. `gold_diff_at_10`) for every timeline column.
+
+    Args:
+        timelines_df (pd.DataFrame): Rows of the `timelines` table.
+        participants_df (pd.DataFrame): Participant rows with `match_id`, `participant_id`,
+                                        `team_id` and `role`.
+        minutes (list): Minute marks of the timelines.
+
+    Returns:
+        pd.DataFrame: Participant rows with their timeline columns and lane differences.
+                      Players without a known lane opponent get missing differences.
+    """
+    columns = [column for column in timeline_columns(minutes) if column in timelines_df]
+    laning = participants_df.merge(timelines_df[['match_id', 'participant_id', *columns]],
+                                   on=['match_id', 'participant_id'], how='inner')
+
+    # Each lane has one player per team, so the opponent join stays one-to-one
+    lanes = laning[laning['role'].astype(str) != "UNKNOWN"]
+    opponents = lanes[['match_id', 'role', 'team_id', *columns]].rename(
+        columns={'team_id': 'opponent_team_id', **{column: f"opponent_{column}" for column in columns}}
+    )
+    paired = lanes[['match_id', 'participant_id', 'role', 'team_id']].merge(opponents, on=['match_id', 'role'])
+    paired = paired[paired['team_id'] != paired['opponent_team_id']].drop_duplicates(['match_id', 'participant_id'])
+
+    laning = laning.merge(paired[['match_id', 'participant_id', *[f"opponent_{column}" for column in columns]]],
+                          on=['match_id', 'participant_id'], how='left')
+    for column in columns:
+        laning[column.replace("_at_", "_diff_at_")] = laning[column] - laning.pop(f"opponent_{column}")
+    return laning